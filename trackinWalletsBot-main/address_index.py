@@ -0,0 +1,220 @@
+# address_index.py
+import hashlib
+import threading
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from config import logger
+
+KEY_SIZE = 20  # И EVM, и TRON адрес - 20 байт (TRON: без префикса 0x41 и контрольной суммы)
+
+BASE58_INDEX = {char: i for i, char in enumerate('123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz')}
+
+
+def _base58_to_key(address: str) -> Optional[bytes]:
+    num = 0
+    for char in address:
+        if char not in BASE58_INDEX:
+            return None
+        num = num * 58 + BASE58_INDEX[char]
+    raw = num.to_bytes(25, 'big') if num.bit_length() <= 200 else b''
+    if len(raw) != 25 or raw[0] != 0x41:
+        return None
+    if hashlib.sha256(hashlib.sha256(raw[:21]).digest()).digest()[:4] != raw[21:]:
+        return None
+    return raw[1:21]
+
+
+def address_key(address: str) -> Optional[bytes]:
+    """
+    20-байтный ключ адреса: EVM 0x..., TRON base58 (T...), TRON hex (41...)
+    и адреса из событий TronGrid (0x + 20 байт). None для некорректного адреса.
+    """
+    if not address:
+        return None
+    try:
+        if address.startswith(('0x', '0X')) and len(address) == 42:
+            return bytes.fromhex(address[2:])
+        if address.startswith('41') and len(address) == 42:
+            return bytes.fromhex(address[2:])
+    except ValueError:
+        return None
+    if address.startswith('T') and len(address) == 34:
+        return _base58_to_key(address)
+    return None
+
+
+class _SortedKeys:
+    """
+    Отсортированный массив 20-байтных ключей в одном bytearray (20 байт на адрес) и подписчики
+    компактно: id строк wallets подряд в array('q'), подписчики ключа i - _ids[_offsets[i]:_offsets[i + 1]].
+    Около 32 байт на адрес вместо кортежей (user_id, shortname). Поиск - бинарный.
+    """
+
+    def __init__(self):
+        self._keys = bytearray()
+        self._offsets = array('I', [0])
+        self._ids = array('q')
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def _key_at(self, position: int) -> bytes:
+        return bytes(self._keys[position * KEY_SIZE:(position + 1) * KEY_SIZE])
+
+    def _bisect(self, key: bytes) -> int:
+        low, high = 0, len(self)
+        while low < high:
+            middle = (low + high) // 2
+            if self._key_at(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _find(self, key: bytes) -> Tuple[int, bool]:
+        position = self._bisect(key)
+        return position, position < len(self) and self._key_at(position) == key
+
+    def _shift_offsets(self, position: int, delta: int):
+        """Сдвигает границы подписчиков всех ключей после position"""
+        tail = self._offsets[position + 1:]
+        self._offsets[position + 1:] = array('I', (offset + delta for offset in tail))
+
+    def get(self, key: bytes) -> tuple:
+        position, found = self._find(key)
+        if not found:
+            return ()
+        return tuple(self._ids[self._offsets[position]:self._offsets[position + 1]])
+
+    def add(self, key: bytes, wallet_id: int):
+        position, found = self._find(key)
+        if found:
+            end = self._offsets[position + 1]
+            if wallet_id in self._ids[self._offsets[position]:end]:
+                return
+            self._ids.insert(end, wallet_id)
+            self._shift_offsets(position, 1)
+            return
+        self._keys[position * KEY_SIZE:position * KEY_SIZE] = key
+        start = self._offsets[position]
+        self._ids.insert(start, wallet_id)
+        self._offsets.insert(position + 1, start)
+        self._shift_offsets(position, 1)
+
+    def remove(self, key: bytes, wallet_id: int):
+        position, found = self._find(key)
+        if not found:
+            return
+        start, end = self._offsets[position], self._offsets[position + 1]
+        ids = self._ids[start:end]
+        if wallet_id not in ids:
+            return
+        del self._ids[start + ids.index(wallet_id)]
+        self._shift_offsets(position, -1)
+        if end - start == 1:
+            # Последний подписчик - ключ удаляется вместе со своей (теперь пустой) границей
+            del self._keys[position * KEY_SIZE:(position + 1) * KEY_SIZE]
+            del self._offsets[position + 1]
+
+    def load(self, items: Dict[bytes, List[int]]):
+        """Массовая загрузка: одна сортировка вместо вставок по одному"""
+        keys = sorted(items)
+        self._keys = bytearray(b''.join(keys))
+        self._offsets = array('I', [0])
+        self._ids = array('q')
+        for key in keys:
+            self._ids.extend(items[key])
+            self._offsets.append(len(self._ids))
+
+
+class AddressIndex:
+    """
+    Индекс отслеживаемых адресов: сеть кошелька (wallets.network) -> 20-байтный ключ ->
+    id строк wallets подписчиков. Имена и пользователи не хранятся в памяти - по id их
+    отдает db.get_wallets_by_ids. Обновляется инкрементально при add_wallet/remove_wallet.
+    """
+
+    def __init__(self):
+        self._networks: Dict[str, _SortedKeys] = {}
+        self._lock = threading.Lock()
+
+    def load(self, rows: Iterable[tuple]):
+        """Строит индекс по строкам (id кошелька, wallet_address, network)"""
+        items: Dict[str, Dict[bytes, List[int]]] = {}
+        skipped = 0
+        for wallet_id, wallet_address, network in rows:
+            key = address_key(wallet_address)
+            if key is None:
+                skipped += 1
+                continue
+            items.setdefault(network, {}).setdefault(key, []).append(wallet_id)
+
+        networks = {}
+        for network, network_items in items.items():
+            networks[network] = _SortedKeys()
+            networks[network].load(network_items)
+        with self._lock:
+            self._networks = networks
+        logger.info(f"AddressIndex: загружено {sum(len(keys) for keys in networks.values())} адресов"
+                    + (f", пропущено некорректных: {skipped}" if skipped else ''))
+
+    def add(self, wallet_id: int, address: str, network: str):
+        key = address_key(address)
+        if key is None:
+            return
+        with self._lock:
+            self._networks.setdefault(network, _SortedKeys()).add(key, wallet_id)
+
+    def remove(self, wallet_id: int, address: str, network: str):
+        key = address_key(address)
+        if key is None:
+            return
+        with self._lock:
+            keys = self._networks.get(network)
+            if keys is not None:
+                keys.remove(key, wallet_id)
+
+    def subscribers(self, address: str, networks: Iterable[str]) -> tuple:
+        """id кошельков-подписчиков адреса во всех указанных сетях кошельков"""
+        key = address_key(address)
+        if key is None:
+            return ()
+        found = ()
+        with self._lock:
+            for network in networks:
+                keys = self._networks.get(network)
+                if keys is not None:
+                    found += keys.get(key)
+        return found
+
+    def watcher(self, networks: Iterable[str]) -> 'AddressWatcher':
+        return AddressWatcher(self, tuple(networks))
+
+    def size(self, network: str) -> int:
+        keys = self._networks.get(network)
+        return len(keys) if keys is not None else 0
+
+
+class AddressWatcher:
+    """Проверка 'адрес отслеживается' для ingest-режимов: address in watcher"""
+
+    def __init__(self, index: AddressIndex, networks: Tuple[str, ...]):
+        self.index = index
+        self.networks = networks
+
+    def __contains__(self, address: str) -> bool:
+        return bool(self.index.subscribers(address, self.networks))
+
+    def __len__(self) -> int:
+        return sum(self.index.size(network) for network in self.networks)
+
+
+def get_address_index(bot_data: Dict) -> AddressIndex:
+    """Возвращает общий индекс адресов из bot_data, строя его из БД при первом обращении"""
+    index = bot_data.get('address_index')
+    if index is None:
+        index = AddressIndex()
+        index.load(bot_data['db'].get_wallet_keys())
+        bot_data['address_index'] = index
+    return index
@@ -1,8 +1,24 @@
 # ankr_api.py - PREMIUM VERSION
+import asyncio
+import httpx
 import requests
 import time
 from typing import Dict, List, Any, Optional
-from config import logger
+from config import logger, ANKR_ENDPOINTS, ANKR_SETTINGS
+from circuit_breaker import CircuitOpenError, get_breaker
+from deadline import DeadlineExceeded, bounded_timeout
+from http_cache import response_cache
+from http_client import http_pool
+
+
+class AnkrAPIError(Exception):
+    """Запрос к ANKR не выполнен: ошибка API, HTTP или исчерпаны повторы"""
+    pass
+
+
+class AnkrTruncatedError(AnkrAPIError):
+    """Окно не прочитано за max_pages страниц - результат неполный (сеть при этом доступна)"""
+    pass
 
 
 class AnkrPremiumAPI:
@@ -75,26 +91,73 @@ class AnkrPremiumAPI:
         chain_lower = chain.lower().replace('_', '-')
         return chain_mapping.get(chain_lower, chain_lower)
 
-    def get_transactions_by_time_range(self, address: str, chain: str,
-                                       start_timestamp: int = None,
-                                       end_timestamp: int = None,
-                                       max_pages: int = 10,
-                                       include_logs: bool = True,
-                                       decode_logs: bool = True) -> List[Dict]:
-        """
-        Премиум метод: получает транзакции с расширенными параметрами
-        """
-        ankr_chain = self._get_ankr_chain_name(chain)
-
+    def _breaker(self, chain: str):
+        """Circuit breaker для сети ANKR с пробным запросом eth_blockNumber"""
+        breaker = get_breaker('ankr', chain)
+        if breaker.probe is None:
+            breaker.probe = lambda: self.get_block_number(chain)
+        return breaker
+
+    def _multichain_breaker(self):
+        """Общий breaker multichain API: ошибка запроса по многим сетям учитывается в нем один раз"""
+        breaker = get_breaker('ankr', 'multichain')
+        if breaker.probe is None:
+            breaker.probe = self._multichain_probe
+        return breaker
+
+    def _multichain_probe(self):
+        payload = {"jsonrpc": "2.0", "method": "ankr_getBlockchainStats", "params": {"blockchain": "eth"}, "id": 1}
+        response = self._post(self.multichain_url, payload, timeout=15,
+                              headers={"Authorization": f"Bearer {self.api_key}"})
+        response.raise_for_status()
+        if 'error' in response.json():
+            raise AnkrAPIError(str(response.json()['error']))
+
+    def get_block_number(self, chain: str) -> int:
+        """Номер последнего блока через RPC endpoint сети"""
+        url = ANKR_ENDPOINTS.get(chain.lower())
+        if not url:
+            raise ValueError(f"Нет RPC endpoint для {chain}")
+        payload = {"jsonrpc": "2.0", "method": "eth_blockNumber", "params": [], "id": 1}
+        response = self._post(url, payload, timeout=15)
+        response.raise_for_status()
+        return int(response.json()['result'], 16)
+
+    # ---- HTTP транспорт (общие keep-alive сессии) ----
+
+    def _post(self, url: str, payload: Any, timeout: int = 60, headers: Dict = None) -> requests.Response:
+        return http_pool.session(url).post(url, json=payload, headers=headers, timeout=bounded_timeout(timeout))
+
+    async def _post_async(self, url: str, payload: Any, timeout: int = 60, headers: Dict = None) -> httpx.Response:
+        client = http_pool.async_client(url)
+        return await client.post(url, json=payload, headers=headers, timeout=bounded_timeout(timeout))
+
+    def _page_cache_key(self, payload: Dict):
+        """Ключ дискового кеша и конец окна страницы multichain запроса; без toTimestamp - (None, None)"""
+        window_end = payload['params'].get('toTimestamp')
+        if not window_end:
+            return None, None
+        return response_cache.key('ankr', payload['method'], payload['params']), window_end
+
+    @staticmethod
+    def _remember_page(key: Optional[str], data: Dict, window_end: Optional[int]):
+        if key and isinstance(data, dict) and 'error' not in data:
+            response_cache.set(key, data, window_end)
+
+    def _build_transactions_request(self, address: str, ankr_chains: List[str],
+                                    start_timestamp: int = None, end_timestamp: int = None,
+                                    include_logs: bool = True, decode_logs: bool = True):
+        """Собирает payload и заголовки для ankr_getTransactionsByAddress (одна или несколько сетей)"""
         # Премиум параметры
         params = {
             "jsonrpc": "2.0",
             "method": "ankr_getTransactionsByAddress",
             "params": {
                 "address": address.lower(),
-                "chain": ankr_chain,
+                # Ankr принимает одну сеть строкой или список сетей в одном запросе
+                "blockchain": ankr_chains[0] if len(ankr_chains) == 1 else ankr_chains,
                 "pageSize": self.premium_features['max_page_size'],  # Используем премиум лимит
-                "order": "desc",
+                "descOrder": True,
                 "includeLogs": include_logs,
                 "decodeLogs": decode_logs
             },
@@ -112,76 +175,341 @@ class AnkrPremiumAPI:
             "content-type": "application/json",
             "Authorization": f"Bearer {self.api_key}"  # Для premium может потребоваться
         }
+        return params, headers
 
-        all_transactions = []
-        page_token = None
+    def _build_token_transfers_request(self, address: str, ankr_chains: List[str],
+                                       start_timestamp: int = None, end_timestamp: int = None):
+        """Payload и заголовки для ankr_getTokenTransfers: переводы уже декодированы на стороне ANKR"""
+        params = {
+            "jsonrpc": "2.0",
+            "method": "ankr_getTokenTransfers",
+            "params": {
+                "address": address.lower(),
+                "blockchain": ankr_chains[0] if len(ankr_chains) == 1 else ankr_chains,
+                "pageSize": self.premium_features['max_page_size'],
+                "descOrder": True
+            },
+            "id": 1
+        }
+        if start_timestamp:
+            params["params"]["fromTimestamp"] = start_timestamp
+        if end_timestamp:
+            params["params"]["toTimestamp"] = end_timestamp
 
-        try:
-            for page in range(1, max_pages + 1):
-                logger.info(f"AnkrPremium: страница {page}, цепь {ankr_chain}")
-
-                if page_token:
-                    params["params"]["pageToken"] = page_token
-
-                response = requests.post(
-                    self.multichain_url,
-                    json=params,
-                    headers=headers,
-                    timeout=60  # Увеличиваем таймаут для больших запросов
-                )
-
-                if response.status_code == 429:
-                    logger.warning("Rate limit достигнут, пауза 1 сек...")
-                    time.sleep(1)
-                    continue
+        headers = {
+            "accept": "application/json",
+            "content-type": "application/json",
+            "Authorization": f"Bearer {self.api_key}"
+        }
+        return params, headers
+
+    def _request_breakers(self, chains: List[str]) -> Dict[str, Any]:
+        """
+        Breaker'ы, в которых учитывается результат запроса: {имя: breaker}. Для одной сети - ее breaker,
+        для нескольких - общий breaker multichain API. CircuitOpenError, если хотя бы одна сеть
+        недоступна: молча выкинутая сеть выглядела бы как сеть без переводов.
+        """
+        unavailable = [chain for chain in chains if not self._breaker(chain).allow_request()]
+        if len(chains) > 1 and not self._multichain_breaker().allow_request():
+            unavailable = list(chains)
+        if unavailable:
+            raise CircuitOpenError(f"ankr: сети {','.join(unavailable)} недоступны")
+        if len(chains) == 1:
+            return {chains[0]: self._breaker(chains[0])}
+        return {'multichain': self._multichain_breaker()}
+
+    @staticmethod
+    def _record_result(breakers: Dict[str, Any], error: Exception = None):
+        for breaker in breakers.values():
+            if error:
+                breaker.record_failure(error)
+            else:
+                breaker.record_success()
+
+    @staticmethod
+    def _spend_retry(retries: int, reason: str) -> int:
+        """Учитывает повтор запроса; AnkrAPIError, если повторы (ANKR_SETTINGS['max_retries']) исчерпаны"""
+        retries += 1
+        if retries > ANKR_SETTINGS['max_retries']:
+            raise AnkrAPIError(f"{reason}: исчерпаны повторы ({ANKR_SETTINGS['max_retries']})")
+        return retries
+
+    def _handle_transactions_page(self, data: Dict, params: Dict, all_transactions: List[Dict],
+                                  page: int, result_key: str = 'transactions') -> Optional[str]:
+        """
+        Разбирает страницу ответа ankr_getTransactionsByAddress (или ankr_getTokenTransfers
+        с result_key='transfers'). Возвращает 'retry' для повтора запроса, 'stop' для завершения,
+        'error' при ошибке API или 'next'.
+        """
+        if 'error' in data:
+            error_msg = data['error'].get('message', str(data['error']))
 
-                data = response.json()
+            # Premium-specific error handling
+            if "premium" in error_msg.lower() or "subscription" in error_msg.lower():
+                logger.error(f"Premium ошибка: {error_msg}")
+                # Пробуем без премиум features
+                params["params"]["pageSize"] = 100
+                params["params"].pop("decodeLogs", None)
+                return 'retry'
 
-                if 'error' in data:
-                    error_msg = data['error'].get('message', str(data['error']))
+            logger.error(f"API ошибка: {error_msg}")
+            return 'error'
 
-                    # Premium-specific error handling
-                    if "premium" in error_msg.lower() or "subscription" in error_msg.lower():
-                        logger.error(f"Premium ошибка: {error_msg}")
-                        # Пробуем без премиум features
-                        params["params"]["pageSize"] = 100
-                        del params["params"]["decodeLogs"]
-                        continue
+        result = data.get('result', {})
+        transactions = result.get(result_key, [])
 
-                    logger.error(f"API ошибка: {error_msg}")
-                    break
+        if not transactions:
+            logger.info(f"Больше транзакций нет на странице {page}")
+            return 'stop'
 
-                result = data.get('result', {})
-                transactions = result.get('transactions', [])
+        all_transactions.extend(transactions)
+        logger.info(f"Получено {len(transactions)} транзакций, всего {len(all_transactions)}")
 
-                if not transactions:
-                    logger.info(f"Больше транзакций нет на странице {page}")
-                    break
+        page_token = result.get('nextPageToken')
+        if not page_token:
+            logger.info("Достигнут конец списка транзакций")
+            return 'stop'
 
-                all_transactions.extend(transactions)
-                logger.info(f"Получено {len(transactions)} транзакций, всего {len(all_transactions)}")
+        params["params"]["pageToken"] = page_token
+        return 'next'
 
-                page_token = result.get('nextPageToken')
-                if not page_token:
-                    logger.info("Достигнут конец списка транзакций")
+    def get_transactions_by_time_range(self, address: str, chain: str,
+                                       start_timestamp: int = None,
+                                       end_timestamp: int = None,
+                                       max_pages: int = 10,
+                                       include_logs: bool = True,
+                                       decode_logs: bool = True) -> List[Dict]:
+        """
+        Премиум метод: получает транзакции с расширенными параметрами
+        """
+        return self.get_transactions_by_time_range_multichain(
+            address, [chain], start_timestamp, end_timestamp, max_pages, include_logs, decode_logs
+        )
+
+    def get_transactions_by_time_range_multichain(self, address: str, chains: List[str],
+                                                  start_timestamp: int = None,
+                                                  end_timestamp: int = None,
+                                                  max_pages: int = 10,
+                                                  include_logs: bool = True,
+                                                  decode_logs: bool = True) -> List[Dict]:
+        """
+        Транзакции адреса сразу по нескольким сетям одним постраничным запросом.
+        Сеть каждой транзакции - в поле 'blockchain'.
+        """
+        breakers = self._request_breakers(chains)
+        ankr_chains = [self._get_ankr_chain_name(chain) for chain in chains]
+        params, headers = self._build_transactions_request(
+            address, ankr_chains, start_timestamp, end_timestamp, include_logs, decode_logs
+        )
+        all_transactions = self._fetch_pages(breakers, params, headers, max_pages)
+        if not all_transactions:
+            return []
+
+        # Премиум: дополнительная обработка данных
+        enriched_txs = self._enrich_transactions(all_transactions, ','.join(ankr_chains))
+        return enriched_txs
+
+    def get_token_transfers(self, address: str, chain: str,
+                            start_timestamp: int = None,
+                            end_timestamp: int = None,
+                            max_pages: int = 10) -> List[Dict]:
+        """Переводы токенов адреса (ankr_getTokenTransfers) за период"""
+        return self.get_token_transfers_multichain(address, [chain], start_timestamp, end_timestamp, max_pages)
+
+    def get_token_transfers_multichain(self, address: str, chains: List[str],
+                                       start_timestamp: int = None,
+                                       end_timestamp: int = None,
+                                       max_pages: int = 10) -> List[Dict]:
+        """Переводы токенов адреса сразу по нескольким сетям. Сеть перевода - в поле 'blockchain'."""
+        breakers = self._request_breakers(chains)
+        params, headers = self._build_token_transfers_request(
+            address, [self._get_ankr_chain_name(chain) for chain in chains], start_timestamp, end_timestamp
+        )
+        return self._fetch_pages(breakers, params, headers, max_pages, result_key='transfers')
+
+    @staticmethod
+    def _chains_label(params: Dict) -> str:
+        blockchain = params['params']['blockchain']
+        return blockchain if isinstance(blockchain, str) else ','.join(blockchain)
+
+    def _fetch_pages(self, breakers: Dict[str, Any], params: Dict, headers: Dict, max_pages: int,
+                     result_key: str = 'transactions') -> List[Dict]:
+        """
+        Постраничный запрос к multichain API. При ошибке - AnkrAPIError (ошибка учитывается
+        один раз в breaker'ах запроса), если окно не уложилось в max_pages - AnkrTruncatedError.
+        Повторы (429, смена премиум параметров) не тратят страницы.
+        """
+        chains_label = self._chains_label(params)
+        all_transactions = []
+        page, retries, action = 0, 0, None
+
+        try:
+            while page < max_pages:
+                logger.info(f"AnkrPremium: страница {page + 1}, цепь {chains_label}")
+
+                # Страница закрытого окна могла уже скачиваться - берем из дискового кеша
+                key, window_end = self._page_cache_key(params)
+                data = response_cache.get(key) if key else None
+                if data is None:
+                    response = self._post(
+                        self.multichain_url,
+                        params,
+                        headers=headers,
+                        timeout=60  # Увеличиваем таймаут для больших запросов
+                    )
+
+                    if response.status_code == 429:
+                        retries = self._spend_retry(retries, "Rate limit")
+                        logger.warning("Rate limit достигнут, пауза 1 сек...")
+                        time.sleep(1)
+                        continue
+
+                    if response.status_code >= 500:
+                        raise RuntimeError(f"HTTP {response.status_code}")
+
+                    data = response.json()
+                    self._remember_page(key, data, window_end)
+
+                action = self._handle_transactions_page(data, params, all_transactions, page + 1, result_key)
+                if action == 'error':
+                    raise AnkrAPIError(f"API ошибка для {chains_label}: {data['error']}")
+                if action == 'retry':
+                    retries = self._spend_retry(retries, "Повтор без премиум параметров")
+                    continue
+                page += 1
+                if action == 'stop':
                     break
 
                 # Премиум: можно делать меньше пауз
                 if page % 5 == 0:
                     time.sleep(0.1)
 
-            logger.info(f"✅ Всего получено {len(all_transactions)} транзакций для {ankr_chain}")
+            self._record_result(breakers)
+            if action == 'next':
+                raise AnkrTruncatedError(f"{chains_label}: окно не прочитано за {max_pages} страниц")
+            logger.info(f"✅ Всего получено {len(all_transactions)} {result_key} для {chains_label}")
+            return all_transactions
+
+        except (AnkrTruncatedError, DeadlineExceeded):
+            raise
+        except requests.exceptions.Timeout as e:
+            logger.error(f"Таймаут запроса для {chains_label}")
+            self._record_result(breakers, e)
+            raise AnkrAPIError(f"Таймаут запроса для {chains_label}") from e
+        except Exception as e:
+            logger.error(f"Ошибка AnkrPremium: {e}")
+            self._record_result(breakers, e)
+            if isinstance(e, AnkrAPIError):
+                raise
+            raise AnkrAPIError(str(e)) from e
+
+    async def get_transactions_by_time_range_async(self, address: str, chain: str,
+                                                   start_timestamp: int = None,
+                                                   end_timestamp: int = None,
+                                                   max_pages: int = 10,
+                                                   include_logs: bool = True,
+                                                   decode_logs: bool = True) -> List[Dict]:
+        """Асинхронный вариант get_transactions_by_time_range"""
+        return await self.get_transactions_by_time_range_multichain_async(
+            address, [chain], start_timestamp, end_timestamp, max_pages, include_logs, decode_logs
+        )
+
+    async def get_transactions_by_time_range_multichain_async(self, address: str, chains: List[str],
+                                                              start_timestamp: int = None,
+                                                              end_timestamp: int = None,
+                                                              max_pages: int = 10,
+                                                              include_logs: bool = True,
+                                                              decode_logs: bool = True) -> List[Dict]:
+        """Асинхронный вариант get_transactions_by_time_range_multichain"""
+        breakers = self._request_breakers(chains)
+        ankr_chains = [self._get_ankr_chain_name(chain) for chain in chains]
+        params, headers = self._build_transactions_request(
+            address, ankr_chains, start_timestamp, end_timestamp, include_logs, decode_logs
+        )
+        all_transactions = await self._fetch_pages_async(breakers, params, headers, max_pages)
+        if not all_transactions:
+            return []
+        return self._enrich_transactions(all_transactions, ','.join(ankr_chains))
+
+    async def get_token_transfers_async(self, address: str, chain: str,
+                                        start_timestamp: int = None,
+                                        end_timestamp: int = None,
+                                        max_pages: int = 10) -> List[Dict]:
+        """Асинхронный вариант get_token_transfers"""
+        return await self.get_token_transfers_multichain_async(
+            address, [chain], start_timestamp, end_timestamp, max_pages
+        )
+
+    async def get_token_transfers_multichain_async(self, address: str, chains: List[str],
+                                                   start_timestamp: int = None,
+                                                   end_timestamp: int = None,
+                                                   max_pages: int = 10) -> List[Dict]:
+        """Асинхронный вариант get_token_transfers_multichain"""
+        breakers = self._request_breakers(chains)
+        params, headers = self._build_token_transfers_request(
+            address, [self._get_ankr_chain_name(chain) for chain in chains], start_timestamp, end_timestamp
+        )
+        return await self._fetch_pages_async(breakers, params, headers, max_pages, result_key='transfers')
+
+    async def _fetch_pages_async(self, breakers: Dict[str, Any], params: Dict, headers: Dict, max_pages: int,
+                                 result_key: str = 'transactions') -> List[Dict]:
+        """Асинхронный вариант _fetch_pages"""
+        chains_label = self._chains_label(params)
+        all_transactions = []
+        page, retries, action = 0, 0, None
 
-            # Премиум: дополнительная обработка данных
-            enriched_txs = self._enrich_transactions(all_transactions, ankr_chain)
-            return enriched_txs
+        try:
+            while page < max_pages:
+                logger.info(f"AnkrPremium: страница {page + 1}, цепь {chains_label}")
+
+                key, window_end = self._page_cache_key(params)
+                data = response_cache.get(key) if key else None
+                if data is None:
+                    response = await self._post_async(self.multichain_url, params, headers=headers, timeout=60)
+
+                    if response.status_code == 429:
+                        retries = self._spend_retry(retries, "Rate limit")
+                        logger.warning("Rate limit достигнут, пауза 1 сек...")
+                        await asyncio.sleep(1)
+                        continue
+
+                    if response.status_code >= 500:
+                        raise RuntimeError(f"HTTP {response.status_code}")
+
+                    data = response.json()
+                    self._remember_page(key, data, window_end)
+
+                action = self._handle_transactions_page(data, params, all_transactions, page + 1, result_key)
+                if action == 'error':
+                    raise AnkrAPIError(f"API ошибка для {chains_label}: {data['error']}")
+                if action == 'retry':
+                    retries = self._spend_retry(retries, "Повтор без премиум параметров")
+                    continue
+                page += 1
+                if action == 'stop':
+                    break
 
-        except requests.exceptions.Timeout:
-            logger.error(f"Таймаут запроса для {ankr_chain}")
+                if page % 5 == 0:
+                    await asyncio.sleep(0.1)
+
+            self._record_result(breakers)
+            if action == 'next':
+                raise AnkrTruncatedError(f"{chains_label}: окно не прочитано за {max_pages} страниц")
+            logger.info(f"✅ Всего получено {len(all_transactions)} {result_key} для {chains_label}")
+            return all_transactions
+
+        except (AnkrTruncatedError, DeadlineExceeded):
+            raise
+        except httpx.TimeoutException as e:
+            logger.error(f"Таймаут запроса для {chains_label}")
+            self._record_result(breakers, e)
+            raise AnkrAPIError(f"Таймаут запроса для {chains_label}") from e
         except Exception as e:
             logger.error(f"Ошибка AnkrPremium: {e}")
-
-        return []
+            self._record_result(breakers, e)
+            if isinstance(e, AnkrAPIError):
+                raise
+            raise AnkrAPIError(str(e)) from e
 
     def _enrich_transactions(self, transactions: List[Dict], chain: str) -> List[Dict]:
         """Обогащает транзакции дополнительной информацией (премиум фича)"""
@@ -252,62 +580,35 @@ class AnkrPremiumAPI:
 
     # ПРЕМИУМ МЕТОДЫ
 
-    def get_historical_balance(self, address: str, chain: str, timestamp: int) -> Dict:
-        """Получает исторический баланс на определенный момент времени"""
-        ankr_chain = self._get_ankr_chain_name(chain)
-
-        payload = {
+    def _historical_balance_payload(self, address: str, chain: str, timestamp: int) -> Dict:
+        return {
             "jsonrpc": "2.0",
             "method": "ankr_getHistoricalAccountBalance",
             "params": {
                 "address": address.lower(),
-                "chain": ankr_chain,
+                "chain": self._get_ankr_chain_name(chain),
                 "timestamp": timestamp
             },
             "id": 1
         }
 
-        try:
-            response = requests.post(self.archive_url, json=payload, timeout=30)
-            data = response.json()
-            return data.get('result', {})
-        except Exception as e:
-            logger.error(f"Ошибка historical balance: {e}")
-            return {}
-
-    def get_token_holders(self, contract_address: str, chain: str, limit: int = 100) -> List[Dict]:
-        """Получает список холдеров токена"""
-        ankr_chain = self._get_ankr_chain_name(chain)
-
-        payload = {
+    def _token_holders_payload(self, contract_address: str, chain: str, limit: int) -> Dict:
+        return {
             "jsonrpc": "2.0",
             "method": "ankr_getTokenHolders",
             "params": {
                 "contractAddress": contract_address.lower(),
-                "chain": ankr_chain,
+                "chain": self._get_ankr_chain_name(chain),
                 "pageSize": min(limit, 1000)  # Premium limit
             },
             "id": 1
         }
 
-        try:
-            response = requests.post(self.multichain_url, json=payload, timeout=60)
-            data = response.json()
-            return data.get('result', {}).get('holders', [])
-        except Exception as e:
-            logger.error(f"Ошибка получения холдеров: {e}")
-            return []
-
-    def get_contract_logs(self, contract_address: str, chain: str,
-                          event_signature: str = None,
-                          from_block: int = None,
-                          to_block: int = None) -> List[Dict]:
-        """Получает логи контракта с фильтрацией"""
-        ankr_chain = self._get_ankr_chain_name(chain)
-
+    def _contract_logs_payload(self, contract_address: str, chain: str, event_signature: str = None,
+                               from_block: int = None, to_block: int = None) -> Dict:
         params = {
             "address": contract_address.lower(),
-            "chain": ankr_chain
+            "chain": self._get_ankr_chain_name(chain)
         }
 
         if event_signature:
@@ -317,38 +618,346 @@ class AnkrPremiumAPI:
         if to_block:
             params["toBlock"] = hex(to_block)
 
-        payload = {
+        return {
             "jsonrpc": "2.0",
             "method": "ankr_getLogs",
             "params": [params],
             "id": 1
         }
 
+    @staticmethod
+    def _batch_payloads(requests_list: List[Dict]) -> List[List[Dict]]:
+        """
+        JSON-RPC batch: массивы запросов по ANKR_SETTINGS['batch_size'].
+        id запроса = его позиция в requests_list (по нему ответы раскладываются обратно).
+        """
+        batch_size = ANKR_SETTINGS['batch_size']
+        requests_list = [{**request, "jsonrpc": "2.0", "id": i} for i, request in enumerate(requests_list)]
+        return [requests_list[i:i + batch_size] for i in range(0, len(requests_list), batch_size)]
+
+    @staticmethod
+    def _demux_batch(chunk: List[Dict], data: Any, results: List[Dict]):
+        """Раскладывает ответ batch по позициям исходных запросов"""
+        if not isinstance(data, list):
+            # Ошибка на уровне всего batch - отдаем ее каждому запросу (всегда в виде {'message': ...})
+            error = data.get('error', data) if isinstance(data, dict) else data
+            if not isinstance(error, dict):
+                error = {'message': str(error)}
+            for request in chunk:
+                results[request['id']] = {'error': error}
+            return
+        for item in data:
+            if isinstance(item, dict) and isinstance(item.get('id'), int) and 0 <= item['id'] < len(results):
+                results[item['id']] = item
+        for request in chunk:
+            if results[request['id']] is None:
+                results[request['id']] = {'error': {'message': 'нет ответа в batch'}}
+
+    def _batch_state(self, queries: List[tuple], build_request, result_key: str = 'transactions') -> List[Dict]:
+        """
+        Состояние постраничного опроса для каждого (адрес, сети) batch запроса.
+        build_request(address, ankr_chains) -> payload первой страницы.
+        """
+        states = []
+        for address, chains in queries:
+            try:
+                breakers = self._request_breakers(chains)
+            except CircuitOpenError as e:
+                logger.warning(f"AnkrPremium batch: {e}, адрес {address[:10]}... пропущен")
+                states.append({'breakers': {}, 'transactions': None, 'done': True})
+                continue
+            states.append({
+                'breakers': breakers, 'transactions': [], 'done': False, 'page': 0, 'retries': 0,
+                'result_key': result_key,
+                'params': build_request(address, [self._get_ankr_chain_name(chain) for chain in chains])
+            })
+        return states
+
+    def _apply_batch_round(self, active: List[Dict], responses: List[Dict], max_pages: int):
+        """
+        Обрабатывает одну страницу для каждого активного запроса batch. Результат раунда учитывается
+        в каждом breaker'е один раз: ошибка всего batch не множится на число адресов.
+        """
+        failed, succeeded = {}, {}
+        for state, response in zip(active, responses):
+            action = self._handle_transactions_page(response, state['params'], state['transactions'],
+                                                    state['page'] + 1, state['result_key'])
+            if action == 'retry' and state['retries'] < ANKR_SETTINGS['max_retries']:
+                state['retries'] += 1
+                continue
+            if action in ('error', 'retry'):
+                for name, breaker in state['breakers'].items():
+                    failed[name] = (breaker, response.get('error'))
+                state['transactions'] = None
+                state['done'] = True
+                continue
+            state['page'] += 1
+            if action == 'stop' or state['page'] >= max_pages:
+                succeeded.update(state['breakers'])
+                state['done'] = True
+                if action == 'next':
+                    logger.warning(f"AnkrPremium batch: окно не прочитано за {max_pages} страниц")
+                    state['transactions'] = None  # Неполный результат - адрес считается неопрошенным
+
+        for breaker, error in failed.values():
+            breaker.record_failure(AnkrAPIError(str(error)))
+        for name, breaker in succeeded.items():
+            if name not in failed:
+                breaker.record_success()
+
+    @staticmethod
+    def _batch_result(state: Dict) -> Optional[List[Dict]]:
+        # None - адрес не удалось опросить (ошибка API, недоступная сеть или неполное окно)
+        return state['transactions']
+
+    def _cached_round(self, active: List[Dict]) -> tuple:
+        """
+        Страницы активных запросов batch из дискового кеша: (ответы с None на месте промахов,
+        [(позиция, ключ, конец окна)] промахов - их нужно запросить).
+        """
+        responses, missing = [], []
+        for position, state in enumerate(active):
+            key, window_end = self._page_cache_key(state['params'])
+            response = response_cache.get(key) if key else None
+            if response is None:
+                missing.append((position, key, window_end))
+            responses.append(response)
+        return responses, missing
+
+    def _fill_round(self, responses: List, missing: List[tuple], fetched: List[Dict]):
+        for (position, key, window_end), response in zip(missing, fetched):
+            responses[position] = response
+            self._remember_page(key, response, window_end)
+
+    def _run_batch(self, states: List[Dict], max_pages: int) -> List[Optional[List[Dict]]]:
+        while True:
+            active = [state for state in states if not state['done']]
+            if not active:
+                break
+            responses, missing = self._cached_round(active)
+            if missing:
+                logger.info(f"AnkrPremium: batch страница для {len(missing)} адресов")
+                self._fill_round(responses, missing,
+                                 self.batch_request([active[position]['params'] for position, _, _ in missing]))
+            self._apply_batch_round(active, responses, max_pages)
+        return [self._batch_result(state) for state in states]
+
+    async def _run_batch_async(self, states: List[Dict], max_pages: int) -> List[Optional[List[Dict]]]:
+        while True:
+            active = [state for state in states if not state['done']]
+            if not active:
+                break
+            responses, missing = self._cached_round(active)
+            if missing:
+                logger.info(f"AnkrPremium: batch страница для {len(missing)} адресов")
+                self._fill_round(responses, missing, await self.batch_request_async(
+                    [active[position]['params'] for position, _, _ in missing]))
+            self._apply_batch_round(active, responses, max_pages)
+        return [self._batch_result(state) for state in states]
+
+    def get_transactions_batch(self, queries: List[tuple],
+                               start_timestamp: int = None,
+                               end_timestamp: int = None,
+                               max_pages: int = 10,
+                               include_logs: bool = True,
+                               decode_logs: bool = True) -> List[Optional[List[Dict]]]:
+        """
+        ankr_getTransactionsByAddress для многих (адрес, [сети]) сразу: каждая страница
+        всех адресов уходит JSON-RPC batch'ами. Возвращает списки транзакций в порядке queries
+        (None для адресов, которые не удалось опросить).
+        """
+        states = self._batch_state(queries, lambda address, ankr_chains: self._build_transactions_request(
+            address, ankr_chains, start_timestamp, end_timestamp, include_logs, decode_logs
+        )[0])
+        return [txs if txs is None else self._enrich_transactions(txs, 'batch')
+                for txs in self._run_batch(states, max_pages)]
+
+    def get_token_transfers_batch(self, queries: List[tuple],
+                                  start_timestamp: int = None,
+                                  end_timestamp: int = None,
+                                  max_pages: int = 10) -> List[Optional[List[Dict]]]:
+        """ankr_getTokenTransfers для многих (адрес, [сети]) сразу, аналогично get_transactions_batch"""
+        states = self._batch_state(queries, lambda address, ankr_chains: self._build_token_transfers_request(
+            address, ankr_chains, start_timestamp, end_timestamp
+        )[0], result_key='transfers')
+        return self._run_batch(states, max_pages)
+
+    async def get_transactions_batch_async(self, queries: List[tuple],
+                                           start_timestamp: int = None,
+                                           end_timestamp: int = None,
+                                           max_pages: int = 10,
+                                           include_logs: bool = True,
+                                           decode_logs: bool = True) -> List[Optional[List[Dict]]]:
+        """Асинхронный вариант get_transactions_batch"""
+        states = self._batch_state(queries, lambda address, ankr_chains: self._build_transactions_request(
+            address, ankr_chains, start_timestamp, end_timestamp, include_logs, decode_logs
+        )[0])
+        return [txs if txs is None else self._enrich_transactions(txs, 'batch')
+                for txs in await self._run_batch_async(states, max_pages)]
+
+    async def get_token_transfers_batch_async(self, queries: List[tuple],
+                                              start_timestamp: int = None,
+                                              end_timestamp: int = None,
+                                              max_pages: int = 10) -> List[Optional[List[Dict]]]:
+        """Асинхронный вариант get_token_transfers_batch"""
+        states = self._batch_state(queries, lambda address, ankr_chains: self._build_token_transfers_request(
+            address, ankr_chains, start_timestamp, end_timestamp
+        )[0], result_key='transfers')
+        return await self._run_batch_async(states, max_pages)
+
+    def get_historical_balance(self, address: str, chain: str, timestamp: int) -> Dict:
+        """Получает исторический баланс на определенный момент времени"""
+        payload = self._historical_balance_payload(address, chain, timestamp)
+
+        try:
+            response = self._post(self.archive_url, payload, timeout=30)
+            data = response.json()
+            return data.get('result', {})
+        except Exception as e:
+            logger.error(f"Ошибка historical balance: {e}")
+            return {}
+
+    def get_token_holders(self, contract_address: str, chain: str, limit: int = 100) -> List[Dict]:
+        """Получает список холдеров токена"""
+        payload = self._token_holders_payload(contract_address, chain, limit)
+
+        try:
+            response = self._post(self.multichain_url, payload, timeout=60)
+            data = response.json()
+            return data.get('result', {}).get('holders', [])
+        except Exception as e:
+            logger.error(f"Ошибка получения холдеров: {e}")
+            return []
+
+    def get_contract_logs(self, contract_address: str, chain: str,
+                          event_signature: str = None,
+                          from_block: int = None,
+                          to_block: int = None) -> List[Dict]:
+        """Получает логи контракта с фильтрацией"""
+        payload = self._contract_logs_payload(contract_address, chain, event_signature, from_block, to_block)
+
         try:
-            response = requests.post(self.multichain_url, json=payload, timeout=60)
+            response = self._post(self.multichain_url, payload, timeout=60)
             data = response.json()
             return data.get('result', [])
         except Exception as e:
             logger.error(f"Ошибка получения логов: {e}")
             return []
 
-    def batch_request(self, requests_list: List[Dict]) -> List[Dict]:
-        """Пакетный запрос (премиум фича)"""
-        payload = {
-            "jsonrpc": "2.0",
-            "method": "ankr_batch",
-            "params": requests_list,
-            "id": 1
+    def _auth_headers(self) -> Dict:
+        return {
+            "accept": "application/json",
+            "content-type": "application/json",
+            "Authorization": f"Bearer {self.api_key}"
         }
 
+    @staticmethod
+    def _retry_after(response) -> float:
+        """Пауза перед повтором после 429: Retry-After ответа, иначе 1 сек"""
         try:
-            response = requests.post(self.multichain_url, json=payload, timeout=120)
-            data = response.json()
-            return data.get('result', [])
+            return max(0.0, float(response.headers.get('Retry-After')))
+        except (TypeError, ValueError, AttributeError):
+            return 1.0
+
+    @staticmethod
+    def _batch_response_data(response) -> Any:
+        if response.status_code >= 400:
+            return {'error': {'message': f"HTTP {response.status_code}"}}
+        return response.json()
+
+    def _post_batch_chunk(self, chunk: List[Dict]) -> Any:
+        """Отправляет один batch; на 429 ждет Retry-After и повторяет (не больше ANKR_SETTINGS['max_retries'])"""
+        retries = 0
+        while True:
+            response = self._post(self.multichain_url, chunk, timeout=120, headers=self._auth_headers())
+            if response.status_code != 429:
+                return self._batch_response_data(response)
+            retries = self._spend_retry(retries, "Rate limit batch запроса")
+            delay = self._retry_after(response)
+            logger.warning(f"AnkrPremium batch: rate limit, пауза {delay:.1f} сек")
+            time.sleep(delay)
+
+    def batch_request(self, requests_list: List[Dict]) -> List[Dict]:
+        """
+        Пакетный JSON-RPC запрос: requests_list уходит batch'ами по ANKR_SETTINGS['batch_size'].
+        Возвращает ответы ({'result': ...} или {'error': {'message': ...}}) в порядке requests_list.
+        """
+        results = [None] * len(requests_list)
+        for chunk in self._batch_payloads(requests_list):
+            try:
+                data = self._post_batch_chunk(chunk)
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                logger.error(f"Ошибка batch запроса: {e}")
+                data = {'error': {'message': str(e)}}
+            self._demux_batch(chunk, data, results)
+        return results
+
+    # ASYNC ВАРИАНТЫ ПРЕМИУМ МЕТОДОВ
+
+    async def get_historical_balance_async(self, address: str, chain: str, timestamp: int) -> Dict:
+        """Асинхронный вариант get_historical_balance"""
+        payload = self._historical_balance_payload(address, chain, timestamp)
+
+        try:
+            response = await self._post_async(self.archive_url, payload, timeout=30)
+            return response.json().get('result', {})
+        except Exception as e:
+            logger.error(f"Ошибка historical balance: {e}")
+            return {}
+
+    async def get_token_holders_async(self, contract_address: str, chain: str, limit: int = 100) -> List[Dict]:
+        """Асинхронный вариант get_token_holders"""
+        payload = self._token_holders_payload(contract_address, chain, limit)
+
+        try:
+            response = await self._post_async(self.multichain_url, payload, timeout=60)
+            return response.json().get('result', {}).get('holders', [])
         except Exception as e:
-            logger.error(f"Ошибка batch запроса: {e}")
+            logger.error(f"Ошибка получения холдеров: {e}")
             return []
 
+    async def get_contract_logs_async(self, contract_address: str, chain: str,
+                                      event_signature: str = None,
+                                      from_block: int = None,
+                                      to_block: int = None) -> List[Dict]:
+        """Асинхронный вариант get_contract_logs"""
+        payload = self._contract_logs_payload(contract_address, chain, event_signature, from_block, to_block)
+
+        try:
+            response = await self._post_async(self.multichain_url, payload, timeout=60)
+            return response.json().get('result', [])
+        except Exception as e:
+            logger.error(f"Ошибка получения логов: {e}")
+            return []
+
+    async def _post_batch_chunk_async(self, chunk: List[Dict]) -> Any:
+        """Асинхронный вариант _post_batch_chunk"""
+        retries = 0
+        while True:
+            response = await self._post_async(self.multichain_url, chunk, timeout=120, headers=self._auth_headers())
+            if response.status_code != 429:
+                return self._batch_response_data(response)
+            retries = self._spend_retry(retries, "Rate limit batch запроса")
+            delay = self._retry_after(response)
+            logger.warning(f"AnkrPremium batch: rate limit, пауза {delay:.1f} сек")
+            await asyncio.sleep(delay)
+
+    async def batch_request_async(self, requests_list: List[Dict]) -> List[Dict]:
+        """Асинхронный вариант batch_request"""
+        results = [None] * len(requests_list)
+        for chunk in self._batch_payloads(requests_list):
+            try:
+                data = await self._post_batch_chunk_async(chunk)
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                logger.error(f"Ошибка batch запроса: {e}")
+                data = {'error': {'message': str(e)}}
+            self._demux_batch(chunk, data, results)
+        return results
+
 
 # Для обратной совместимости
 AnkrAPI = AnkrPremiumAPI
\ No newline at end of file
@@ -0,0 +1,79 @@
+# block_follower.py
+from typing import Container, Dict, List, Optional, Tuple
+
+from config import logger, ANKR_CHAIN_TO_ID, CHAIN_TOKENS, BLOCK_FOLLOWER_SETTINGS
+from rpc_client import ChainRpcClient
+
+
+def wallet_networks_for_chain(chain_id: int) -> Tuple[str, ...]:
+    """Сети кошельков (wallets.network), адреса которых отслеживаются в EVM сети chain_id"""
+    return ('eth', 'bnb') if chain_id == 56 else ('eth',)
+
+
+class NativeBlockFollower(ChainRpcClient):
+    """
+    Следит за новыми блоками сети и находит нативные переводы на отслеживаемые адреса.
+    Блоки читаются целиком (eth_getBlockByNumber с транзакциями) batch запросами,
+    'to' каждой транзакции сверяется с множеством адресов - без запросов по каждому кошельку.
+    """
+
+    def __init__(self, chain: str):
+        super().__init__(chain)
+        self.chain_id = ANKR_CHAIN_TO_ID.get(chain.lower())
+        if self.chain_id is None:
+            raise ValueError(f"Неизвестная сеть {chain}")
+        self.native_token = CHAIN_TOKENS.get(self.chain_id, 'UNKNOWN')
+
+    def poll(self, watched: Container[str], cursor: Optional[int]) -> Tuple[List[Dict], int]:
+        """
+        Обрабатывает блоки после cursor. Возвращает (найденные переводы, новый курсор).
+        Без курсора слежение начинается с текущего блока (история не догоняется).
+        """
+        head = self.get_block_number() - BLOCK_FOLLOWER_SETTINGS['confirmations']
+        if cursor is None:
+            logger.info(f"BlockFollower[{self.chain}]: старт с блока {head}")
+            return [], head
+        if cursor >= head:
+            return [], cursor
+
+        last = min(head, cursor + BLOCK_FOLLOWER_SETTINGS['max_blocks_per_poll'])
+        blocks = self.get_blocks(list(range(cursor + 1, last + 1)), full_transactions=True)
+
+        transfers = []
+        new_cursor = cursor
+        for number in range(cursor + 1, last + 1):
+            block = blocks.get(number)
+            if block is None:
+                break  # Курсор двигается только по непрерывной цепочке блоков
+            transfers.extend(self._match_block(block, watched))
+            new_cursor = number
+
+        logger.info(f"BlockFollower[{self.chain}]: блоки {cursor + 1}-{new_cursor}, "
+                    f"найдено {len(transfers)} переводов")
+        return transfers, new_cursor
+
+    def _match_block(self, block: Dict, watched: Container[str]) -> List[Dict]:
+        timestamp = int(block['timestamp'], 16)
+        block_number = int(block['number'], 16)
+        matched = []
+        for tx in block.get('transactions', []):
+            to_address = (tx.get('to') or '').lower()
+            if to_address not in watched:
+                continue
+            value = int(tx.get('value', '0x0'), 16)
+            if value <= 0:
+                continue
+            matched.append({
+                'hash': tx.get('hash', ''),
+                'log_index': -1,
+                'from': tx.get('from', ''),
+                'to': to_address,
+                'value': value / 1e18,
+                'value_raw': value,
+                'timestamp': timestamp,
+                'block_number': block_number,
+                'token': self.native_token,
+                'is_native': True,
+                'network': self.chain
+            })
+        return matched
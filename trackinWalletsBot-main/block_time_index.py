@@ -0,0 +1,221 @@
+# block_time_index.py
+import bisect
+import sqlite3
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config import logger, DATABASE_FILE, BLOCK_INDEX_SETTINGS
+
+
+class ResolveBudgetExceeded(Exception):
+    """Интерполяция не сузила интервал до одного блока за отведенное число запросов"""
+    pass
+
+
+class BlockTimeIndex:
+    """
+    Постоянный индекс (номер блока, время) по сетям для перевода времени в номер блока.
+    Пополняется всеми блоками и транзакциями, которые трекеры и ingest-режимы уже видели;
+    ответы ищутся интерполяцией с уточнением бинарным поиском, в сеть - только если
+    известных точек не хватает.
+    """
+
+    def __init__(self, db_file: str = DATABASE_FILE):
+        self.db_file = db_file
+        self._conn = None
+        self._lock = threading.RLock()
+        self._blocks: Dict[object, List[int]] = {}  # chain_id -> отсортированные номера блоков
+        self._times: Dict[object, List[int]] = {}  # chain_id -> время блоков (выровнено с _blocks)
+        self._answers: Dict[Tuple[object, int, str], int] = {}  # (chain_id, время, closest) -> блок
+        self._pending: List[tuple] = []
+
+    # ---- Хранилище ----
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_file, check_same_thread=False)
+            self._conn.execute('''CREATE TABLE IF NOT EXISTS block_times
+                                  (
+                                      chain_id,
+                                      block_number INTEGER,
+                                      timestamp INTEGER,
+                                      PRIMARY KEY (chain_id, block_number)
+                                  )''')
+            # Готовые ответы провайдеров (getblocknobytime), когда точек для точного ответа нет
+            self._conn.execute('''CREATE TABLE IF NOT EXISTS block_time_answers
+                                  (
+                                      chain_id,
+                                      timestamp INTEGER,
+                                      closest TEXT,
+                                      block_number INTEGER,
+                                      PRIMARY KEY (chain_id, timestamp, closest)
+                                  )''')
+            self._conn.commit()
+        return self._conn
+
+    def _load(self, chain_id):
+        """Загружает точки сети из БД при первом обращении"""
+        if chain_id in self._blocks:
+            return
+        rows = self._db().execute(
+            "SELECT block_number, timestamp FROM block_times WHERE chain_id = ? ORDER BY block_number",
+            (chain_id,)
+        ).fetchall()
+        self._blocks[chain_id] = [row[0] for row in rows]
+        self._times[chain_id] = [row[1] for row in rows]
+        for timestamp, closest, block_number in self._db().execute(
+                "SELECT timestamp, closest, block_number FROM block_time_answers WHERE chain_id = ?", (chain_id,)):
+            self._answers[(chain_id, timestamp, closest)] = block_number
+
+    def flush(self):
+        """Записывает накопленные точки в БД"""
+        with self._lock:
+            if not self._pending:
+                return
+            try:
+                self._db().executemany(
+                    "INSERT OR IGNORE INTO block_times (chain_id, block_number, timestamp) VALUES (?, ?, ?)",
+                    self._pending
+                )
+                self._db().commit()
+            except sqlite3.Error as e:
+                logger.warning(f"BlockTimeIndex: ошибка записи точек: {e}")
+            self._pending = []
+
+    # ---- Пополнение ----
+
+    def observe(self, chain_id, block_number: int, timestamp: int, exact: bool = False):
+        """
+        Запоминает время блока. Точки ближе min_sample_gap блоков к уже известной
+        пропускаются (exact=True - сохранить в любом случае, например найденную границу).
+        """
+        with self._lock:
+            self._load(chain_id)
+            blocks = self._blocks[chain_id]
+            position = bisect.bisect_left(blocks, block_number)
+            if position < len(blocks) and blocks[position] == block_number:
+                return
+            if not exact:
+                gap = BLOCK_INDEX_SETTINGS['min_sample_gap']
+                if (position > 0 and block_number - blocks[position - 1] < gap) or \
+                        (position < len(blocks) and blocks[position] - block_number < gap):
+                    return
+            blocks.insert(position, block_number)
+            self._times[chain_id].insert(position, timestamp)
+            self._pending.append((chain_id, block_number, timestamp))
+            if len(self._pending) >= BLOCK_INDEX_SETTINGS['flush_every']:
+                self.flush()
+
+    def remember_answer(self, chain_id, timestamp: int, closest: str, block_number: int):
+        """Сохраняет ответ провайдера на 'блок по времени'"""
+        with self._lock:
+            self._load(chain_id)
+            self._answers[(chain_id, timestamp, closest)] = block_number
+            try:
+                self._db().execute(
+                    "INSERT OR REPLACE INTO block_time_answers (chain_id, timestamp, closest, block_number) "
+                    "VALUES (?, ?, ?, ?)", (chain_id, timestamp, closest, block_number)
+                )
+                self._db().commit()
+            except sqlite3.Error as e:
+                logger.warning(f"BlockTimeIndex: ошибка записи ответа: {e}")
+
+    # ---- Поиск ----
+
+    @staticmethod
+    def _predicate_true(block_time: int, timestamp: int, closest: str) -> bool:
+        # before: ищем последний блок с time <= t; after: первый блок с time >= t (последний с time < t, +1)
+        return block_time <= timestamp if closest == 'before' else block_time < timestamp
+
+    def _bracket(self, chain_id, timestamp: int, closest: str) -> Tuple[Optional[Tuple[int, int]],
+                                                                        Optional[Tuple[int, int]]]:
+        """Ближайшие известные точки по обе стороны границы: (low, high) как (блок, время)"""
+        blocks, times = self._blocks[chain_id], self._times[chain_id]
+        # Время блоков не убывает - ищем по нему
+        if closest == 'before':
+            position = bisect.bisect_right(times, timestamp)
+        else:
+            position = bisect.bisect_left(times, timestamp)
+        low = (blocks[position - 1], times[position - 1]) if position > 0 else None
+        high = (blocks[position], times[position]) if position < len(blocks) else None
+        return low, high
+
+    @staticmethod
+    def _answer(low, high, closest: str) -> Optional[int]:
+        if low is None or high is None or high[0] != low[0] + 1:
+            return None
+        return low[0] if closest == 'before' else high[0]
+
+    def lookup(self, chain_id, timestamp: int, closest: str = 'before') -> Optional[int]:
+        """Ответ без сетевых запросов или None, если известных точек не хватает"""
+        with self._lock:
+            self._load(chain_id)
+            answer = self._answers.get((chain_id, timestamp, closest))
+            if answer is not None:
+                return answer
+            return self._answer(*self._bracket(chain_id, timestamp, closest), closest)
+
+    def resolve(self, chain_id, timestamp: int, closest: str,
+                fetch_time: Callable[[int], int], fetch_head: Callable[[], Tuple[int, int]],
+                max_requests: int = None) -> Optional[int]:
+        """
+        Блок по времени: интерполяция между известными точками с уточнением бинарным поиском.
+        fetch_time(блок) -> время блока, fetch_head() -> (последний блок, его время).
+        Каждая полученная точка запоминается, поэтому следующие запросы дешевле.
+        max_requests - бюджет запросов: если его не хватает (или известной точки ниже границы нет
+        и искать пришлось бы от генезиса) - ResolveBudgetExceeded, у вызывающего есть запасной способ.
+        """
+        answer = self.lookup(chain_id, timestamp, closest)
+        if answer is not None:
+            return answer
+
+        with self._lock:
+            low, high = self._bracket(chain_id, timestamp, closest)
+        if max_requests is not None and low is None:
+            raise ResolveBudgetExceeded(f"BlockTimeIndex[{chain_id}]: нет известных точек до {timestamp}")
+
+        requests_made = 0
+        if high is None:
+            head = fetch_head()
+            requests_made += 1
+            self.observe(chain_id, head[0], head[1], exact=True)
+            if self._predicate_true(head[1], timestamp, closest):
+                # Время еще не наступило: before - последний блок, after - блока пока нет
+                return head[0] if closest == 'before' else None
+            high = head
+        if low is None:
+            low = (-1, 0)  # Условная точка до генезиса
+
+        bisect_next = False
+        while high[0] - low[0] > 1:
+            if max_requests is not None and requests_made >= max_requests:
+                self.flush()  # Найденные точки пригодятся следующим запросам
+                raise ResolveBudgetExceeded(f"BlockTimeIndex[{chain_id}]: блок для {timestamp} не найден "
+                                            f"за {requests_made} запросов")
+            if bisect_next:
+                guess = (low[0] + high[0]) // 2
+            else:
+                # Интерполяция по времени, внутри (low, high)
+                span = max(1, high[1] - low[1])
+                guess = low[0] + (high[0] - low[0]) * (timestamp - low[1]) // span
+                guess = min(max(guess, low[0] + 1), high[0] - 1)
+
+            block_time = fetch_time(guess)
+            requests_made += 1
+            self.observe(chain_id, guess, block_time, exact=True)
+
+            interval = high[0] - low[0]
+            if self._predicate_true(block_time, timestamp, closest):
+                low = (guess, block_time)
+            else:
+                high = (guess, block_time)
+            # Если интерполяция не сократила интервал хотя бы вдвое - следующий шаг бинарный
+            bisect_next = not bisect_next and (high[0] - low[0]) * 2 > interval
+
+        self.flush()
+        logger.debug(f"BlockTimeIndex[{chain_id}]: блок для {timestamp} найден за {requests_made} запросов")
+        answer = low[0] if closest == 'before' else high[0]
+        return answer if answer >= 0 else None
+
+
+block_time_index = BlockTimeIndex()
@@ -1,4 +1,6 @@
+import asyncio
 import re
+import time
 from datetime import datetime, timedelta
 import pytz
 from telegram import Update, ReplyKeyboardMarkup
@@ -7,10 +9,23 @@ from web3 import Web3
 
 from config import ADD_ADDRESS, REMOVE_ADDRESS, REMOVE_CONFIRM, TODAY_WALLET_CHOICE, ADD_SHORTNAME, ADD_NETWORK, \
     TRON_API_KEY, TRON_EXPLORER, TRC20_SYMBOLS, logger
-from config import TZ_UTC_PLUS_3, CHAIN_TOKENS, SUPPORTED_CHAINS, EXPLORERS, ANKR_API_KEY
+from config import TZ_UTC_PLUS_3, CHAIN_TOKENS, SUPPORTED_CHAINS, EXPLORERS, ANKR_API_KEY, ANKR_CHAIN_MAPPING, \
+    TRACKER_SETTINGS, BOT_SETTINGS, LOG_SCANNER_SETTINGS, BLOCK_FOLLOWER_SETTINGS, TRON_INGEST_SETTINGS, \
+    LEDGER_SETTINGS, EXECUTOR_SETTINGS
 from etherscan_api import EtherscanAPI, EtherscanAPIError
-from trongrid_api import TronGridAPI
+from trongrid_api import TronGridAPI, tron_to_base58
 from tracker_factory import TrackerFactory  # Используем фабрику трекеров
+from db_manager import wallet_key
+from deadline import DeadlineExceeded, request_deadline
+from executor import get_executor
+from singleflight import get_singleflight
+from tracker_cache import tracker_cache
+from http_cache import response_cache
+from log_scanner import TransferLogScanner
+from block_follower import NativeBlockFollower, wallet_networks_for_chain
+from tron_event_ingester import Trc20EventIngester
+from address_index import get_address_index
+from circuit_breaker import CircuitOpenError, is_available, breakers_snapshot, probe_open_breakers
 
 
 # --- Вспомогательные функции ---
@@ -44,7 +59,7 @@ async def list_wallets(update: Update, context: CallbackContext):
     """Показывает список кошельков пользователя."""
     db = context.bot_data['db']
     user_id = update.message.from_user.id
-    wallets = db.get_wallets(user_id)
+    wallets = await db.get_wallets_async(user_id)
 
     if not wallets:
         await update.message.reply_text(
@@ -74,7 +89,7 @@ async def today_incomes_multi_chain(update: Update, context: CallbackContext):
     """Начало проверки поступлений за сегодня."""
     db = context.bot_data['db']
     user_id = update.message.from_user.id
-    wallets = db.get_wallets(user_id)
+    wallets = await db.get_wallets_async(user_id)
 
     if not wallets:
         await update.message.reply_text(
@@ -112,7 +127,7 @@ async def today_wallet_choice(update: Update, context: CallbackContext):
     selected_address = update.message.text.strip()
 
     # Проверяем, введен ли адрес или короткий идентификатор
-    wallets = db.get_wallets(user_id)
+    wallets = await db.get_wallets_async(user_id)
     wallet_data = None
 
     # Сначала ищем по полному адресу
@@ -149,6 +164,14 @@ async def today_wallet_choice(update: Update, context: CallbackContext):
     ts_start = int(today_start.timestamp())
     ts_end = int(today_end.timestamp())
 
+    if TRACKER_SETTINGS['stale_while_revalidate'] and LEDGER_SETTINGS['enabled']:
+        snapshot = await db.run(_ledger_snapshot, db, wallet_address, network, ts_start, ts_end)
+        if snapshot:
+            await _answer_stale(update, context, snapshot, wallet_address, shortname, network, today_start,
+                                ts_start, ts_end)
+            context.user_data.clear()
+            return ConversationHandler.END
+
     await update.message.reply_text(
         f'🔄 Получаю поступления за сегодня для кошелька `{wallet_address[:6]}...{wallet_address[-4:]}` ({shortname})...',
         reply_markup=get_main_menu(),
@@ -157,7 +180,7 @@ async def today_wallet_choice(update: Update, context: CallbackContext):
 
     try:
         # Получаем транзакции через фабрику трекеров
-        all_transactions, token_sums = await fetch_today_transactions_factory(
+        all_transactions, token_sums, skipped_chains = await fetch_today_transactions_factory(
             context=context,
             wallet_address=wallet_address,
             shortname=shortname,
@@ -165,12 +188,13 @@ async def today_wallet_choice(update: Update, context: CallbackContext):
             ts_start=ts_start,
             ts_end=ts_end
         )
+        skipped_note = format_skipped_chains_note(skipped_chains)
 
         if not all_transactions:
-            await update.message.reply_text(
-                "💸 Сегодня не было поступлений для этого кошелька.",
-                reply_markup=get_main_menu()
-            )
+            text = "💸 Сегодня не было поступлений для этого кошелька."
+            if skipped_note:
+                text += f"\n\n{skipped_note}"
+            await update.message.reply_text(text, reply_markup=get_main_menu())
             context.user_data.clear()
             return ConversationHandler.END
 
@@ -185,6 +209,9 @@ async def today_wallet_choice(update: Update, context: CallbackContext):
             today_start=today_start
         )
 
+        if skipped_note:
+            await update.message.reply_text(skipped_note, reply_markup=get_main_menu())
+
     except Exception as e:
         logger.error(f"Ошибка при получении транзакций: {e}")
         await update.message.reply_text(
@@ -196,188 +223,567 @@ async def today_wallet_choice(update: Update, context: CallbackContext):
     return ConversationHandler.END
 
 
-async def fetch_today_transactions_factory(context, wallet_address, shortname, network, ts_start, ts_end):
-    """Получает транзакции за указанный период через фабрику трекеров."""
+def _network_chains(network):
+    """[(chain_id, название)] сетей, которые опрашиваются для кошелька"""
+    if network == 'bnb':
+        return [(56, 'BNB Smart Chain')]
+    if network == 'tron':
+        return [('tron', 'TRON')]
+    return [(chain_id, chain_name) for chain_id, chain_name in SUPPORTED_CHAINS.items() if chain_id != 'tron']
+
+
+def _ledger_snapshot(db, wallet_address, network, ts_start, ts_end):
+    """
+    Окно из журнала без запросов к провайдерам: ([(chain_id, название, результат)], момент синхронизации
+    самой отстающей сети) или None, если журнал не покрывает начало окна ни в одной сети. Блокирующая функция.
+    """
+    results, synced_until = [], None
+    for chain_id, chain_name in _network_chains(network):
+        sync = db.get_ledger_sync(*_ledger_key(chain_id, wallet_address))
+        if not sync or sync[0] > ts_start or sync[1] < ts_start:
+            continue  # Сеть еще не синхронизирована за это окно - ее проверит фоновое обновление
+        synced_until = sync[1] if synced_until is None else min(synced_until, sync[1])
+        results.append((chain_id, chain_name, _ledger_result(db, chain_id, wallet_address, ts_start, ts_end)))
+    return (results, synced_until) if results else None
+
+
+def _transaction_key(tx):
+    return tx['chain_id'], tx['hash'], tx['token'], tx['amount']
+
+
+async def _answer_stale(update, context, snapshot, wallet_address, shortname, network, today_start, ts_start, ts_end):
+    """
+    Stale-while-revalidate: сразу отвечает поступлениями из журнала с указанием их возраста
+    и запускает фоновую проверку провайдеров.
+    """
+    results, synced_until = snapshot
     all_transactions = []
     token_sums = {}
+    for chain_id, chain_name, result in results:
+        _collect_tracker_result(result, chain_id, chain_name, wallet_address, all_transactions, token_sums)
+    known = {_transaction_key(tx) for tx in all_transactions}
 
+    if all_transactions:
+        await send_transactions(
+            update=update,
+            transactions=all_transactions,
+            token_sums=token_sums,
+            wallet_address=wallet_address,
+            shortname=shortname,
+            is_today_check=True,
+            today_start=today_start
+        )
+    else:
+        await update.message.reply_text("💸 Сегодня не было поступлений для этого кошелька.",
+                                        reply_markup=get_main_menu())
+
+    age_minutes = max(0, int(datetime.now(TZ_UTC_PLUS_3).timestamp()) - synced_until) // 60
+    await update.message.reply_text(
+        f"⏱ Данные на {datetime.fromtimestamp(synced_until, TZ_UTC_PLUS_3).strftime('%H:%M:%S')} "
+        f"({age_minutes} мин назад). Проверяю новые поступления - сообщу, если они появятся.",
+        reply_markup=get_main_menu()
+    )
+    context.application.create_task(
+        _revalidate_today(update, context, wallet_address, shortname, network, today_start, ts_start, ts_end, known),
+        update=update
+    )
+
+
+async def _revalidate_today(update, context, wallet_address, shortname, network, today_start, ts_start, ts_end,
+                            known):
+    """Фоновое обновление после ответа из журнала: сообщение - только если появились новые поступления"""
     try:
-        # Создаем трекер через фабрику
-        tracker_kwargs = {
-            'etherscan_api_key': context.bot_data['api_key'],
-            'tron_api_key': context.bot_data.get('tron_api_key', TRON_API_KEY),
-            'ankr_api_key': ANKR_API_KEY
+        all_transactions, token_sums, skipped_chains = await fetch_today_transactions_factory(
+            context=context,
+            wallet_address=wallet_address,
+            shortname=shortname,
+            network=network,
+            ts_start=ts_start,
+            ts_end=ts_end
+        )
+    except Exception as e:
+        logger.error(f"Ошибка фонового обновления {wallet_address}: {e}")
+        return
+
+    new_transactions = [tx for tx in all_transactions if _transaction_key(tx) not in known]
+    if not new_transactions:
+        logger.info(f"Фоновое обновление {wallet_address[:10]}...: новых поступлений нет")
+        return
+
+    await update.message.reply_text(
+        f"🆕 Новые поступления ({len(new_transactions)}) для кошелька "
+        f"`{wallet_address[:6]}...{wallet_address[-4:]}` ({shortname}):",
+        reply_markup=get_main_menu(),
+        parse_mode='Markdown'
+    )
+    await send_transactions(
+        update=update,
+        transactions=new_transactions,
+        token_sums=token_sums,
+        wallet_address=wallet_address,
+        shortname=shortname,
+        is_today_check=True,
+        today_start=today_start
+    )
+    skipped_note = format_skipped_chains_note(skipped_chains)
+    if skipped_note:
+        await update.message.reply_text(skipped_note, reply_markup=get_main_menu())
+
+
+def _create_chain_tracker(chain_id, tracker_kwargs):
+    """Создает трекер для конкретной сети из SUPPORTED_CHAINS."""
+    if chain_id == 'tron':
+        return TrackerFactory.create_tracker('tron', **tracker_kwargs)
+    if chain_id == 56:  # BNB Chain
+        return TrackerFactory.create_tracker('bnb', **tracker_kwargs)
+
+    ankr_chain = ANKR_CHAIN_MAPPING.get(chain_id)
+    if chain_id == 1 or not ankr_chain:
+        # Ethereum и сети без поддержки ANKR (ApeChain, Sei) идут через Etherscan V2
+        return TrackerFactory.create_tracker('eth', **{**tracker_kwargs, 'chain_id': chain_id})
+
+    return TrackerFactory.create_tracker(ankr_chain, **tracker_kwargs)
+
+
+def _fetch_chain_sync(chain_id, tracker_kwargs, wallet_address, ts_start, ts_end, deadline=None):
+    """
+    Получает транзакции одной сети. Выполняется в пуле потоков. Возвращает {chain_id: результат}.
+    deadline (time.monotonic()) - после него запросы к провайдеру не выполняются (DeadlineExceeded).
+    """
+    tracker = _create_chain_tracker(chain_id, tracker_kwargs)
+    with request_deadline(deadline):
+        return {chain_id: tracker.get_transactions(
+            address=wallet_address,
+            start_time=ts_start,
+            end_time=ts_end
+        )}
+
+
+def _fetch_multichain_sync(chain_ids, tracker_kwargs, wallet_address, ts_start, ts_end, deadline=None):
+    """Получает транзакции всех ANKR сетей одним запросом. Выполняется в пуле потоков."""
+    tracker = TrackerFactory.create_tracker('evm_multichain', chains=chain_ids, **tracker_kwargs)
+    with request_deadline(deadline):
+        return tracker.get_transactions_by_chain(
+            address=wallet_address,
+            start_time=ts_start,
+            end_time=ts_end
+        )
+
+
+def _tracker_kwargs(context):
+    """Ключи API для трекеров"""
+    return {
+        'etherscan_api_key': context.bot_data['api_key'],
+        'tron_api_key': context.bot_data.get('tron_api_key', TRON_API_KEY),
+        'ankr_api_key': ANKR_API_KEY
+    }
+
+
+def _ankr_chain_ids(network):
+    """chain_id сетей кошелька, которые опрашиваются через ANKR"""
+    if network == 'bnb':
+        return [56]
+    if network == 'eth':
+        return [chain_id for chain_id in SUPPORTED_CHAINS
+                if chain_id != 'tron' and _chain_breaker_key(chain_id)[0] == 'ankr']
+    return []
+
+
+def _prefetch_ankr_batch_sync(wallets, tracker_kwargs, ts_start, ts_end):
+    """
+    Опрашивает ANKR сети сразу для многих кошельков JSON-RPC batch'ами.
+    wallets - [(адрес, network)]. Возвращает {(wallet_key(адрес), network): {chain_id: результат}}.
+    Выполняется в пуле потоков.
+    """
+    prefetched = {}
+    by_network = {}
+    for wallet_address, network in wallets:
+        if _ankr_chain_ids(network):
+            by_network.setdefault(network, set()).add(wallet_key(wallet_address, network))
+
+    for network, addresses in by_network.items():
+        tracker = TrackerFactory.create_tracker('evm_multichain', chains=_ankr_chain_ids(network),
+                                                **tracker_kwargs)
+        results = tracker.get_transactions_by_chain_batch(sorted(addresses), start_time=ts_start, end_time=ts_end)
+        for wallet_address, chain_results in results.items():
+            prefetched[(wallet_address, network)] = chain_results
+
+    logger.info(f"ANKR batch: получены данные для {len(prefetched)} кошельков")
+    return prefetched
+
+
+def _scan_token_logs_sync(prefetched, ts_start, ts_end):
+    """
+    Заменяет токенную часть prefetched результатами eth_getLogs: один скан на сеть
+    для всех кошельков сразу. Выполняется в пуле потоков.
+    """
+    addresses_by_chain = {}
+    for (wallet_address, _), chain_results in prefetched.items():
+        for chain_id in chain_results:
+            addresses_by_chain.setdefault(chain_id, set()).add(wallet_address)
+
+    for chain_id, addresses in addresses_by_chain.items():
+        chain = ANKR_CHAIN_MAPPING[chain_id]
+        try:
+            transfers = TransferLogScanner(chain).scan_window(sorted(addresses), ts_start, ts_end)
+        except Exception as e:
+            logger.error(f"LogScanner[{chain}]: ошибка, остаются данные ANKR: {e}")
+            continue
+
+        for (wallet_address, _), chain_results in prefetched.items():
+            if chain_id in chain_results:
+                chain_results[chain_id]['tokens'] = transfers.get(wallet_address, [])
+
+    return prefetched
+
+
+def _collect_tracker_result(result, chain_id, chain_name, wallet_address, all_transactions, token_sums):
+    """Добавляет входящие транзакции из результата трекера в общий список и суммы."""
+    # Обрабатываем нативные транзакции
+    for tx in result.get('native', []):
+        if tx.get('to', '').lower() == wallet_address.lower():
+            amount = tx.get('value', 0)
+            token = tx.get('token', CHAIN_TOKENS.get(chain_id, 'UNKNOWN'))
+
+            all_transactions.append({
+                'chain_id': chain_id,
+                'chain_name': chain_name,
+                'wallet': wallet_address,
+                'amount': amount,
+                'token': token,
+                'sender': tx.get('from', ''),
+                'timestamp': tx.get('timestamp', 0),
+                'hash': tx.get('hash', '')
+            })
+            token_sums[token] = token_sums.get(token, 0) + amount
+
+    # Обрабатываем токенные транзакции
+    for tx in result.get('tokens', []):
+        if tx.get('to', '').lower() == wallet_address.lower():
+            amount = tx.get('value', 0)
+            if amount <= 0.01:
+                continue
+
+            token = tx.get('token_symbol', tx.get('token', 'UNKNOWN'))
+
+            all_transactions.append({
+                'chain_id': chain_id,
+                'chain_name': chain_name,
+                'wallet': wallet_address,
+                'amount': amount,
+                'token': token,
+                'sender': tx.get('from', ''),
+                'timestamp': tx.get('timestamp', 0),
+                'hash': tx.get('hash', '')
+            })
+            token_sums[token] = token_sums.get(token, 0) + amount
+
+
+def _chain_breaker_key(chain_id):
+    """(провайдер, сеть) circuit breaker'а, через который идет опрос сети."""
+    if chain_id == 1 or chain_id not in ANKR_CHAIN_MAPPING:
+        return 'etherscan', chain_id
+    return 'ankr', ANKR_CHAIN_MAPPING[chain_id]
+
+
+def _skip_reason(error) -> str:
+    """Причина пропуска сети в отчете по ошибке ее опроса"""
+    if isinstance(error, CircuitOpenError):
+        return 'сеть недоступна'
+    if isinstance(error, DeadlineExceeded):
+        return 'timed out'
+    return 'ошибка провайдера'
+
+
+def format_skipped_chains_note(skipped_chains) -> str:
+    """Формирует пометку о сетях, которые не попали в отчет (timed out / недоступны)."""
+    if not skipped_chains:
+        return ''
+    lines = [f"• {chain_name}: {reason}" for chain_name, reason in skipped_chains.items()]
+    return "⚠️ Не все сети проверены:\n" + "\n".join(lines) + "\nПоступления в этих сетях не учтены."
+
+
+def _ledger_key(chain_id, wallet_address):
+    """(network, chain_id, адрес) кошелька в таблице transfers"""
+    if chain_id == 'tron':
+        return 'tron', 'tron', tron_to_base58(wallet_address)
+    return 'evm', chain_id, wallet_address.lower()
+
+
+def _ledger_breaker_key(chain_id):
+    return ('trongrid', 'tron') if chain_id == 'tron' else _chain_breaker_key(chain_id)
+
+
+def _ledger_fetch_start(db, chain_id, wallet_address, ts_start, ts_end):
+    """
+    Начало промежутка для запроса к провайдеру, None - окно целиком уже в журнале.
+    Журнал не покрывает начало окна - все окно. Иначе - с точки последней синхронизации
+    с запасом sync_overlap: поздно проиндексированные переводы попадут в следующий запрос,
+    повторы отсекает ключ таблицы transfers.
+    """
+    if not LEDGER_SETTINGS['enabled']:
+        return ts_start
+    sync = db.get_ledger_sync(*_ledger_key(chain_id, wallet_address))
+    if not sync or sync[0] > ts_start or sync[1] < ts_start:
+        return ts_start
+    if sync[1] >= ts_end:
+        return None
+    return max(ts_start, sync[1] - LEDGER_SETTINGS['sync_overlap'])
+
+
+def _ledger_store(db, chain_id, wallet_address, result, fetch_start, fetched_at, ts_end):
+    """
+    Сохраняет успешный результат трекера в журнал и сдвигает точку синхронизации.
+    Ошибки и неполные окна трекеры пробрасывают исключением - сюда они не доходят.
+    """
+    network, ledger_chain, address = _ledger_key(chain_id, wallet_address)
+    saved = db.save_transfers(network, ledger_chain, result.get('native', []) + result.get('tokens', []),
+                              address=address)
+    if saved:
+        logger.info(f"Журнал: {saved} новых переводов {address[:10]}... в сети {chain_id}")
+
+    synced_from, synced_until = fetch_start, min(ts_end, fetched_at)
+    sync = db.get_ledger_sync(network, ledger_chain, address)
+    if sync and sync[0] <= fetch_start <= sync[1]:
+        synced_from, synced_until = sync[0], max(sync[1], synced_until)
+    db.set_ledger_sync(network, ledger_chain, address, synced_from, synced_until)
+
+
+def _ledger_result(db, chain_id, wallet_address, ts_start, ts_end):
+    """Входящие переводы кошелька за окно из журнала в формате результата трекера"""
+    result = {'native': [], 'tokens': []}
+    for tx_hash, log_index, sender, token, contract_address, amount, timestamp in db.get_transfers(
+            *_ledger_key(chain_id, wallet_address), ts_start, ts_end):
+        tx = {
+            'hash': tx_hash,
+            'from': sender,
+            'to': wallet_address,
+            'value': amount,
+            'timestamp': timestamp,
+            'token': token
         }
+        if log_index == -1:
+            result['native'].append(tx)
+        else:
+            result['tokens'].append({**tx, 'token_symbol': token, 'contract_address': contract_address})
+    return result
+
 
-        # Для Ethereum сетей указываем chain_id
+def _ledger_collect(db, result, chain_id, wallet_address, fetch_start, fetched_at, ts_start, ts_end):
+    """Сохраняет результат сети (если есть) и возвращает все окно из журнала. Блокирующая функция."""
+    if result is not None:
+        _ledger_store(db, chain_id, wallet_address, result, fetch_start, fetched_at, ts_end)
+    return _ledger_result(db, chain_id, wallet_address, ts_start, ts_end)
+
+
+def _cache_key(chain_id, wallet_address, ts_start, ts_end):
+    """Ключ tracker_cache: (провайдер, сеть, адрес, окно)"""
+    return _ledger_breaker_key(chain_id)[0], chain_id, _ledger_key(chain_id, wallet_address)[2], (ts_start, ts_end)
+
+
+def _collect_cached(chain_id, chain_name, wallet_address, ts_start, ts_end, all_transactions, token_sums):
+    """Результат сети за окно из tracker_cache в отчет. False - в кеше его нет."""
+    result = tracker_cache.get(_cache_key(chain_id, wallet_address, ts_start, ts_end))
+    if result is None:
+        return False
+    _collect_tracker_result(result, chain_id, chain_name, wallet_address, all_transactions, token_sums)
+    return True
+
+
+async def _collect_chain(db, result, chain_id, chain_name, wallet_address, fetch_start, fetched_at, ts_start, ts_end,
+                         all_transactions, token_sums):
+    """
+    Результат сети в отчет. С журналом: результат (за промежуток с fetch_start) сохраняется,
+    а в отчет идет все окно из БД. result=None - сеть целиком взята из журнала.
+    Результат за все окно кешируется: ошибки провайдера сюда не доходят.
+    """
+    if LEDGER_SETTINGS['enabled']:
+        result = await db.run(_ledger_collect, db, result, chain_id, wallet_address, fetch_start, fetched_at,
+                              ts_start, ts_end)
+    tracker_cache.set(_cache_key(chain_id, wallet_address, ts_start, ts_end), result)
+    _collect_tracker_result(result, chain_id, chain_name, wallet_address, all_transactions, token_sums)
+
+
+async def fetch_today_transactions_factory(context, wallet_address, shortname, network, ts_start, ts_end,
+                                           prefetched=None):
+    """
+    Получает транзакции за указанный период через фабрику трекеров.
+    Одновременные запросы одного кошелька за одно окно (повторное нажатие, несколько пользователей
+    с общим кошельком) выполняются один раз - все получают общий результат.
+    Возвращает (транзакции, суммы по токенам, {сеть: причина} для непроверенных сетей).
+    """
+    return await get_singleflight(context.bot_data).do(
+        ('today', wallet_key(wallet_address, network), network, ts_start, ts_end),
+        _fetch_today_transactions,
+        context, wallet_address, shortname, network, ts_start, ts_end, prefetched
+    )
+
+
+async def _fetch_today_transactions(context, wallet_address, shortname, network, ts_start, ts_end, prefetched=None):
+    """
+    Получает транзакции за указанный период через фабрику трекеров.
+    Сети, уже синхронизированные в журнале (таблица transfers), опрашиваются только за промежуток
+    после последней синхронизации.
+    prefetched - {chain_id: результат} уже полученных batch'ем ANKR сетей (ежедневная задача).
+    Возвращает (транзакции, суммы по токенам, {сеть: причина} для непроверенных сетей).
+    """
+    db = context.bot_data['db']
+    all_transactions = []
+    token_sums = {}
+    skipped_chains = {}
+    executor = get_executor(context.bot_data)
+    singleflight = get_singleflight(context.bot_data)
+    fetched_at = int(datetime.now(TZ_UTC_PLUS_3).timestamp())
+    # Дедлайн передается в трекеры: по таймауту поток пула прекращает опрос, а не только теряет ожидающего
+    deadline = time.monotonic() + TRACKER_SETTINGS['transaction_timeout']
+
+    try:
+        # Создаем трекер через фабрику
+        tracker_kwargs = _tracker_kwargs(context)
+
+        # Для Ethereum кошелька опрашиваем все поддерживаемые сети параллельно
         if network == 'eth':
-            # Обрабатываем все поддерживаемые сети
+            tasks = {}
+            ankr_chains = []
+            ankr_start = ts_end
             for chain_id, chain_name in SUPPORTED_CHAINS.items():
                 if chain_id == 'tron':
                     continue  # TRON обрабатываем отдельно
 
-                try:
-                    # Создаем трекер для каждой сети
-                    if chain_id == 56:  # BNB Chain
-                        tracker = TrackerFactory.create_tracker('bnb', **tracker_kwargs)
-                    elif chain_id == 1:  # Ethereum
-                        tracker = TrackerFactory.create_tracker('eth', **{**tracker_kwargs, 'chain_id': chain_id})
-                    else:
-                        # Для других сетей определяем название
-                        network_name = CHAIN_TOKENS.get(chain_id, 'eth').lower()
-                        if network_name in ['eth', 'bnb', 'tron']:
-                            # Уже обработали
-                            continue
-                        tracker = TrackerFactory.create_tracker(network_name, **tracker_kwargs)
-
-                    # Получаем транзакции
-                    result = tracker.get_transactions(
-                        address=wallet_address,
-                        start_time=ts_start,
-                        end_time=ts_end
-                    )
-
-                    # Обрабатываем нативные транзакции
-                    for tx in result.get('native', []):
-                        if tx.get('to', '').lower() == wallet_address.lower():
-                            amount = tx.get('value', 0)
-                            token = tx.get('token', CHAIN_TOKENS.get(chain_id, 'UNKNOWN'))
-
-                            all_transactions.append({
-                                'chain_id': chain_id,
-                                'chain_name': chain_name,
-                                'wallet': wallet_address,
-                                'amount': amount,
-                                'token': token,
-                                'sender': tx.get('from', ''),
-                                'timestamp': tx.get('timestamp', 0),
-                                'hash': tx.get('hash', '')
-                            })
-                            token_sums[token] = token_sums.get(token, 0) + amount
-
-                    # Обрабатываем токенные транзакции
-                    for tx in result.get('tokens', []):
-                        if tx.get('to', '').lower() == wallet_address.lower():
-                            amount = tx.get('value', 0)
-                            if amount <= 0.01:
-                                continue
-
-                            token = tx.get('token_symbol', tx.get('token', 'UNKNOWN'))
-
-                            all_transactions.append({
-                                'chain_id': chain_id,
-                                'chain_name': chain_name,
-                                'wallet': wallet_address,
-                                'amount': amount,
-                                'token': token,
-                                'sender': tx.get('from', ''),
-                                'timestamp': tx.get('timestamp', 0),
-                                'hash': tx.get('hash', '')
-                            })
-                            token_sums[token] = token_sums.get(token, 0) + amount
+                # Сеть уже проверялась за это окно в течение cache_duration
+                if _collect_cached(chain_id, chain_name, wallet_address, ts_start, ts_end, all_transactions,
+                                   token_sums):
+                    continue
 
-                except Exception as e:
-                    logger.error(f"Ошибка обработки сети {chain_id} ({chain_name}): {e}")
+                fetch_start = await db.run(_ledger_fetch_start, db, chain_id, wallet_address, ts_start, ts_end)
+                if fetch_start is None:
+                    # Окно уже целиком в журнале - провайдер не нужен
+                    await _collect_chain(db, None, chain_id, chain_name, wallet_address, None, fetched_at,
+                                         ts_start, ts_end, all_transactions, token_sums)
                     continue
 
-        elif network == 'bnb':
-            # Обрабатываем BNB Chain отдельно
-            try:
-                tracker = TrackerFactory.create_tracker('bnb', **tracker_kwargs)
-                result = tracker.get_transactions(
-                    address=wallet_address,
-                    start_time=ts_start,
-                    end_time=ts_end
-                )
+                # Сеть известна как недоступная - не тратим на нее время
+                if not is_available(*_chain_breaker_key(chain_id)):
+                    skipped_chains[chain_name] = 'сеть недоступна'
+                    continue
 
-                # Обрабатываем нативные BNB транзакции
-                for tx in result.get('native', []):
-                    if tx.get('to', '').lower() == wallet_address.lower():
-                        amount = tx.get('value', 0)
-                        token = tx.get('token', 'BNB')
+                if _chain_breaker_key(chain_id)[0] == 'ankr':
+                    if prefetched and chain_id in prefetched:
+                        await _collect_chain(db, prefetched[chain_id], chain_id, chain_name, wallet_address,
+                                             ts_start, fetched_at, ts_start, ts_end, all_transactions, token_sums)
+                    else:
+                        # Все ANKR сети - одним запросом ниже, с самой ранней точки синхронизации
+                        ankr_chains.append(chain_id)
+                        ankr_start = min(ankr_start, fetch_start)
+                    continue
 
-                        all_transactions.append({
-                            'chain_id': 56,
-                            'chain_name': 'BNB Smart Chain',
-                            'wallet': wallet_address,
-                            'amount': amount,
-                            'token': token,
-                            'sender': tx.get('from', ''),
-                            'timestamp': tx.get('timestamp', 0),
-                            'hash': tx.get('hash', '')
-                        })
-                        token_sums[token] = token_sums.get(token, 0) + amount
+                task = asyncio.create_task(singleflight.do(
+                    ('chain', wallet_address.lower(), chain_id, fetch_start, ts_end),
+                    executor.run,
+                    _fetch_chain_sync,
+                    chain_id=chain_id,
+                    tracker_kwargs=tracker_kwargs,
+                    wallet_address=wallet_address,
+                    ts_start=fetch_start,
+                    ts_end=ts_end,
+                    deadline=deadline
+                ))
+                tasks[task] = ([chain_id], fetch_start)
+
+            if ankr_chains:
+                task = asyncio.create_task(singleflight.do(
+                    ('chain', wallet_address.lower(), tuple(ankr_chains), ankr_start, ts_end),
+                    executor.run,
+                    _fetch_multichain_sync,
+                    chain_ids=ankr_chains,
+                    tracker_kwargs=tracker_kwargs,
+                    wallet_address=wallet_address,
+                    ts_start=ankr_start,
+                    ts_end=ts_end,
+                    deadline=deadline
+                ))
+                tasks[task] = (ankr_chains, ankr_start)
+
+            # Общий дедлайн на весь запрос: время ответа = самая медленная ответившая сеть
+            done, pending = await asyncio.wait(tasks, timeout=TRACKER_SETTINGS['transaction_timeout'])
+
+            for task, (chain_ids, fetch_start) in tasks.items():
+                if task in pending:
+                    task.cancel()
+                    for chain_id in chain_ids:
+                        skipped_chains[SUPPORTED_CHAINS[chain_id]] = 'timed out'
+                    logger.warning(f"Сети {chain_ids} не ответили за "
+                                   f"{TRACKER_SETTINGS['transaction_timeout']} сек")
+                    continue
 
-                # Обрабатываем BEP20 транзакции
-                for tx in result.get('tokens', []):
-                    if tx.get('to', '').lower() == wallet_address.lower():
-                        amount = tx.get('value', 0)
-                        if amount <= 0.01:
-                            continue
+                if task.exception():
+                    logger.error(f"Ошибка обработки сетей {chain_ids}: {task.exception()}")
+                    for chain_id in chain_ids:
+                        skipped_chains[SUPPORTED_CHAINS[chain_id]] = _skip_reason(task.exception())
+                    continue
 
-                        token = tx.get('token_symbol', 'UNKNOWN')
+                for chain_id, result in task.result().items():
+                    await _collect_chain(db, result, chain_id, SUPPORTED_CHAINS[chain_id], wallet_address,
+                                         fetch_start, fetched_at, ts_start, ts_end, all_transactions, token_sums)
 
-                        all_transactions.append({
-                            'chain_id': 56,
-                            'chain_name': 'BNB Smart Chain',
-                            'wallet': wallet_address,
-                            'amount': amount,
-                            'token': token,
-                            'sender': tx.get('from', ''),
-                            'timestamp': tx.get('timestamp', 0),
-                            'hash': tx.get('hash', '')
-                        })
-                        token_sums[token] = token_sums.get(token, 0) + amount
+        elif network == 'bnb':
+            # Обрабатываем BNB Chain отдельно
+            try:
+                if _collect_cached(56, 'BNB Smart Chain', wallet_address, ts_start, ts_end, all_transactions,
+                                   token_sums):
+                    return all_transactions, token_sums, skipped_chains
+
+                fetch_start = await db.run(_ledger_fetch_start, db, 56, wallet_address, ts_start, ts_end)
+                if fetch_start is None:
+                    result = None
+                elif prefetched and 56 in prefetched:
+                    result = prefetched[56]
+                    fetch_start = ts_start
+                else:
+                    result = (await singleflight.do(
+                        ('chain', wallet_address.lower(), 56, fetch_start, ts_end),
+                        executor.run,
+                        _fetch_chain_sync,
+                        chain_id=56,
+                        tracker_kwargs=tracker_kwargs,
+                        wallet_address=wallet_address,
+                        ts_start=fetch_start,
+                        ts_end=ts_end,
+                        deadline=deadline
+                    ))[56]
+                await _collect_chain(db, result, 56, 'BNB Smart Chain', wallet_address, fetch_start, fetched_at,
+                                     ts_start, ts_end, all_transactions, token_sums)
 
             except Exception as e:
                 logger.error(f"Ошибка обработки BNB Chain: {e}")
+                skipped_chains['BNB Smart Chain'] = _skip_reason(e)
 
         elif network == 'tron':
             # TRON обрабатываем отдельно
-            tracker = TrackerFactory.create_tracker('tron', **tracker_kwargs)
-            result = tracker.get_transactions(
-                address=wallet_address,
-                start_time=ts_start,
-                end_time=ts_end
-            )
+            if _collect_cached('tron', 'TRON', wallet_address, ts_start, ts_end, all_transactions, token_sums):
+                return all_transactions, token_sums, skipped_chains
 
-            # Обрабатываем нативные TRX транзакции
-            for tx in result.get('native', []):
-                if tx.get('to', '').lower() == wallet_address.lower():
-                    amount = tx.get('value', 0)
-
-                    all_transactions.append({
-                        'chain_id': 'tron',
-                        'chain_name': 'TRON',
-                        'wallet': wallet_address,
-                        'amount': amount,
-                        'token': 'TRX',
-                        'sender': tx.get('from', ''),
-                        'timestamp': tx.get('timestamp', 0),
-                        'hash': tx.get('hash', '')
-                    })
-                    token_sums['TRX'] = token_sums.get('TRX', 0) + amount
-
-            # Обрабатываем TRC20 транзакции
-            for tx in result.get('tokens', []):
-                if tx.get('to', '').lower() == wallet_address.lower():
-                    amount = tx.get('value', 0)
-                    if amount <= 0.01:
-                        continue
-
-                    token = tx.get('token_symbol', 'UNKNOWN')
-
-                    all_transactions.append({
-                        'chain_id': 'tron',
-                        'chain_name': 'TRON',
-                        'wallet': wallet_address,
-                        'amount': amount,
-                        'token': token,
-                        'sender': tx.get('from', ''),
-                        'timestamp': tx.get('timestamp', 0),
-                        'hash': tx.get('hash', '')
-                    })
-                    token_sums[token] = token_sums.get(token, 0) + amount
+            fetch_start = await db.run(_ledger_fetch_start, db, 'tron', wallet_address, ts_start, ts_end)
+            result = None
+            try:
+                if fetch_start is not None:
+                    result = (await singleflight.do(
+                        ('chain', wallet_key(wallet_address, network), 'tron', fetch_start, ts_end),
+                        executor.run,
+                        _fetch_chain_sync,
+                        chain_id='tron',
+                        tracker_kwargs=tracker_kwargs,
+                        wallet_address=wallet_address,
+                        ts_start=fetch_start,
+                        ts_end=ts_end,
+                        deadline=deadline
+                    ))['tron']
+            except Exception as e:
+                logger.error(f"Ошибка обработки TRON: {e}")
+                skipped_chains['TRON'] = _skip_reason(e)
+                return all_transactions, token_sums, skipped_chains
+            await _collect_chain(db, result, 'tron', 'TRON', wallet_address, fetch_start, fetched_at,
+                                 ts_start, ts_end, all_transactions, token_sums)
 
     except Exception as e:
         logger.error(f"Ошибка в fetch_today_transactions_factory: {e}")
@@ -392,11 +798,23 @@ async def fetch_today_transactions_factory(context, wallet_address, shortname, n
             ts_end=ts_end
         )
 
-    return all_transactions, token_sums
+    return all_transactions, token_sums, skipped_chains
 
 
 async def fetch_today_transactions_legacy(context, wallet_address, shortname, network, ts_start, ts_end):
     """Legacy метод получения транзакций (fallback)."""
+    return await get_executor(context.bot_data).run(
+        _fetch_today_transactions_legacy_sync,
+        context=context,
+        wallet_address=wallet_address,
+        network=network,
+        ts_start=ts_start,
+        ts_end=ts_end
+    )
+
+
+def _fetch_today_transactions_legacy_sync(context, wallet_address, network, ts_start, ts_end):
+    """Синхронная часть legacy метода, выполняется в пуле потоков."""
     all_transactions = []
     token_sums = {}
 
@@ -661,12 +1079,49 @@ async def send_transactions(update, transactions, token_sums, wallet_address, sh
             )
 
 
+def _wallets_to_prefetch(db, wallets, ts_start, ts_end):
+    """
+    (адрес, сеть) кошельков для batch запроса ANKR. Кошельки, у которых
+    все ANKR сети за окно уже в журнале, не опрашиваем. Блокирующая функция.
+    """
+    return [(wallet_address, network) for wallet_address, network in wallets
+            if any(_ledger_fetch_start(db, chain_id, wallet_address, ts_start, ts_end) is not None
+                   for chain_id in _ankr_chain_ids(network))]
+
+
+async def _fetch_unique_wallets(context, wallets, ts_start, ts_end, prefetched):
+    """
+    Опрашивает каждую пару (адрес, сеть) один раз, параллельно (не больше
+    EXECUTOR_SETTINGS['daily_concurrency'] одновременно): кошелек, который отслеживают
+    несколько пользователей, запрашивается у провайдеров один раз.
+    Возвращает {(wallet_key(адрес), сеть): результат fetch_today_transactions_factory или исключение}.
+    """
+    semaphore = asyncio.Semaphore(EXECUTOR_SETTINGS['daily_concurrency'])
+
+    async def fetch(wallet_address, network):
+        async with semaphore:
+            return await fetch_today_transactions_factory(
+                context=context,
+                wallet_address=wallet_address,
+                shortname=None,
+                network=network,
+                ts_start=ts_start,
+                ts_end=ts_end,
+                prefetched=prefetched.get((wallet_key(wallet_address, network), network))
+            )
+
+    results = await asyncio.gather(*(fetch(wallet_address, network) for wallet_address, network in wallets),
+                                   return_exceptions=True)
+    return {(wallet_key(wallet_address, network), network): result
+            for (wallet_address, network), result in zip(wallets, results)}
+
+
 async def process_today_incomes_job(context):
     """Ежедневная отправка отчетов."""
     db = context.bot_data['db']
     api_key = context.bot_data['api_key']
 
-    users = db.get_all_users()
+    users = await db.get_all_users_async()
     if not users:
         return
 
@@ -676,9 +1131,30 @@ async def process_today_incomes_job(context):
     ts_start = int(today_start.timestamp())
     ts_end = int(today_end.timestamp())
 
+    # Каждый уникальный кошелек опрашивается один раз, результаты расходятся всем подписанным пользователям
+    unique_wallets = await db.get_unique_wallets_async()
+
+    # ANKR сети всех кошельков - заранее, JSON-RPC batch'ами вместо запроса на каждый кошелек
+    try:
+        all_wallets = await db.run(_wallets_to_prefetch, db, unique_wallets, ts_start, ts_end)
+        prefetched = await get_executor(context.bot_data).run(
+            _prefetch_ankr_batch_sync, all_wallets, _tracker_kwargs(context), ts_start, ts_end
+        )
+        if LOG_SCANNER_SETTINGS['enabled']:
+            # Токены - одним eth_getLogs на сеть для всех кошельков
+            prefetched = await get_executor(context.bot_data).run(
+                _scan_token_logs_sync, prefetched, ts_start, ts_end
+            )
+    except Exception as e:
+        logger.error(f"Ошибка ANKR batch, кошельки будут опрошены по отдельности: {e}")
+        prefetched = {}
+
+    fetched = await _fetch_unique_wallets(context, unique_wallets, ts_start, ts_end, prefetched)
+    logger.info(f"Ежедневный отчет: опрошено {len(unique_wallets)} уникальных кошельков для {len(users)} пользователей")
+
     for user_id in users:
         try:
-            wallets = db.get_wallets(user_id)
+            wallets = await db.get_wallets_async(user_id)
             if not wallets:
                 await context.bot.send_message(
                     chat_id=user_id,
@@ -718,19 +1194,30 @@ async def process_today_incomes_job(context):
                 )
 
                 try:
-                    all_transactions, token_sums = await fetch_today_transactions_factory(
-                        context=context,
-                        wallet_address=wallet_address,
-                        shortname=shortname,
-                        network=network,
-                        ts_start=ts_start,
-                        ts_end=ts_end
-                    )
+                    result = fetched.get((wallet_key(wallet_address, network), network))
+                    if result is None:
+                        # Кошелек добавлен уже после начала задачи
+                        result = await fetch_today_transactions_factory(
+                            context=context,
+                            wallet_address=wallet_address,
+                            shortname=shortname,
+                            network=network,
+                            ts_start=ts_start,
+                            ts_end=ts_end,
+                            prefetched=prefetched.get((wallet_key(wallet_address, network), network))
+                        )
+                    if isinstance(result, BaseException):
+                        raise result
+                    all_transactions, token_sums, skipped_chains = result
+                    skipped_note = format_skipped_chains_note(skipped_chains)
 
                     if not all_transactions:
+                        text = f"💸 Не было поступлений за {today_start.strftime('%Y-%m-%d')} для кошелька `{wallet_address[:6]}...{wallet_address[-4:]}` ({shortname})."
+                        if skipped_note:
+                            text += f"\n\n{skipped_note}"
                         await context.bot.send_message(
                             chat_id=user_id,
-                            text=f"💸 Не было поступлений за {today_start.strftime('%Y-%m-%d')} для кошелька `{wallet_address[:6]}...{wallet_address[-4:]}` ({shortname}).",
+                            text=text,
                             reply_markup=get_main_menu(),
                             parse_mode='Markdown'
                         )
@@ -754,6 +1241,13 @@ async def process_today_incomes_job(context):
                         today_start=today_start
                     )
 
+                    if skipped_note:
+                        await context.bot.send_message(
+                            chat_id=user_id,
+                            text=skipped_note,
+                            reply_markup=get_main_menu()
+                        )
+
                 except Exception as e:
                     logger.error(f"Ошибка обработки кошелька {wallet_address} для пользователя {user_id}: {e}")
                     await context.bot.send_message(
@@ -768,6 +1262,180 @@ async def process_today_incomes_job(context):
             continue
 
 
+def _report_period(period, now_utc3):
+    """Сутки отчета [первые, после последних): 'weekly' - прошлые 7 дней, 'monthly' - прошлый месяц"""
+    today = now_utc3.date()
+    if period == 'monthly':
+        day_to = today.replace(day=1)
+        return (day_to - timedelta(days=1)).replace(day=1), day_to
+    return today - timedelta(days=7), today
+
+
+def _wallet_period_totals(db, wallet_address, network, day_from, day_to):
+    """[(token, сумма, переводов)] кошелька за сутки [day_from, day_to) из daily_totals"""
+    if network == 'tron':
+        return db.get_period_totals('tron', tron_to_base58(wallet_address), day_from, day_to)
+    return db.get_period_totals('evm', wallet_address.lower(), day_from, day_to, 56 if network == 'bnb' else None)
+
+
+async def process_period_report_job(context):
+    """
+    Недельный / месячный отчет (context.job.data - 'weekly' / 'monthly').
+    Суммы читаются из daily_totals одним запросом на кошелек - без запросов к провайдерам.
+    """
+    period = context.job.data
+    db = context.bot_data['db']
+    day_from, day_to = _report_period(period, datetime.now(TZ_UTC_PLUS_3))
+    title = f"{'неделю' if period == 'weekly' else 'месяц'} " \
+            f"({day_from.strftime('%Y-%m-%d')} — {(day_to - timedelta(days=1)).strftime('%Y-%m-%d')})"
+
+    for user_id in await db.get_all_users_async():
+        try:
+            blocks = []
+            for wallet_address, shortname, network in await db.get_wallets_async(user_id):
+                totals = await db.run(_wallet_period_totals, db, wallet_address, network,
+                                      day_from.isoformat(), day_to.isoformat())
+                block = f"👛 `{wallet_address[:6]}...{wallet_address[-4:]}` ({shortname})\n"
+                if totals:
+                    block += "".join(f"• {token}: {amount:.6f} ({transfers} шт.)\n"
+                                     for token, amount, transfers in totals)
+                else:
+                    block += "💸 Поступлений не было\n"
+                blocks.append(block)
+            if not blocks:
+                continue
+
+            # Сообщение Telegram ограничено 4096 символами - делим по кошелькам
+            messages = [f"💰 Поступления за {title} (UTC+3)\n\n"]
+            for block in blocks:
+                if len(messages[-1]) + len(block) > 3500:
+                    messages.append('')
+                messages[-1] += block + "\n"
+            messages[-1] += f"🕒 Отчет за: {datetime.now(TZ_UTC_PLUS_3).strftime('%H:%M:%S UTC+3')}"
+
+            for text in messages:
+                await context.bot.send_message(
+                    chat_id=user_id,
+                    text=text,
+                    reply_markup=get_main_menu(),
+                    parse_mode='Markdown'
+                )
+
+        except Exception as e:
+            logger.error(f"Ошибка {period} отчета для пользователя {user_id}: {e}")
+            continue
+
+
+async def probe_circuit_breakers_job(context):
+    """Фоновая проверка сетей с открытым circuit breaker (half-open probe)."""
+    await get_executor(context.bot_data).run(probe_open_breakers)
+
+
+def _invalidate_cached(transfers):
+    """Сбрасывает tracker_cache получателей новых переводов - кешированный результат уже неполный"""
+    for address in {tx.get('to', '') for tx in transfers}:
+        tracker_cache.invalidate(address)
+
+
+def _poll_sync(poll, deadline, *args):
+    """
+    Опрос фоновой задачи ingest. Выполняется в пуле потоков. Запросы к провайдеру не выходят
+    за deadline (следующий запуск задачи): зависший опрос не накладывается на следующий.
+    """
+    with request_deadline(deadline):
+        return poll(*args)
+
+
+async def follow_native_blocks_job(context):
+    """Ingest нативных переводов: новые блоки каждой сети из BLOCK_FOLLOWER_SETTINGS['chains']."""
+    db = context.bot_data['db']
+    executor = get_executor(context.bot_data)
+    followers = context.bot_data.setdefault('block_followers', {})
+
+    for chain in BLOCK_FOLLOWER_SETTINGS['chains']:
+        try:
+            follower = followers.get(chain)
+            if follower is None:
+                follower = followers[chain] = NativeBlockFollower(chain)
+
+            if not follower.breaker.allow_request():
+                continue  # Сеть недоступна, курсор остается на месте
+
+            watched = get_address_index(context.bot_data).watcher(wallet_networks_for_chain(follower.chain_id))
+            cursor = await db.get_chain_cursor_async(follower.chain_id)
+            deadline = time.monotonic() + BLOCK_FOLLOWER_SETTINGS['poll_interval']
+            transfers, new_cursor = await executor.run(_poll_sync, follower.poll, deadline, watched, cursor)
+
+            if transfers:
+                saved = await db.save_transfers_async('evm', follower.chain_id, transfers)
+                logger.info(f"BlockFollower[{chain}]: сохранено {saved} новых переводов")
+                if saved:
+                    _invalidate_cached(transfers)
+            if new_cursor != cursor:
+                await db.set_chain_cursor_async(follower.chain_id, new_cursor)
+
+        except Exception as e:
+            logger.error(f"BlockFollower[{chain}]: ошибка опроса: {e}")
+
+
+async def ingest_trc20_events_job(context):
+    """Ingest TRC20 переводов: Transfer события контрактов из TRON_INGEST_SETTINGS['contracts']."""
+    db = context.bot_data['db']
+    executor = get_executor(context.bot_data)
+    ingester = context.bot_data.get('trc20_ingester')
+    if ingester is None:
+        ingester = context.bot_data['trc20_ingester'] = Trc20EventIngester(context.bot_data.get('tron_api'))
+
+    if not ingester.api.breaker.allow_request():
+        return  # TRON недоступен, курсоры остаются на месте
+
+    watched = get_address_index(context.bot_data).watcher(('tron',))
+
+    for contract_address in TRON_INGEST_SETTINGS['contracts']:
+        stream = f"tron:{contract_address}"
+        try:
+            cursor = await db.get_chain_cursor_async(stream)
+            deadline = time.monotonic() + TRON_INGEST_SETTINGS['poll_interval']
+            transfers, new_cursor = await executor.run(_poll_sync, ingester.poll, deadline,
+                                                       contract_address, watched, cursor)
+
+            if transfers:
+                saved = await db.save_transfers_async('tron', 'tron', transfers)
+                logger.info(f"TronIngest[{contract_address}]: сохранено {saved} новых переводов")
+                if saved:
+                    _invalidate_cached(transfers)
+            if new_cursor != cursor:
+                await db.set_chain_cursor_async(stream, new_cursor)
+
+        except Exception as e:
+            logger.error(f"TronIngest[{contract_address}]: ошибка опроса: {e}")
+
+
+async def status_command(update: Update, context: CallbackContext):
+    """Показывает администратору состояние сетей провайдеров."""
+    if update.message.from_user.id not in BOT_SETTINGS['admin_ids']:
+        return
+
+    states = breakers_snapshot()
+    if not states:
+        await update.message.reply_text('ℹ️ Запросов к провайдерам еще не было.', reply_markup=get_main_menu())
+        return
+
+    icons = {'closed': '🟢', 'half_open': '🟡', 'open': '🔴'}
+    message = '📡 Состояние сетей провайдеров:\n\n'
+    for state in sorted(states, key=lambda x: (x['state'] == 'closed', x['provider'], str(x['chain']))):
+        message += f"{icons.get(state['state'], '⚪')} {state['provider']}:{state['chain']} - {state['state']}"
+        if state['failures']:
+            message += f" (ошибок: {state['failures']})"
+        message += '\n'
+
+    cache = tracker_cache.stats()
+    message += f"\n🗂 Кеш результатов: {cache['size']} записей, попаданий {cache['hits']}, промахов {cache['misses']}"
+    message += f"\n💾 Кеш ответов на диске: попаданий {response_cache.hits}, промахов {response_cache.misses}"
+
+    await update.message.reply_text(message, reply_markup=get_main_menu())
+
+
 async def help_command(update: Update, context: CallbackContext):
     """Показывает справку."""
     help_text = """
@@ -896,9 +1564,9 @@ async def add_wallet_address(update: Update, context: CallbackContext):
             return ADD_ADDRESS
 
     # Проверка, не добавлен ли уже такой адрес
-    wallets = db.get_wallets(user_id)
-    existing_addresses = [(addr.lower(), net) for addr, shortname, net in wallets]
-    if (wallet_address.lower(), network) in existing_addresses:
+    wallets = await db.get_wallets_async(user_id)
+    existing_addresses = [(wallet_key(addr, net), net) for addr, shortname, net in wallets]
+    if (wallet_key(wallet_address, network), network) in existing_addresses:
         await update.message.reply_text(
             '❌ Этот адрес уже добавлен в этой сети!\n\n'
             'Введите другой адрес или выберите "Отменить".',
@@ -953,7 +1621,9 @@ async def add_wallet_shortname(update: Update, context: CallbackContext):
         return ADD_SHORTNAME
 
     # Добавляем кошелек в базу данных
-    if db.add_wallet(user_id, wallet_address, shortname, network):
+    wallet_id = await db.add_wallet_async(user_id, wallet_address, shortname, network)
+    if wallet_id:
+        get_address_index(context.bot_data).add(wallet_id, wallet_address, network)
         short_wallet = f"{wallet_address[:6]}...{wallet_address[-4:]}"
         network_display = network.upper()
         if network == 'bnb':
@@ -992,7 +1662,7 @@ async def remove_wallet_start(update: Update, context: CallbackContext):
     """Начало удаления кошелька."""
     db = context.bot_data['db']
     user_id = update.message.from_user.id
-    wallets = db.get_wallets(user_id)
+    wallets = await db.get_wallets_async(user_id)
 
     if not wallets:
         await update.message.reply_text(
@@ -1028,7 +1698,7 @@ async def remove_wallet_address(update: Update, context: CallbackContext):
     user_id = update.message.from_user.id
     db = context.bot_data['db']
 
-    wallets = db.get_wallets(user_id)
+    wallets = await db.get_wallets_async(user_id)
     wallet_data = None
 
     # Ищем по полному адресу
@@ -1095,7 +1765,9 @@ async def remove_wallet_confirm(update: Update, context: CallbackContext):
     shortname = context.user_data['shortname']
     network = context.user_data['network']
 
-    db.remove_wallet(user_id, wallet_address, shortname, network)
+    wallet_id = await db.remove_wallet_async(user_id, wallet_address, shortname, network)
+    if wallet_id is not None:
+        get_address_index(context.bot_data).remove(wallet_id, wallet_address, network)
 
     short_addr = f"{wallet_address[:6]}...{wallet_address[-4:]}"
     network_display = network.upper()
@@ -0,0 +1,167 @@
+# circuit_breaker.py
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from config import logger, CIRCUIT_BREAKER_SETTINGS
+from deadline import DeadlineExceeded
+
+
+class CircuitOpenError(Exception):
+    """Сеть провайдера помечена как недоступная, запрос не выполнялся"""
+    pass
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker для пары (провайдер, сеть).
+    closed    - запросы идут как обычно, считаем подряд идущие ошибки;
+    open      - запросы сразу падают с CircuitOpenError;
+    half_open - фоновая проверка (probe) решает, закрыть breaker или снова открыть.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, provider: str, chain: Any,
+                 failure_threshold: int = None, recovery_timeout: float = None,
+                 ignored_exceptions: Tuple = ()):
+        self.provider = provider
+        self.chain = chain
+        self.failure_threshold = failure_threshold or CIRCUIT_BREAKER_SETTINGS['failure_threshold']
+        self.recovery_timeout = recovery_timeout or CIRCUIT_BREAKER_SETTINGS['recovery_timeout']
+        # Ошибки, которые не говорят о недоступности сети (квота, неверный адрес)
+        self.ignored_exceptions = ignored_exceptions
+        self.probe: Optional[Callable[[], Any]] = None
+
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._last_error = ''
+        self._lock = threading.Lock()
+
+    @property
+    def name(self) -> str:
+        return f"{self.provider}:{self.chain}"
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def allow_request(self) -> bool:
+        """Обычные запросы проходят только в закрытом состоянии"""
+        return self._state == self.CLOSED
+
+    def record_success(self):
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info(f"CircuitBreaker[{self.name}]: сеть снова доступна")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._last_error = ''
+
+    def record_failure(self, error: Exception = None):
+        with self._lock:
+            self._failures += 1
+            self._last_error = str(error) if error else ''
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning(f"CircuitBreaker[{self.name}]: открыт после {self._failures} ошибок "
+                                   f"({self._last_error})")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def call(self, func: Callable, *args, **kwargs) -> Any:
+        """Выполняет func через breaker"""
+        if not self.allow_request():
+            raise CircuitOpenError(f"{self.name} недоступна")
+        try:
+            result = func(*args, **kwargs)
+        except self.ignored_exceptions:
+            raise
+        except DeadlineExceeded:
+            raise  # Истек дедлайн вызывающего, а не сеть провайдера
+        except Exception as e:
+            self.record_failure(e)
+            raise
+        self.record_success()
+        return result
+
+    async def call_async(self, func: Callable, *args, **kwargs) -> Any:
+        """Асинхронный вариант call: func - корутинная функция"""
+        if not self.allow_request():
+            raise CircuitOpenError(f"{self.name} недоступна")
+        try:
+            result = await func(*args, **kwargs)
+        except self.ignored_exceptions:
+            raise
+        except DeadlineExceeded:
+            raise  # Истек дедлайн вызывающего, а не сеть провайдера
+        except Exception as e:
+            self.record_failure(e)
+            raise
+        self.record_success()
+        return result
+
+    def probe_due(self) -> bool:
+        return self._state == self.OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout
+
+    def run_probe(self):
+        """Пробный запрос в half-open состоянии (вызывается из фоновой задачи)"""
+        if self.probe is None:
+            # Нечем проверить - даем шанс обычным запросам
+            self.record_success()
+            return
+
+        with self._lock:
+            self._state = self.HALF_OPEN
+        try:
+            self.probe()
+        except Exception as e:
+            self.record_failure(e)
+            return
+        self.record_success()
+
+    def snapshot(self) -> Dict:
+        return {
+            'provider': self.provider,
+            'chain': self.chain,
+            'state': self._state,
+            'failures': self._failures,
+            'last_error': self._last_error,
+        }
+
+
+_breakers: Dict[Tuple[str, Any], CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(provider: str, chain: Any, ignored_exceptions: Tuple = ()) -> CircuitBreaker:
+    """Возвращает общий breaker для пары (провайдер, сеть)"""
+    key = (provider, chain)
+    with _breakers_lock:
+        breaker = _breakers.get(key)
+        if breaker is None:
+            breaker = CircuitBreaker(provider, chain, ignored_exceptions=ignored_exceptions)
+            _breakers[key] = breaker
+        return breaker
+
+
+def is_available(provider: str, chain: Any) -> bool:
+    """False, если сеть известна как недоступная (breaker не закрыт)"""
+    breaker = _breakers.get((provider, chain))
+    return breaker is None or breaker.allow_request()
+
+
+def breakers_snapshot() -> list:
+    """Состояние всех breaker'ов"""
+    return [breaker.snapshot() for breaker in list(_breakers.values())]
+
+
+def probe_open_breakers():
+    """Проверяет открытые breaker'ы, у которых истек recovery_timeout. Блокирующая функция."""
+    for breaker in list(_breakers.values()):
+        if breaker.probe_due():
+            logger.info(f"CircuitBreaker[{breaker.name}]: пробный запрос")
+            breaker.run_probe()
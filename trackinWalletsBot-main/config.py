@@ -261,6 +261,141 @@ BSC_RPC_SETTINGS = {
     'direct_block_parse_limit': 200,
 }
 
+# ============================================
+#  НАСТРОЙКИ ВЫПОЛНЕНИЯ ТРЕКЕРОВ
+# ============================================
+
+# Трекеры работают через синхронные HTTP-клиенты, поэтому выполняются
+# в отдельном пуле потоков, чтобы не блокировать event loop бота
+EXECUTOR_SETTINGS = {
+    'max_workers': int(os.getenv('TRACKER_MAX_WORKERS', '32')),  # Хватает на параллельный опрос всех сетей
+    'thread_name_prefix': 'tracker',
+    'concurrent_updates': 64,  # Сколько апдейтов Telegram обрабатывается одновременно (одного чата - по очереди)
+    'daily_concurrency': 8,  # Сколько уникальных кошельков ежедневная задача опрашивает одновременно
+}
+
+# ============================================
+#  НАСТРОЙКИ HTTP СОЕДИНЕНИЙ
+# ============================================
+
+# Одна keep-alive сессия на хост провайдера: TLS handshake делается один раз
+HTTP_SETTINGS = {
+    'pool_connections': 10,  # Количество хостов, для которых хранятся пулы
+    'pool_maxsize': 32,  # Максимум соединений в пуле на один хост
+    'keepalive_expiry': 60,  # Сколько секунд держать простаивающее соединение
+    'http2': False,  # HTTP/2 для async клиента (требует пакет h2)
+    'headers': {
+        'Accept-Encoding': 'gzip, deflate',
+        'Accept': 'application/json',
+    },
+}
+
+# ============================================
+#  НАСТРОЙКИ ETHERSCAN API
+# ============================================
+
+# Квота ключа Etherscan V2 общая для всех chainid и всех пользователей
+ETHERSCAN_SETTINGS = {
+    'rate_limit_per_sec': float(os.getenv('ETHERSCAN_RATE_LIMIT', '5')),  # Запросов в секунду на ключ
+    'burst': 5,  # Сколько запросов можно отправить подряд без ожидания
+    'rate_limit_backoff': 1.0,  # Пауза (сек), если Etherscan ответил "rate limit" без Retry-After
+    'max_attempts': 4,  # Попыток на временные ошибки (сеть, 5xx, rate limit)
+    'page_size': 1000,  # Строк на страницу txlist/tokentx
+    'max_result_window': 10000,  # Лимит Etherscan на page * offset в одном запросе
+}
+
+# ============================================
+#  НАСТРОЙКИ TRONGRID API
+# ============================================
+
+TRONGRID_SETTINGS = {
+    'page_size': 200,  # Максимальный limit TronGrid на страницу
+    'max_pages': 50,  # Предохранитель от бесконечной пагинации по fingerprint
+    'trc20_allowlist_only': False,  # True - запрашивать только токены из TRC20_SYMBOLS
+}
+
+# ============================================
+#  CIRCUIT BREAKER (ПРОВАЙДЕР + СЕТЬ)
+# ============================================
+
+CIRCUIT_BREAKER_SETTINGS = {
+    'failure_threshold': 3,  # Ошибок подряд, после которых сеть считается недоступной
+    'recovery_timeout': 300,  # Через сколько секунд делать пробный запрос (half-open)
+    'probe_interval': 60,  # Как часто фоновая задача проверяет открытые breaker'ы
+}
+
+# ============================================
+#  ЖУРНАЛ ПЕРЕВОДОВ (SQLite)
+# ============================================
+
+# Полученные трекерами переводы хранятся в таблице transfers: отчеты читают их из БД,
+# у провайдеров запрашивается только промежуток после последней синхронизации
+LEDGER_SETTINGS = {
+    'enabled': os.getenv('LEDGER_ENABLED', 'true').lower() == 'true',
+    'sync_overlap': 300,  # Секунд повторного чтения перед точкой синхронизации (задержка индексации провайдеров)
+}
+
+# ============================================
+#  ИНДЕКС ВРЕМЕНИ БЛОКОВ
+# ============================================
+
+# Точки (блок, время), которые уже видели трекеры - для перевода границ суток в блоки без запросов
+BLOCK_INDEX_SETTINGS = {
+    'min_sample_gap': 100,  # Не хранить точки ближе N блоков к уже известной (кроме найденных границ)
+    'flush_every': 50,  # Писать точки в БД пачками по N
+    'max_refine_requests': 6,  # Бюджет запросов уточнения для Etherscan; не хватило - getblocknobytime
+}
+
+# ============================================
+#  ДИСКОВЫЙ КЕШ ОТВЕТОВ ПРОВАЙДЕРОВ
+# ============================================
+
+# Ответы за окна, закончившиеся раньше горизонта финальности, больше не меняются и хранятся бессрочно
+HTTP_CACHE_SETTINGS = {
+    'enabled': os.getenv('HTTP_CACHE_ENABLED', 'true').lower() == 'true',
+    'file': 'http_cache.db',
+    'finality': 3600,  # Окно, закончившееся раньше N секунд назад, считается неизменным
+    'open_ttl': 60,  # Время жизни ответов за незакрытые окна (меньше LEDGER_SETTINGS['sync_overlap'])
+}
+
+# ============================================
+#  СКАНЕР TRANSFER ЛОГОВ (eth_getLogs)
+# ============================================
+
+# Один eth_getLogs на сеть для всех отслеживаемых адресов (topic2 = список адресов)
+LOG_SCANNER_SETTINGS = {
+    'enabled': os.getenv('LOG_SCANNER_ENABLED', 'false').lower() == 'true',  # Токены в ежедневной задаче через eth_getLogs
+    'max_blocks_per_query': BSC_RPC_SETTINGS['max_blocks_to_scan'],  # Начальный размер диапазона блоков
+    'max_addresses_per_query': 500,  # Адресов в OR-списке topic2 одного запроса
+    'timeout': BSC_RPC_SETTINGS['timeout'],
+}
+
+# ============================================
+#  СЛЕЖЕНИЕ ЗА БЛОКАМИ (НАТИВНЫЕ ПЕРЕВОДЫ)
+# ============================================
+
+# Нативные переводы не попадают в логи: читаем новые блоки целиком и сверяем 'to'
+# с множеством всех отслеживаемых адресов. Стоимость зависит от нагрузки сети, а не от числа кошельков.
+BLOCK_FOLLOWER_SETTINGS = {
+    'enabled': os.getenv('BLOCK_FOLLOWER_ENABLED', 'false').lower() == 'true',
+    'chains': [chain for chain in os.getenv('BLOCK_FOLLOWER_CHAINS', 'bsc').split(',') if chain],  # Имена ANKR сетей
+    'poll_interval': 15,  # Секунд между опросами
+    'max_blocks_per_poll': 100,  # Сколько блоков забирать за один опрос (batch eth_getBlockByNumber)
+    'confirmations': 3,  # Не читаем последние N блоков (реорги)
+}
+
+# ============================================
+#  INGEST TRC20 СОБЫТИЙ TRON
+# ============================================
+
+# Один поток Transfer событий на контракт токена вместо истории по каждому TRON кошельку
+TRON_INGEST_SETTINGS = {
+    'enabled': os.getenv('TRON_INGEST_ENABLED', 'false').lower() == 'true',
+    'contracts': [contract for contract in os.getenv('TRON_INGEST_CONTRACTS', '').split(',') if contract]
+                 or list(TRC20_SYMBOLS),  # По умолчанию все токены из TRC20_SYMBOLS (USDT первым)
+    'poll_interval': 15,  # Секунд между опросами
+}
+
 # ============================================
 #  НАСТРОЙКИ ANKR API (PREMIUM ТАРИФ)
 # ============================================
@@ -350,6 +485,12 @@ ADD_SHORTNAME = 5
 
 DATABASE_FILE = 'wallets.db'
 
+# Соединение SQLite на поток (WAL), запросы из event loop идут через отдельный пул
+DB_SETTINGS = {
+    'max_workers': 4,  # Потоков пула БД
+    'busy_timeout': 5,  # Сколько секунд ждать блокировку записи
+}
+
 # ============================================
 #  НАСТРОЙКИ ОТЧЕТОВ
 # ============================================
@@ -407,8 +548,10 @@ REPORT_SETTINGS = {
 
 TRACKER_SETTINGS = {
     'max_transactions_per_request': 1000,  # Для премиум тарифа
-    'transaction_timeout': 60,  # Таймаут для получения транзакций
+    'transaction_timeout': 60,  # Общий дедлайн на опрос всех сетей кошелька (сек)
     'cache_duration': 300,  # Длительность кэша в секундах (5 минут)
+    # "Суммы за день": сразу ответ из журнала (с его возрастом), проверка провайдеров - в фоне
+    'stale_while_revalidate': os.getenv('STALE_WHILE_REVALIDATE', 'true').lower() == 'true',
     'retry_on_failure': True,
     'retry_delay': 2,
     'max_retries': 3,
@@ -1,22 +1,92 @@
+import asyncio
+import functools
 import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable
 
-from config import logger, DATABASE_FILE
+from config import logger, DATABASE_FILE, DB_SETTINGS, TZ_UTC_PLUS_3
+from trongrid_api import tron_to_base58
+
+# Сутки отчетов - по UTC+3: сдвиг для date(timestamp, 'unixepoch') в SQL
+DAY_OFFSET = int(TZ_UTC_PLUS_3.utcoffset(None).total_seconds())
+
+# Перевод без индекса лога, для которого есть тот же перевод с индексом (или наоборот) - t.* против r.*
+TWIN_TRANSFER = '''r.network = {t}.network AND r.chain_id = {t}.chain_id AND r.tx_hash = {t}.tx_hash
+                   AND r.address = {t}.address AND r.contract_address = {t}.contract_address
+                   AND r.value_raw = {t}.value_raw'''
+
+
+def wallet_key(wallet_address: str, network: str) -> str:
+    """
+    Адрес кошелька в том виде, в каком он хранится в журнале: TRON - base58 (регистр важен,
+    hex 41... приводится к base58), EVM - в нижнем регистре.
+    """
+    if network == 'tron':
+        return tron_to_base58(wallet_address)
+    return wallet_address.lower()
 
 
 class DatabaseManager:
+    """
+    SQLite в режиме WAL: чтения не блокируют запись. Соединение - свое у каждого потока,
+    курсоры живут одну операцию. Из event loop бот обращается к базе через *_async методы,
+    которые выполняют запрос в отдельном небольшом пуле потоков.
+    """
+
     def __init__(self, db_file=DATABASE_FILE):
+        self.db_file = db_file
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=DB_SETTINGS['max_workers'], thread_name_prefix='db')
         try:
-            self.conn = sqlite3.connect(db_file, check_same_thread=False)
-            self.cursor = self.conn.cursor()
-            self._create_tables()
+            with self._cursor(commit=True) as cursor:
+                self._create_tables(cursor)
             logger.info("Соединение с базой данных установлено.")
         except sqlite3.Error as e:
             logger.error(f"Ошибка подключения к БД: {e}")
             raise
 
-    def _create_tables(self):
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Соединение текущего потока (создается при первом обращении)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # check_same_thread=False только для close(): соединением пользуется один поток
+            conn = sqlite3.connect(self.db_file, timeout=DB_SETTINGS['busy_timeout'], check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")  # В WAL режиме fsync только на checkpoint
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def _cursor(self, commit: bool = False):
+        """Курсор на одну операцию; commit=True - фиксирует транзакцию (откатывает при ошибке)"""
+        conn = self.conn
+        cursor = conn.cursor()
+        try:
+            yield cursor
+            if commit:
+                conn.commit()
+        except Exception:
+            if commit:
+                conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """Выполняет синхронную работу с базой в пуле БД, не блокируя event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, functools.partial(func, *args, **kwargs))
+
+    def _create_tables(self, cursor):
         """Створює таблиці, якщо вони не існують."""
-        self.cursor.execute('''CREATE TABLE IF NOT EXISTS wallets
+        cursor.execute('''CREATE TABLE IF NOT EXISTS wallets
                                (
                                    user_id INTEGER,
                                    wallet_address TEXT,
@@ -25,55 +95,324 @@ class DatabaseManager:
                                    last_tx_hash TEXT
                                )''')
         # Унікальний індекс для user_id, shortname і network
-        self.cursor.execute('''CREATE UNIQUE INDEX IF NOT EXISTS idx_user_shortname_network
+        cursor.execute('''CREATE UNIQUE INDEX IF NOT EXISTS idx_user_shortname_network
                                ON wallets (user_id, shortname, network)''')
-        self.conn.commit()
+        # Входящие переводы из ingest-режимов. network - семейство сетей ('evm' / 'tron'),
+        # chain_id - id EVM сети или 'tron', log_index = -1 для нативных переводов
+        cursor.execute('''CREATE TABLE IF NOT EXISTS transfers
+                               (
+                                   network TEXT,
+                                   chain_id INTEGER,
+                                   tx_hash TEXT,
+                                   log_index INTEGER,
+                                   address TEXT,
+                                   sender TEXT,
+                                   token TEXT,
+                                   contract_address TEXT,
+                                   amount REAL,
+                                   value_raw TEXT,
+                                   timestamp INTEGER,
+                                   block_number INTEGER,
+                                   PRIMARY KEY (network, chain_id, tx_hash, log_index)
+                               )''')
+        # Отчеты читают переводы адреса за период
+        cursor.execute('''CREATE INDEX IF NOT EXISTS idx_transfers_address
+                               ON transfers (address, network, timestamp)''')
+        # До какого момента переводы адреса в сети уже получены трекерами
+        cursor.execute('''CREATE TABLE IF NOT EXISTS ledger_sync
+                               (
+                                   network TEXT,
+                                   chain_id,
+                                   address TEXT,
+                                   synced_from INTEGER,
+                                   synced_until INTEGER,
+                                   PRIMARY KEY (network, chain_id, address)
+                               )''')
+        # Суммы поступлений по (адрес, сутки UTC+3, сеть, токен) для недельных и месячных отчетов.
+        # Пополняется триггером при вставке новых переводов; правила совпадают с отчетом за день:
+        # токены до 0.01 не учитываются, перевод без индекса лога и он же с индексом считаются один раз
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'daily_totals'")
+        daily_totals_exist = cursor.fetchone() is not None
+        cursor.execute('''CREATE TABLE IF NOT EXISTS daily_totals
+                               (
+                                   address TEXT,
+                                   day TEXT,
+                                   network TEXT,
+                                   chain_id,
+                                   token TEXT,
+                                   amount REAL,
+                                   transfers INTEGER,
+                                   PRIMARY KEY (address, day, network, chain_id, token)
+                               )''')
+        day = f"date(NEW.timestamp + {DAY_OFFSET}, 'unixepoch')"
+        cursor.execute(f'''CREATE TRIGGER IF NOT EXISTS transfers_daily_totals AFTER INSERT ON transfers
+                                WHEN (NEW.log_index = -1 OR NEW.amount > 0.01) AND NOT EXISTS (
+                                    SELECT 1 FROM transfers r
+                                    WHERE {TWIN_TRANSFER.format(t='NEW')}
+                                      AND ((NEW.log_index < -1 AND r.log_index >= 0)
+                                           OR (NEW.log_index >= 0 AND r.log_index < -1)))
+                                BEGIN
+                                    INSERT OR IGNORE INTO daily_totals (address, day, network, chain_id, token,
+                                                                        amount, transfers)
+                                    VALUES (NEW.address, {day}, NEW.network, NEW.chain_id, NEW.token, 0, 0);
+                                    UPDATE daily_totals SET amount = amount + NEW.amount, transfers = transfers + 1
+                                    WHERE address = NEW.address AND day = {day} AND network = NEW.network
+                                      AND chain_id = NEW.chain_id AND token = NEW.token;
+                                END''')
+        if not daily_totals_exist:
+            self._rebuild_daily_totals(cursor)
+        # Курсоры последнего полученного перевода заменены ledger_sync - таблица больше не ведется
+        cursor.execute("DROP TABLE IF EXISTS sync_cursors")
+        # Курсор ingest-режима: последний обработанный блок сети
+        # (для потоков событий TRON - 'tron:<контракт>' и время блока в мс)
+        cursor.execute('''CREATE TABLE IF NOT EXISTS chain_cursors
+                               (
+                                   chain_id PRIMARY KEY,
+                                   block_number INTEGER
+                               )''')
+
+    @staticmethod
+    def _rebuild_daily_totals(cursor):
+        """Заполняет daily_totals по уже сохраненным переводам (первый запуск с таблицей)"""
+        cursor.execute("DELETE FROM daily_totals")
+        cursor.execute(f"""INSERT INTO daily_totals (address, day, network, chain_id, token, amount, transfers)
+                                SELECT address, date(timestamp + {DAY_OFFSET}, 'unixepoch'), network, chain_id, token,
+                                       SUM(amount), COUNT(*)
+                                FROM transfers t
+                                WHERE (log_index = -1 OR amount > 0.01)
+                                  AND NOT (log_index < -1 AND EXISTS (
+                                      SELECT 1 FROM transfers r WHERE {TWIN_TRANSFER.format(t='t')} AND r.log_index >= 0))
+                                GROUP BY 1, 2, 3, 4, 5""")
+        if cursor.rowcount:
+            logger.info(f"daily_totals: заполнено {cursor.rowcount} записей по сохраненным переводам")
 
     def get_wallets(self, user_id: int):
         """Отримує всі гаманці для конкретного user_id з мережею."""
-        self.cursor.execute("SELECT wallet_address, shortname, network FROM wallets WHERE user_id = ?", (user_id,))
-        return self.cursor.fetchall()
+        with self._cursor() as cursor:
+            cursor.execute("SELECT wallet_address, shortname, network FROM wallets WHERE user_id = ?", (user_id,))
+            return cursor.fetchall()
 
     def get_wallet(self, user_id: int, address: str):
         """Отримує один гаманець з мережею."""
-        self.cursor.execute("SELECT shortname, network FROM wallets WHERE user_id = ? AND wallet_address = ?", (user_id, address))
-        return self.cursor.fetchone()
+        with self._cursor() as cursor:
+            cursor.execute("SELECT shortname, network FROM wallets WHERE user_id = ? AND wallet_address = ?", (user_id, address))
+            return cursor.fetchone()
 
-    def add_wallet(self, user_id: int, address: str, shortname: str, network: str) -> bool:
-        """Додає новий гаманець з мережею. Повертає True при успіху, False якщо адреса або shortname вже існує."""
+    def add_wallet(self, user_id: int, address: str, shortname: str, network: str):
+        """Додає новий гаманець з мережею. Повертає id строки при успіху, False якщо адреса або shortname вже існує."""
         if self.get_wallet(user_id, address):
             logger.info(f"Кошелек {address} уже существует для user_id {user_id}")
             return False
-        self.cursor.execute("SELECT 1 FROM wallets WHERE user_id = ? AND shortname = ? AND network = ?", (user_id, shortname, network))
-        if self.cursor.fetchone():
-            logger.info(f"Название {shortname} ({network}) уже используется для user_id {user_id}")
-            return False
         try:
-            self.cursor.execute("INSERT INTO wallets (user_id, wallet_address, shortname, network, last_tx_hash) VALUES (?, ?, ?, ?, ?)",
+            with self._cursor(commit=True) as cursor:
+                cursor.execute("SELECT 1 FROM wallets WHERE user_id = ? AND shortname = ? AND network = ?", (user_id, shortname, network))
+                if cursor.fetchone():
+                    logger.info(f"Название {shortname} ({network}) уже используется для user_id {user_id}")
+                    return False
+                cursor.execute("INSERT INTO wallets (user_id, wallet_address, shortname, network, last_tx_hash) VALUES (?, ?, ?, ?, ?)",
                                (user_id, address, shortname, network, ''))
-            self.conn.commit()
+                wallet_id = cursor.lastrowid
             logger.info(f"Добавлен кошелек {address} ({network}) из shortname {shortname} для user_id {user_id}")
-            return True
+            return wallet_id
         except sqlite3.IntegrityError as e:
             logger.error(f"Ошибка добавления кошелька: {e}")
             return False
 
     def remove_wallet(self, user_id: int, address: str, shortname: str, network: str):
-        """Видаляє гаманець з мережею."""
-        self.cursor.execute("DELETE FROM wallets WHERE user_id = ? AND wallet_address = ? AND shortname = ? AND network = ?",
+        """Видаляє гаманець з мережею. Возвращает id удаленной строки или None."""
+        with self._cursor(commit=True) as cursor:
+            cursor.execute("SELECT rowid FROM wallets WHERE user_id = ? AND wallet_address = ? AND shortname = ? AND network = ?",
+                           (user_id, address, shortname, network))
+            row = cursor.fetchone()
+            cursor.execute("DELETE FROM wallets WHERE user_id = ? AND wallet_address = ? AND shortname = ? AND network = ?",
                            (user_id, address, shortname, network))
-        self.conn.commit()
+        return row[0] if row else None
 
     def get_all_users(self):
         """Повертає список user_id всіх користувачів."""
         try:
-            self.cursor.execute("SELECT DISTINCT user_id FROM wallets")
-            return [row[0] for row in self.cursor.fetchall()]
+            with self._cursor() as cursor:
+                cursor.execute("SELECT DISTINCT user_id FROM wallets")
+                return [row[0] for row in cursor.fetchall()]
         except Exception as e:
             logger.error(f"Ошибка при получении пользователей: {e}")
             return []
 
+    def get_all_wallets(self):
+        """Все кошельки: (user_id, wallet_address, shortname, network)."""
+        with self._cursor() as cursor:
+            cursor.execute("SELECT user_id, wallet_address, shortname, network FROM wallets")
+            return cursor.fetchall()
+
+    def get_wallet_keys(self):
+        """Все кошельки для индекса адресов: (id строки, wallet_address, network)."""
+        with self._cursor() as cursor:
+            cursor.execute("SELECT rowid, wallet_address, network FROM wallets")
+            return cursor.fetchall()
+
+    def get_wallets_by_ids(self, wallet_ids):
+        """Кошельки по id строк: [(id, user_id, wallet_address, shortname, network)]."""
+        wallet_ids = list(wallet_ids)
+        if not wallet_ids:
+            return []
+        with self._cursor() as cursor:
+            cursor.execute(f"SELECT rowid, user_id, wallet_address, shortname, network FROM wallets "
+                           f"WHERE rowid IN ({','.join('?' * len(wallet_ids))})", wallet_ids)
+            return cursor.fetchall()
+
+    def get_unique_wallets(self):
+        """
+        Уникальные пары (wallet_address, network) по всем пользователям. Адреса сравниваются
+        по ключу журнала (wallet_key): hex и base58 форма одного TRON кошелька - одна пара.
+        """
+        with self._cursor() as cursor:
+            cursor.execute("SELECT DISTINCT wallet_address, network FROM wallets")
+            rows = cursor.fetchall()
+        return sorted({(wallet_key(wallet_address, network), network) for wallet_address, network in rows})
+
+    def get_chain_cursor(self, chain_id):
+        """Последний обработанный блок сети или None."""
+        with self._cursor() as cursor:
+            cursor.execute("SELECT block_number FROM chain_cursors WHERE chain_id = ?", (chain_id,))
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+    def set_chain_cursor(self, chain_id, block_number: int):
+        with self._cursor(commit=True) as cursor:
+            cursor.execute("INSERT OR REPLACE INTO chain_cursors (chain_id, block_number) VALUES (?, ?)",
+                           (chain_id, block_number))
+
+    @staticmethod
+    def _transfer_log_index(tx, ordinals) -> int:
+        """
+        log_index перевода. Нативные - -1. Токенные без индекса лога (ANKR, TronGrid /trc20) -
+        -2, -3, ... по порядку внутри транзакции; при чтении они уступают записям с настоящим индексом.
+        """
+        if tx.get('log_index') is not None:
+            return tx['log_index']
+        if tx.get('is_native', True):
+            return -1
+        tx_hash = tx.get('hash', '')
+        ordinals[tx_hash] = ordinals.get(tx_hash, 0) + 1
+        return -1 - ordinals[tx_hash]
+
+    def save_transfers(self, network: str, chain_id, transfers, address: str = None) -> int:
+        """
+        Сохраняет переводы (формат трекеров), дубликаты пропускаются. Возвращает число новых.
+        address - получатель всех переводов (иначе tx['to']).
+        """
+        ordinals = {}
+        rows = [(network, chain_id, tx.get('hash', ''), self._transfer_log_index(tx, ordinals),
+                 address or tx.get('to', ''), tx.get('from', ''),
+                 tx.get('token_symbol', tx.get('token', 'UNKNOWN')), tx.get('contract_address'), tx.get('value', 0),
+                 str(tx.get('value_raw', 0)), tx.get('timestamp', 0), tx.get('block_number'))
+                for tx in transfers]
+        if not rows:
+            return 0
+        with self._cursor(commit=True) as cursor:
+            cursor.executemany(
+                "INSERT OR IGNORE INTO transfers (network, chain_id, tx_hash, log_index, address, sender, token, "
+                "contract_address, amount, value_raw, timestamp, block_number) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            # rowcount не учитывает строки daily_totals, измененные триггером (в отличие от total_changes)
+            return cursor.rowcount
+
+    def get_transfers(self, network: str, chain_id, address: str, start_time: int, end_time: int):
+        """
+        Переводы на адрес за [start_time, end_time): (tx_hash, log_index, sender, token, contract_address,
+        amount, timestamp). Перевод без индекса лога пропускается, если тот же перевод есть с индексом.
+        """
+        with self._cursor() as cursor:
+            cursor.execute(
+                f"""SELECT tx_hash, log_index, sender, token, contract_address, amount, timestamp
+                   FROM transfers t
+                   WHERE address = ? AND network = ? AND chain_id = ? AND timestamp >= ? AND timestamp < ?
+                     AND NOT (log_index < -1 AND EXISTS (
+                         SELECT 1 FROM transfers r WHERE {TWIN_TRANSFER.format(t='t')} AND r.log_index >= 0))
+                   ORDER BY timestamp""",
+                (address, network, chain_id, start_time, end_time)
+            )
+            return cursor.fetchall()
+
+    def get_period_totals(self, network: str, address: str, day_from: str, day_to: str, chain_id=None):
+        """
+        Суммы поступлений на адрес по токенам за сутки [day_from, day_to) ('YYYY-MM-DD', UTC+3):
+        [(token, amount, transfers)] по убыванию суммы. chain_id=None - все сети семейства network.
+        """
+        query = ("SELECT token, SUM(amount), SUM(transfers) FROM daily_totals "
+                 "WHERE address = ? AND day >= ? AND day < ? AND network = ?")
+        params = [address, day_from, day_to, network]
+        if chain_id is not None:
+            query += " AND chain_id = ?"
+            params.append(chain_id)
+        with self._cursor() as cursor:
+            cursor.execute(query + " GROUP BY token ORDER BY 2 DESC", params)
+            return cursor.fetchall()
+
+    def get_ledger_sync(self, network: str, chain_id, address: str):
+        """(synced_from, synced_until) - отрезок времени, за который переводы адреса уже в БД, или None."""
+        with self._cursor() as cursor:
+            cursor.execute("SELECT synced_from, synced_until FROM ledger_sync "
+                           "WHERE network = ? AND chain_id = ? AND address = ?", (network, chain_id, address))
+            return cursor.fetchone()
+
+    def set_ledger_sync(self, network: str, chain_id, address: str, synced_from: int, synced_until: int):
+        with self._cursor(commit=True) as cursor:
+            cursor.execute("INSERT OR REPLACE INTO ledger_sync (network, chain_id, address, synced_from, synced_until) "
+                           "VALUES (?, ?, ?, ?, ?)", (network, chain_id, address, synced_from, synced_until))
+
+    # ---- Асинхронный доступ (из event loop) ----
+
+    async def get_wallets_async(self, user_id: int):
+        return await self.run(self.get_wallets, user_id)
+
+    async def get_wallet_async(self, user_id: int, address: str):
+        return await self.run(self.get_wallet, user_id, address)
+
+    async def add_wallet_async(self, user_id: int, address: str, shortname: str, network: str):
+        return await self.run(self.add_wallet, user_id, address, shortname, network)
+
+    async def remove_wallet_async(self, user_id: int, address: str, shortname: str, network: str):
+        return await self.run(self.remove_wallet, user_id, address, shortname, network)
+
+    async def get_all_users_async(self):
+        return await self.run(self.get_all_users)
+
+    async def get_all_wallets_async(self):
+        return await self.run(self.get_all_wallets)
+
+    async def get_wallets_by_ids_async(self, wallet_ids):
+        return await self.run(self.get_wallets_by_ids, wallet_ids)
+
+    async def get_unique_wallets_async(self):
+        return await self.run(self.get_unique_wallets)
+
+    async def get_chain_cursor_async(self, chain_id):
+        return await self.run(self.get_chain_cursor, chain_id)
+
+    async def set_chain_cursor_async(self, chain_id, block_number: int):
+        return await self.run(self.set_chain_cursor, chain_id, block_number)
+
+    async def save_transfers_async(self, network: str, chain_id, transfers, address: str = None) -> int:
+        return await self.run(self.save_transfers, network, chain_id, transfers, address)
+
+    async def get_transfers_async(self, network: str, chain_id, address: str, start_time: int, end_time: int):
+        return await self.run(self.get_transfers, network, chain_id, address, start_time, end_time)
+
+    async def get_period_totals_async(self, network: str, address: str, day_from: str, day_to: str, chain_id=None):
+        return await self.run(self.get_period_totals, network, address, day_from, day_to, chain_id)
+
+    async def get_ledger_sync_async(self, network: str, chain_id, address: str):
+        return await self.run(self.get_ledger_sync, network, chain_id, address)
+
+    async def set_ledger_sync_async(self, network: str, chain_id, address: str, synced_from: int, synced_until: int):
+        return await self.run(self.set_ledger_sync, network, chain_id, address, synced_from, synced_until)
+
     def close(self):
-        if self.conn:
-            self.conn.close()
-            logger.info("Соединение с базой данных закрыто.")
+        self._pool.shutdown(wait=True)
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        logger.info("Соединение с базой данных закрыто.")
@@ -0,0 +1,38 @@
+# deadline.py
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+
+class DeadlineExceeded(Exception):
+    """Время, отведенное вызывающим на запрос, истекло - следующие запросы к провайдеру не выполняются"""
+    pass
+
+
+# Момент time.monotonic(), к которому должны закончиться все запросы к провайдерам (None - без дедлайна)
+_deadline: contextvars.ContextVar = contextvars.ContextVar('request_deadline', default=None)
+
+
+@contextmanager
+def request_deadline(deadline: Optional[float]):
+    """
+    Дедлайн для всех HTTP запросов провайдеров внутри блока. Устанавливается в потоке пула,
+    где выполняется трекер: после дедлайна поток прекращает опрос, а не дочитывает страницы впустую.
+    """
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def bounded_timeout(timeout: float) -> float:
+    """Таймаут запроса, не выходящий за дедлайн. DeadlineExceeded, если дедлайн уже прошел."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return timeout
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise DeadlineExceeded("Дедлайн запроса истек")
+    return min(timeout, remaining)
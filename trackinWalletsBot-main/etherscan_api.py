@@ -1,10 +1,35 @@
-import requests
+import asyncio
 import time
-from config import logger, CHAIN_TOKENS
+
+import httpx
+import requests
+from config import logger, CHAIN_TOKENS, ETHERSCAN_SETTINGS, BLOCK_INDEX_SETTINGS
+from block_time_index import block_time_index, ResolveBudgetExceeded
+from circuit_breaker import get_breaker
+from deadline import DeadlineExceeded, bounded_timeout
+from http_cache import response_cache
+from http_client import http_pool
+from rate_limiter import get_rate_limiter
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 
 
 class EtherscanAPIError(Exception):
+    """Постоянная ошибка (например, неподдерживаемый chainid) - повторять бессмысленно"""
+    pass
+
+
+class EtherscanTransientError(EtherscanAPIError):
+    """Временная ошибка сети или сервера - запрос можно повторить"""
+    pass
+
+
+class EtherscanRateLimitError(EtherscanTransientError):
+    """Etherscan ответил, что квота ключа исчерпана"""
+    pass
+
+
+class EtherscanInvalidRequestError(EtherscanAPIError):
+    """Ошибка в параметрах запроса (например, неверный адрес) - сеть при этом доступна"""
     pass
 
 
@@ -24,19 +49,29 @@ class EtherscanAPI:
 
         self.api_key = api_key
         self.chain_id = chain_id
+        # Один limiter на ключ: все chainid и все параллельные запросы делят квоту
+        self.rate_limiter = get_rate_limiter(
+            f"etherscan:{api_key}",
+            rate=ETHERSCAN_SETTINGS['rate_limit_per_sec'],
+            burst=ETHERSCAN_SETTINGS['burst']
+        )
+        # Breaker на сеть: мертвый chainid не тратит время каждого кошелька
+        self.breaker = get_breaker(
+            'etherscan', chain_id,
+            ignored_exceptions=(EtherscanRateLimitError, EtherscanInvalidRequestError)
+        )
+        self.breaker.probe = self.get_block_number
 
     def get_native_token(self) -> str:
         return CHAIN_TOKENS.get(self.chain_id, "UNKNOWN")
 
     # ---- Запрос с повторными попытками ----
     @retry(
-        stop=stop_after_attempt(20),
+        stop=stop_after_attempt(ETHERSCAN_SETTINGS['max_attempts']),
         wait=wait_exponential(multiplier=1, min=1, max=3),
-        retry=retry_if_exception_type(
-            (requests.exceptions.ReadTimeout, requests.exceptions.ConnectionError, EtherscanAPIError)
-        ),
+        retry=retry_if_exception_type(EtherscanTransientError),
         before_sleep=lambda st: logger.warning(
-            f"Повторная попытка запроса Etherscan V2 ({st.attempt_number}/20)"
+            f"Повторная попытка запроса Etherscan V2 ({st.attempt_number}/{ETHERSCAN_SETTINGS['max_attempts']})"
         ),
         reraise=True
     )
@@ -46,76 +81,402 @@ class EtherscanAPI:
         params["chainid"] = self.chain_id
 
         try:
-            response = requests.get(self.BASE_URL, params=params, timeout=10)
+            self.rate_limiter.acquire()
+            response = http_pool.session(self.BASE_URL).get(self.BASE_URL, params=params,
+                                                            timeout=bounded_timeout(10))
+            self._check_status(response.status_code, response.headers, response.text)
+            return self._parse_response(response.json())
 
-            if response.status_code != 200:
-                raise EtherscanAPIError(f"HTTP ошибка {response.status_code}: {response.text}")
+        except requests.exceptions.RequestException as e:
+            logger.error(f"[Etherscan V2] Ошибка запроса: {e}")
+            raise EtherscanTransientError(f"Ошибка запроса: {e}")
 
-            data = response.json()
+        except (EtherscanAPIError, DeadlineExceeded):
+            raise
 
-            # Новый формат API V2 всегда содержит поле "result"
-            result = data.get("result")
-            if result is None:
-                logger.warning(f"[Etherscan V2] Пустой result. chainid={self.chain_id}")
-                return None
+        except Exception as e:
+            logger.error(f"[Etherscan V2] Ошибка API: {e}")
+            raise EtherscanAPIError(str(e))
 
-            # --- Случай №1: result = list ---
-            if isinstance(result, list):
-                return result
+    @retry(
+        stop=stop_after_attempt(ETHERSCAN_SETTINGS['max_attempts']),
+        wait=wait_exponential(multiplier=1, min=1, max=3),
+        retry=retry_if_exception_type(EtherscanTransientError),
+        before_sleep=lambda st: logger.warning(
+            f"Повторная попытка async запроса Etherscan V2 ({st.attempt_number}/{ETHERSCAN_SETTINGS['max_attempts']})"
+        ),
+        reraise=True
+    )
+    async def _make_request_async(self, params: dict):
+        """Асинхронный вариант _make_request через общий keep-alive клиент"""
+        params["apikey"] = self.api_key
+        params["chainid"] = self.chain_id
+
+        try:
+            await self.rate_limiter.acquire_async()
+            client = http_pool.async_client(self.BASE_URL)
+            response = await client.get(self.BASE_URL, params=params, timeout=bounded_timeout(10))
+            self._check_status(response.status_code, response.headers, response.text)
+            return self._parse_response(response.json())
 
-            # --- Случай №2: result = dict ---
-            if isinstance(result, dict):
+        except httpx.HTTPError as e:
+            logger.error(f"[Etherscan V2] Ошибка запроса: {e}")
+            raise EtherscanTransientError(f"Ошибка запроса: {e}")
 
-                # Важно: токенные транзакции
-                if "erc20Transfers" in result:
-                    return result["erc20Transfers"]
+        except (EtherscanAPIError, DeadlineExceeded):
+            raise
 
-                # Нативные транзакции
-                if "transactions" in result:
-                    return result["transactions"]
+        except Exception as e:
+            logger.error(f"[Etherscan V2] Ошибка API: {e}")
+            raise EtherscanAPIError(str(e))
 
-                # Возможны другие ключи, Etherscan иногда меняет формат
-                for key in result:
-                    if isinstance(result[key], list):
-                        return result[key]
+    def _cache_key(self, params: dict) -> str:
+        return response_cache.key('etherscan', self.chain_id, {k: v for k, v in params.items() if k != 'apikey'})
 
-            logger.error(f"[Etherscan V2] Неизвестный формат ответа: {data}")
+    def _request(self, params: dict, window_end: int = None):
+        """
+        Запрос через circuit breaker сети.
+        window_end - конец окна запроса: ответ берется из дискового кеша и сохраняется в него.
+        """
+        key = self._cache_key(params) if window_end else None
+        data = response_cache.get(key) if key else None
+        if data is None:
+            data = self.breaker.call(self._make_request, params)
+            if key and data is not None:
+                response_cache.set(key, data, window_end)
+        return data
+
+    async def _request_async(self, params: dict, window_end: int = None):
+        key = self._cache_key(params) if window_end else None
+        data = response_cache.get(key) if key else None
+        if data is None:
+            data = await self.breaker.call_async(self._make_request_async, params)
+            if key and data is not None:
+                response_cache.set(key, data, window_end)
+        return data
+
+    def _check_status(self, status_code: int, headers, text: str):
+        """Проверяет HTTP статус. 429 приостанавливает общий limiter на Retry-After."""
+        if status_code == 200:
+            return
+
+        if status_code == 429:
+            try:
+                delay = float(headers.get("Retry-After"))
+            except (TypeError, ValueError):
+                delay = ETHERSCAN_SETTINGS['rate_limit_backoff']
+
+            self.rate_limiter.penalize(delay)
+            raise EtherscanRateLimitError(f"HTTP 429, Retry-After: {delay}")
+
+        if status_code >= 500:
+            raise EtherscanTransientError(f"HTTP ошибка {status_code}: {text}")
+
+        raise EtherscanAPIError(f"HTTP ошибка {status_code}: {text}")
+
+    def _parse_response(self, data: dict):
+        """Приводит ответ Etherscan V2 к списку транзакций"""
+        # Новый формат API V2 всегда содержит поле "result"
+        result = data.get("result")
+
+        if data.get("status") == "0" and isinstance(result, str):
+            # Etherscan сообщает о превышении квоты в теле ответа со статусом 200
+            if "rate limit" in result.lower():
+                self.rate_limiter.penalize(ETHERSCAN_SETTINGS['rate_limit_backoff'])
+                raise EtherscanRateLimitError(result)
+
+            # Неподдерживаемая сеть - постоянная ошибка, повторять не нужно
+            if "chainid" in result.lower() or "not supported" in result.lower():
+                raise EtherscanAPIError(f"chainid={self.chain_id}: {result}")
+
+            raise EtherscanInvalidRequestError(f"chainid={self.chain_id}: {result}")
+
+        if result is None:
+            logger.warning(f"[Etherscan V2] Пустой result. chainid={self.chain_id}")
             return None
 
-        except requests.exceptions.RequestException as e:
-            logger.error(f"[Etherscan V2] Ошибка запроса: {e}")
-            raise EtherscanAPIError(f"Ошибка запроса: {e}")
+        # --- Случай №1: result = list ---
+        if isinstance(result, list):
+            return result
 
-        except Exception as e:
-            logger.error(f"[Etherscan V2] Ошибка API: {e}")
-            raise EtherscanAPIError(str(e))
+        # --- Случай №2: result = dict ---
+        if isinstance(result, dict):
+
+            # Блок (proxy eth_getBlockByNumber) - целиком, а не список хешей его транзакций
+            if "number" in result and "timestamp" in result:
+                return result
+
+            # Важно: токенные транзакции
+            if "erc20Transfers" in result:
+                return result["erc20Transfers"]
+
+            # Нативные транзакции
+            if "transactions" in result:
+                return result["transactions"]
+
+            # Возможны другие ключи, Etherscan иногда меняет формат
+            for key in result:
+                if isinstance(result[key], list):
+                    return result[key]
+
+        # --- Случай №3: скалярный result (proxy-методы, номер блока) ---
+        if isinstance(result, str):
+            return result
+
+        logger.error(f"[Etherscan V2] Неизвестный формат ответа: {data}")
+        return None
 
     # ==============================
     #  PUBLIC METHODS
     # ==============================
 
-    def get_chain_transactions(self, address: str) -> list | None:
+    def get_block_number(self) -> int:
+        """
+        Номер последнего блока сети (используется и как проверка доступности сети)
+        """
+        params = {
+            "module": "proxy",
+            "action": "eth_blockNumber"
+        }
+        return int(self._make_request(params), 16)
+
+    def _get_block(self, tag: str) -> dict:
+        """Заголовок блока через proxy eth_getBlockByNumber (tag - hex номер или 'latest')"""
+        params = {
+            "module": "proxy",
+            "action": "eth_getBlockByNumber",
+            "tag": tag,
+            "boolean": "false"
+        }
+        block = self._request(params)
+        if not isinstance(block, dict):
+            raise EtherscanAPIError(f"Блок {tag} не получен. chainid={self.chain_id}")
+        return block
+
+    def get_block_timestamp(self, block_number: int) -> int:
+        """Время блока"""
+        return int(self._get_block(hex(block_number))["timestamp"], 16)
+
+    def get_head(self) -> tuple:
+        """(последний блок, его время)"""
+        block = self._get_block("latest")
+        return int(block["number"], 16), int(block["timestamp"], 16)
+
+    def get_block_by_time(self, timestamp: int, closest: str = "before") -> int | None:
+        """
+        Номер блока по времени (closest: before/after) через индекс времени блоков: интерполяция
+        между известными точками с уточнением по eth_getBlockByNumber (не больше max_refine_requests
+        запросов). getblocknobytime - только если интерполяция не сходится в этот бюджет.
+        """
+        try:
+            return block_time_index.resolve(self.chain_id, timestamp, closest,
+                                            self.get_block_timestamp, self.get_head,
+                                            max_requests=BLOCK_INDEX_SETTINGS['max_refine_requests'])
+        except (ResolveBudgetExceeded, EtherscanAPIError) as e:
+            logger.debug(f"[Etherscan V2] Индекс не дал ответ ({e}), запрос getblocknobytime")
+
+        params = {
+            "module": "block",
+            "action": "getblocknobytime",
+            "timestamp": timestamp,
+            "closest": closest
+        }
+        try:
+            block = int(self._request(params))
+        except (EtherscanAPIError, TypeError, ValueError) as e:
+            logger.warning(f"[Etherscan V2] Не удалось получить блок по времени {timestamp} "
+                           f"(chainid={self.chain_id}): {e}")
+            return None
+
+        block_time_index.remember_answer(self.chain_id, timestamp, closest, block)
+        return block
+
+    def _block_range_params(self, start_time: int = None, end_time: int = None) -> dict:
+        """startblock/endblock для окна [start_time, end_time]; незакрытое окно идет до последнего блока"""
+        params = {}
+        if start_time:
+            start_block = self.get_block_by_time(start_time, "after")
+            if start_block is not None:
+                params["startblock"] = start_block
+        if end_time and end_time < time.time():
+            end_block = self.get_block_by_time(end_time, "before")
+            if end_block is not None:
+                params["endblock"] = end_block
+        return params
+
+    def get_chain_transactions(self, address: str, start_time: int = None, end_time: int = None) -> list | None:
         """
         Нативные транзакции сети (ETH, BNB, MATIC, ARB, BASE и т.д.)
+        При указании start_time/end_time запрашиваются только блоки этого окна.
         """
         params = {
             "module": "account",
             "action": "txlist",
             "address": address,
-            "sort": "desc"
+            "sort": "desc",
+            **self._block_range_params(start_time, end_time)
         }
-        time.sleep(1)
-        return self._make_request(params)
+        return self._request(params, window_end=end_time)
 
-    def get_token_transactions(self, address: str) -> list | None:
+    def get_token_transactions(self, address: str, start_time: int = None, end_time: int = None) -> list | None:
         """
         Токенные транзакции сети (ERC20, BEP20, Polygon tokens и т.д.)
+        При указании start_time/end_time запрашиваются только блоки этого окна.
+        """
+        params = {
+            "module": "account",
+            "action": "tokentx",
+            "address": address,
+            "sort": "desc",
+            **self._block_range_params(start_time, end_time)
+        }
+        return self._request(params, window_end=end_time)
+
+    def _page_params(self, base: dict, page: int, page_size: int) -> dict:
+        return {**base, "page": page, "offset": page_size}
+
+    def _next_page(self, base: dict, page: int, page_size: int, rows: list, seen: set):
+        """
+        Переход к следующей странице. Etherscan отдает не больше max_result_window строк
+        на один запрос (page * offset), поэтому у границы окна сдвигаем endblock
+        на последний полученный блок и начинаем с первой страницы.
+        Возвращает номер следующей страницы или None, если данные закончились.
+        EtherscanAPIError, если окно прочитать целиком нельзя.
+        """
+        if len(rows) < page_size:
+            return None
+
+        if (page + 1) * page_size <= ETHERSCAN_SETTINGS['max_result_window']:
+            return page + 1
+
+        last_block = int(rows[-1].get("blockNumber", 0))
+        if base.get("endblock") == last_block:
+            # Остаток блока не получить - неполный результат нельзя выдавать за полный
+            raise EtherscanAPIError(f"Блок {last_block} содержит больше строк, чем отдает API. "
+                                    f"chainid={self.chain_id}")
+
+        base["endblock"] = last_block
+        # Строки граничного блока придут повторно - запоминаем уже отданные
+        seen.clear()
+        seen.update(self._row_key(row) for row in rows if int(row.get("blockNumber", 0)) == last_block)
+        return 1
+
+    def _observe_block(self, row: dict):
+        """Каждая строка txlist/tokentx - бесплатная точка (блок, время) для индекса"""
+        try:
+            block_time_index.observe(self.chain_id, int(row["blockNumber"]), int(row["timeStamp"]))
+        except (KeyError, TypeError, ValueError):
+            pass
+
+    @staticmethod
+    def _row_key(row: dict) -> tuple:
+        return row.get("hash"), row.get("logIndex"), row.get("to"), row.get("value")
+
+    def iter_transactions(self, action: str, address: str, start_time: int = None, end_time: int = None,
+                          page_size: int = None):
+        """
+        Генератор строк txlist/tokentx (action) от новых к старым, страница за страницей.
+        Следующая страница запрашивается только если потребитель дочитал текущую,
+        поэтому можно остановиться на первой строке старше нужного окна.
+        """
+        page_size = page_size or ETHERSCAN_SETTINGS['page_size']
+        base = {
+            "module": "account",
+            "action": action,
+            "address": address,
+            "sort": "desc",
+            **self._block_range_params(start_time, end_time)
+        }
+        seen = set()
+        page = 1
+
+        while page:
+            rows = self._request(self._page_params(base, page, page_size), window_end=end_time) or []
+            for row in rows:
+                if seen and self._row_key(row) in seen:
+                    continue
+                self._observe_block(row)
+                yield row
+            page = self._next_page(base, page, page_size, rows, seen)
+
+    async def iter_transactions_async(self, action: str, address: str, start_time: int = None,
+                                      end_time: int = None, page_size: int = None):
+        """
+        Асинхронный вариант iter_transactions
+        """
+        page_size = page_size or ETHERSCAN_SETTINGS['page_size']
+        base = {
+            "module": "account",
+            "action": action,
+            "address": address,
+            "sort": "desc",
+            **await self._block_range_params_async(start_time, end_time)
+        }
+        seen = set()
+        page = 1
+
+        while page:
+            rows = await self._request_async(self._page_params(base, page, page_size), window_end=end_time) or []
+            for row in rows:
+                if seen and self._row_key(row) in seen:
+                    continue
+                self._observe_block(row)
+                yield row
+            page = self._next_page(base, page, page_size, rows, seen)
+
+    async def get_block_number_async(self) -> int:
+        """
+        Асинхронный вариант get_block_number
+        """
+        params = {
+            "module": "proxy",
+            "action": "eth_blockNumber"
+        }
+        return int(await self._make_request_async(params), 16)
+
+    async def get_block_by_time_async(self, timestamp: int, closest: str = "before") -> int | None:
+        """
+        Асинхронный вариант get_block_by_time: уточнение по индексу делает синхронные запросы,
+        поэтому выполняется в потоке
+        """
+        return await asyncio.to_thread(self.get_block_by_time, timestamp, closest)
+
+    async def _block_range_params_async(self, start_time: int = None, end_time: int = None) -> dict:
+        params = {}
+        if start_time:
+            start_block = await self.get_block_by_time_async(start_time, "after")
+            if start_block is not None:
+                params["startblock"] = start_block
+        if end_time and end_time < time.time():
+            end_block = await self.get_block_by_time_async(end_time, "before")
+            if end_block is not None:
+                params["endblock"] = end_block
+        return params
+
+    async def get_chain_transactions_async(self, address: str, start_time: int = None,
+                                           end_time: int = None) -> list | None:
+        """
+        Асинхронный вариант get_chain_transactions
+        """
+        params = {
+            "module": "account",
+            "action": "txlist",
+            "address": address,
+            "sort": "desc",
+            **await self._block_range_params_async(start_time, end_time)
+        }
+        return await self._request_async(params, window_end=end_time)
+
+    async def get_token_transactions_async(self, address: str, start_time: int = None,
+                                           end_time: int = None) -> list | None:
+        """
+        Асинхронный вариант get_token_transactions
         """
         params = {
             "module": "account",
             "action": "tokentx",
             "address": address,
-            "sort": "desc"
+            "sort": "desc",
+            **await self._block_range_params_async(start_time, end_time)
         }
-        time.sleep(1)
-        return self._make_request(params)
+        return await self._request_async(params, window_end=end_time)
@@ -0,0 +1,38 @@
+# executor.py
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from config import logger, EXECUTOR_SETTINGS
+
+
+class TrackerExecutor:
+    """Выполняет блокирующую работу трекеров в ограниченном пуле потоков"""
+
+    def __init__(self, max_workers: int = None):
+        self.max_workers = max_workers or EXECUTOR_SETTINGS['max_workers']
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix=EXECUTOR_SETTINGS['thread_name_prefix']
+        )
+        logger.info(f"✅ TrackerExecutor инициализирован (потоков: {self.max_workers})")
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """Запускает синхронную функцию в пуле и ожидает результат, не блокируя event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, functools.partial(func, *args, **kwargs))
+
+    def shutdown(self, wait: bool = True):
+        """Останавливает пул потоков"""
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+        logger.info("TrackerExecutor остановлен.")
+
+
+def get_executor(bot_data: Dict) -> TrackerExecutor:
+    """Возвращает общий executor из bot_data, создавая его при первом обращении"""
+    executor = bot_data.get('executor')
+    if executor is None:
+        executor = TrackerExecutor()
+        bot_data['executor'] = executor
+    return executor
@@ -0,0 +1,85 @@
+# http_cache.py
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Optional
+
+from config import logger, HTTP_CACHE_SETTINGS
+
+
+class ResponseCache:
+    """
+    Дисковый кеш ответов провайдеров (SQLite, JSON сжат zlib).
+    Ответ за окно, закончившееся раньше горизонта финальности, не истекает никогда:
+    история после перезапуска бота не скачивается заново. Ответы за незакрытые окна
+    живут open_ttl секунд.
+    """
+
+    def __init__(self, db_file: str = None):
+        self.db_file = db_file or HTTP_CACHE_SETTINGS['file']
+        self.enabled = HTTP_CACHE_SETTINGS['enabled']
+        self.hits = 0
+        self.misses = 0
+        self._conn = None
+        self._lock = threading.RLock()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_file, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute('''CREATE TABLE IF NOT EXISTS responses
+                                  (
+                                      key TEXT PRIMARY KEY,
+                                      body BLOB,
+                                      expires_at INTEGER  -- NULL - окно закрыто, ответ не истекает
+                                  )''')
+            purged = self._conn.execute("DELETE FROM responses WHERE expires_at < ?", (int(time.time()),)).rowcount
+            self._conn.commit()
+            if purged:
+                logger.info(f"ResponseCache: удалено {purged} устаревших ответов")
+        return self._conn
+
+    @staticmethod
+    def key(*parts) -> str:
+        """Ключ запроса из его частей (провайдер, сеть, url, параметры - без ключей API)"""
+        return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+    @staticmethod
+    def is_closed(window_end: int) -> bool:
+        return window_end <= time.time() - HTTP_CACHE_SETTINGS['finality']
+
+    def get(self, key: str) -> Optional[Any]:
+        """Сохраненный ответ или None"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            try:
+                row = self._db().execute("SELECT body, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+            except sqlite3.Error as e:
+                logger.warning(f"ResponseCache: ошибка чтения: {e}")
+                return None
+            if row is None or (row[1] is not None and row[1] < time.time()):
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(zlib.decompress(row[0]))
+
+    def set(self, key: str, data: Any, window_end: Optional[int]):
+        """Сохраняет ответ за окно, заканчивающееся в window_end (секунды). Без конца окна не кешируется."""
+        if not self.enabled or window_end is None:
+            return
+        expires_at = None if self.is_closed(window_end) else int(time.time()) + HTTP_CACHE_SETTINGS['open_ttl']
+        body = zlib.compress(json.dumps(data).encode())
+        with self._lock:
+            try:
+                self._db().execute("INSERT OR REPLACE INTO responses (key, body, expires_at) VALUES (?, ?, ?)",
+                                   (key, body, expires_at))
+                self._db().commit()
+            except sqlite3.Error as e:
+                logger.warning(f"ResponseCache: ошибка записи: {e}")
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,93 @@
+# http_client.py
+import threading
+from typing import Dict
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import logger, HTTP_SETTINGS
+
+
+class HttpSessionPool:
+    """
+    Общие keep-alive сессии для API провайдеров: одна на хост.
+    Синхронные (requests) используются трекерами в пуле потоков,
+    асинхронные (httpx) - корутинами в event loop бота.
+    """
+
+    def __init__(self):
+        self._sync_sessions: Dict[str, requests.Session] = {}
+        self._async_clients: Dict[str, httpx.AsyncClient] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _host(url: str) -> str:
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}"
+
+    def session(self, url: str) -> requests.Session:
+        """Возвращает синхронную сессию для хоста url"""
+        host = self._host(url)
+        session = self._sync_sessions.get(host)
+        if session is not None:
+            return session
+
+        with self._lock:
+            session = self._sync_sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=HTTP_SETTINGS['pool_connections'],
+                    pool_maxsize=HTTP_SETTINGS['pool_maxsize']
+                )
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                session.headers.update(HTTP_SETTINGS['headers'])
+                self._sync_sessions[host] = session
+                logger.info(f"HTTP: создана keep-alive сессия для {host}")
+        return session
+
+    def async_client(self, url: str) -> httpx.AsyncClient:
+        """Возвращает асинхронный клиент для хоста url"""
+        host = self._host(url)
+        client = self._async_clients.get(host)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=HTTP_SETTINGS['pool_maxsize'],
+                    max_keepalive_connections=HTTP_SETTINGS['pool_maxsize'],
+                    keepalive_expiry=HTTP_SETTINGS['keepalive_expiry']
+                ),
+                headers=HTTP_SETTINGS['headers'],
+                http2=HTTP_SETTINGS['http2']
+            )
+            self._async_clients[host] = client
+            logger.info(f"HTTP: создан async клиент для {host}")
+        return client
+
+    def close_sync(self):
+        """Закрывает синхронные сессии"""
+        with self._lock:
+            for session in self._sync_sessions.values():
+                session.close()
+            self._sync_sessions.clear()
+
+    async def close_async(self):
+        """Закрывает асинхронные клиенты"""
+        clients = list(self._async_clients.values())
+        self._async_clients.clear()
+        for client in clients:
+            await client.aclose()
+
+
+# Общий пул сессий для всех провайдеров
+http_pool = HttpSessionPool()
+
+
+async def close_http_sessions(application=None):
+    """Хук остановки бота: закрывает все HTTP соединения"""
+    await http_pool.close_async()
+    http_pool.close_sync()
+    logger.info("HTTP сессии закрыты.")
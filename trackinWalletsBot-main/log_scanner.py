@@ -0,0 +1,151 @@
+# log_scanner.py
+import threading
+from typing import Dict, Iterator, List, Tuple
+
+from config import logger, BEP20_TOKENS, LOG_SCANNER_SETTINGS
+from rpc_client import ChainRpcClient, LogRangeTooLargeError
+
+TRANSFER_TOPIC = '0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef'
+
+
+def _topic_address(address: str) -> str:
+    """Адрес в виде 32-байтного topic"""
+    return '0x' + address.lower().replace('0x', '').rjust(64, '0')
+
+
+def _decode_abi_string(data: str) -> str:
+    """Декодирует результат eth_call для symbol(): string или bytes32"""
+    raw = bytes.fromhex(data[2:] if data.startswith('0x') else data)
+    if len(raw) >= 64:
+        length = int.from_bytes(raw[32:64], 'big')
+        return raw[64:64 + length].decode('utf-8', errors='ignore')
+    return raw.rstrip(b'\x00').decode('utf-8', errors='ignore')
+
+
+class TransferLogScanner(ChainRpcClient):
+    """
+    Сканер ERC20 Transfer событий через eth_getLogs на RPC endpoint сети ANKR.
+    Один запрос покрывает всех отслеживаемых адресов сети: topic2 = OR-список адресов.
+    Диапазон блоков делится пополам, если нода отвечает "too many results".
+    """
+
+    # Метаданные токенов общие для всех сканеров: {(сеть, контракт): (symbol, decimals)}
+    _token_meta: Dict[Tuple[str, str], Tuple[str, int]] = {}
+    _token_meta_lock = threading.Lock()
+
+    # ---- eth_getLogs ----
+
+    def _get_logs(self, topic_addresses: List[str], from_block: int, to_block: int) -> List[Dict]:
+        return self.rpc('eth_getLogs', [{
+            'fromBlock': hex(from_block),
+            'toBlock': hex(to_block),
+            'topics': [TRANSFER_TOPIC, None, topic_addresses],
+        }]) or []
+
+    def iter_logs(self, addresses: List[str], from_block: int, to_block: int) -> Iterator[Dict]:
+        """
+        Transfer логи в адреса addresses за [from_block, to_block].
+        Размер окна адаптивный: делится пополам на "too many results" и растет обратно после успеха.
+        """
+        max_span = LOG_SCANNER_SETTINGS['max_blocks_per_query']
+        max_addresses = LOG_SCANNER_SETTINGS['max_addresses_per_query']
+        topic_addresses = [_topic_address(address) for address in addresses]
+
+        for offset in range(0, len(topic_addresses), max_addresses):
+            topics_chunk = topic_addresses[offset:offset + max_addresses]
+            span = max_span
+            start = from_block
+            while start <= to_block:
+                end = min(start + span - 1, to_block)
+                try:
+                    logs = self._get_logs(topics_chunk, start, end)
+                except LogRangeTooLargeError:
+                    if end == start:
+                        raise
+                    span = max(1, (end - start + 1) // 2)
+                    logger.info(f"LogScanner[{self.chain}]: слишком много логов, окно {span} блоков")
+                    continue
+
+                yield from logs
+                start = end + 1
+                span = min(max_span, span * 2)
+
+    # ---- Метаданные токенов ----
+
+    def token_meta(self, contract_address: str) -> Tuple[str, int]:
+        """(symbol, decimals) токена через eth_call, с общим кешем"""
+        key = (self.chain, contract_address)
+        meta = self._token_meta.get(key)
+        if meta is not None:
+            return meta
+
+        symbol = BEP20_TOKENS.get(contract_address, 'UNKNOWN') if self.chain in ('bsc', 'bnb') else 'UNKNOWN'
+        decimals = 18
+        try:
+            decimals_hex, symbol_hex = self.rpc_batch([
+                ('eth_call', [{'to': contract_address, 'data': '0x313ce567'}, 'latest']),  # decimals()
+                ('eth_call', [{'to': contract_address, 'data': '0x95d89b41'}, 'latest']),  # symbol()
+            ])
+            if decimals_hex and decimals_hex != '0x':
+                decimals = int(decimals_hex, 16)
+            if symbol_hex and symbol_hex != '0x' and symbol == 'UNKNOWN':
+                symbol = _decode_abi_string(symbol_hex) or symbol
+        except Exception as e:
+            logger.warning(f"LogScanner[{self.chain}]: нет метаданных токена {contract_address}: {e}")
+
+        with self._token_meta_lock:
+            self._token_meta[key] = (symbol, decimals)
+        return symbol, decimals
+
+    # ---- Переводы за окно времени ----
+
+    def scan_window(self, addresses: List[str], start_time: int, end_time: int,
+                    network: str = None) -> Dict[str, List[Dict]]:
+        """
+        Входящие переводы токенов для всех addresses за окно времени.
+        Возвращает {адрес.lower(): [переводы в формате трекеров]}.
+        """
+        network = network or self.chain
+        from_block = self.find_block_by_time(start_time, closest='after')
+        to_block = self.find_block_by_time(end_time, closest='before')
+        logger.info(f"LogScanner[{self.chain}]: блоки {from_block}-{to_block}, адресов {len(addresses)}")
+
+        logs = list(self.iter_logs(addresses, from_block, to_block))
+        timestamps = self.get_block_timestamps([int(log['blockNumber'], 16) for log in logs])
+
+        transfers = {address.lower(): [] for address in addresses}
+        for log in logs:
+            try:
+                topics = log.get('topics', [])
+                if len(topics) < 3:
+                    continue  # Transfer без индексированного получателя
+                to_addr = '0x' + topics[2][-40:]
+                if to_addr not in transfers:
+                    continue
+
+                amount_raw = int(log.get('data') or '0x0', 16)
+                if amount_raw <= 0:
+                    continue
+
+                contract_addr = log.get('address', '').lower()
+                symbol, decimals = self.token_meta(contract_addr)
+
+                transfers[to_addr].append({
+                    'hash': log.get('transactionHash', ''),
+                    'log_index': int(log.get('logIndex', '0x0'), 16),
+                    'from': '0x' + topics[1][-40:],
+                    'to': to_addr,
+                    'value': amount_raw / (10 ** decimals),
+                    'value_raw': amount_raw,
+                    'contract_address': contract_addr,
+                    'token_symbol': symbol,
+                    'timestamp': timestamps.get(int(log['blockNumber'], 16), 0),
+                    'is_native': False,
+                    'network': network
+                })
+            except Exception as e:
+                logger.warning(f"LogScanner[{self.chain}]: ошибка парсинга лога: {e}")
+                continue
+
+        logger.info(f"LogScanner[{self.chain}]: {len(logs)} Transfer логов")
+        return transfers
@@ -11,10 +11,35 @@ from config import ADD_ADDRESS, REMOVE_ADDRESS, REMOVE_CONFIRM, TODAY_WALLET_CHO
 from config import logger, TELEGRAM_TOKEN, ANKR_API_KEY
 # Класи та функції
 from db_manager import DatabaseManager
+from executor import TrackerExecutor
+from update_processor import PerChatUpdateProcessor
+from address_index import get_address_index
+from http_client import close_http_sessions
 from etherscan_api import EtherscanAPI
 from trongrid_api import TronGridAPI
 
 
+# Дни недели для run_daily (0 - воскресенье)
+WEEKDAYS = {'sunday': 0, 'monday': 1, 'tuesday': 2, 'wednesday': 3, 'thursday': 4, 'friday': 5, 'saturday': 6}
+
+
+def report_time(value: str) -> time:
+    """Время отчета из REPORT_SETTINGS ('HH:MM', UTC+3)"""
+    hour, minute = map(int, value.split(':'))
+    return time(hour=hour, minute=minute, tzinfo=config.TZ_UTC_PLUS_3)
+
+
+def init_bot_data(bot_data, db):
+    """Сервисы бота в bot_data: БД, пул трекеров, индекс адресов из БД, ключи API"""
+    bot_data['db'] = db
+    bot_data['executor'] = TrackerExecutor()  # Пул потоков для блокирующих запросов трекеров
+    get_address_index(bot_data)  # Кто отслеживает адрес (для ingest-режимов) - строится из БД
+    bot_data['api_class'] = EtherscanAPI
+    bot_data['api_key'] = config.ETHERSCAN_API_KEY
+    bot_data['tron_api_key'] = config.TRON_API_KEY
+    bot_data['ankr_api_key'] = ANKR_API_KEY  # Добавляем ANKR ключ
+
+
 # Функція для виходу з діалогу
 async def cancel(update, context):
     await update.message.reply_text("Действие отменено.", reply_markup=bot_handlers.get_main_menu())
@@ -40,15 +65,19 @@ def main():
         return
 
     # 2. Створення програми
-    application = Application.builder().token(TELEGRAM_TOKEN).build()
+    # concurrent_updates: пока один пользователь ждет сканирования, апдейты других чатов обрабатываются.
+    # Апдейты одного чата - по очереди, иначе ConversationHandler получает гонки состояния диалога
+    application = (
+        Application.builder()
+        .token(TELEGRAM_TOKEN)
+        .concurrent_updates(PerChatUpdateProcessor(config.EXECUTOR_SETTINGS['concurrent_updates']))
+        .post_shutdown(close_http_sessions)  # Закрываем keep-alive соединения к провайдерам
+        .build()
+    )
     bot = application.bot
 
     # 3. Збереження сервісів у bot_data
-    application.bot_data['db'] = db
-    application.bot_data['api_class'] = EtherscanAPI
-    application.bot_data['api_key'] = config.ETHERSCAN_API_KEY
-    application.bot_data['tron_api_key'] = config.TRON_API_KEY
-    application.bot_data['ankr_api_key'] = ANKR_API_KEY  # Добавляем ANKR ключ
+    init_bot_data(application.bot_data, db)
 
     # ИНИЦИАЛИЗАЦИЯ TRON API
     try:
@@ -104,6 +133,7 @@ def main():
     application.add_handler(CommandHandler('my_wallets', bot_handlers.list_wallets))
     application.add_handler(CommandHandler('today', bot_handlers.today_incomes_multi_chain))
     application.add_handler(CommandHandler('help', bot_handlers.help_command))
+    application.add_handler(CommandHandler('status', bot_handlers.status_command))
     application.add_handler(conv_handler)
 
     # Добавляем обработчики для кнопок меню (чтобы работали вне ConversationHandler)
@@ -116,6 +146,33 @@ def main():
     application.job_queue.run_daily(bot_handlers.process_today_incomes_job, time=job_time_midnight,
                                     days=(0, 1, 2, 3, 4, 5, 6))
 
+    # Недельный и месячный отчеты - из агрегатов daily_totals, без запросов к провайдерам
+    weekly = config.REPORT_SETTINGS['weekly']
+    if weekly['enabled']:
+        application.job_queue.run_daily(bot_handlers.process_period_report_job, time=report_time(weekly['time']),
+                                        days=(WEEKDAYS[weekly['day']],), data='weekly')
+    monthly = config.REPORT_SETTINGS['monthly']
+    if monthly['enabled']:
+        application.job_queue.run_monthly(bot_handlers.process_period_report_job, when=report_time(monthly['time']),
+                                          day=monthly['day'], data='monthly')
+
+    # Фоновая проверка сетей, помеченных circuit breaker'ом как недоступные
+    application.job_queue.run_repeating(bot_handlers.probe_circuit_breakers_job,
+                                        interval=config.CIRCUIT_BREAKER_SETTINGS['probe_interval'],
+                                        first=config.CIRCUIT_BREAKER_SETTINGS['probe_interval'])
+
+    # Ingest нативных переводов по новым блокам (вместо запросов истории по каждому кошельку)
+    if config.BLOCK_FOLLOWER_SETTINGS['enabled']:
+        application.job_queue.run_repeating(bot_handlers.follow_native_blocks_job,
+                                            interval=config.BLOCK_FOLLOWER_SETTINGS['poll_interval'],
+                                            first=10)
+
+    # Ingest TRC20 переводов по событиям контрактов (вместо истории по каждому TRON кошельку)
+    if config.TRON_INGEST_SETTINGS['enabled']:
+        application.job_queue.run_repeating(bot_handlers.ingest_trc20_events_job,
+                                            interval=config.TRON_INGEST_SETTINGS['poll_interval'],
+                                            first=10)
+
     # Альтернативно, для отладки, можно запускать каждый час:
     # application.job_queue.run_repeating(bot_handlers.process_today_incomes_job, interval=3600, first=10)
 
@@ -131,6 +188,7 @@ def main():
     except Exception as e:
         logger.error(f"❌ Критическая ошибка бота: {e}")
     finally:
+        application.bot_data['executor'].shutdown(wait=False)
         db.close()
         logger.info("✅ Соединение с БД закрыто. Бот завершил работу.")
 
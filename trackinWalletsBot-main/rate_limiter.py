@@ -0,0 +1,76 @@
+# rate_limiter.py
+import asyncio
+import threading
+import time
+from typing import Dict
+
+from config import logger
+
+
+class TokenBucket:
+    """
+    Token bucket с резервированием: каждый вызов acquire() занимает токен
+    и ждет ровно столько, сколько нужно, чтобы не превысить rate запросов/сек.
+    Потокобезопасен, общий для всех потоков и корутин.
+    """
+
+    def __init__(self, rate: float, burst: int = 1, name: str = ''):
+        self.rate = float(rate)
+        self.capacity = max(1, int(burst))
+        self.name = name
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated = now
+
+    def _reserve(self) -> float:
+        """Занимает один токен и возвращает время ожидания в секундах"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+
+            self._tokens -= 1
+            wait = max(0.0, self._updated - now)  # Пауза после penalize()
+            if self._tokens < 0:
+                wait += -self._tokens / self.rate
+            return wait
+
+    def acquire(self):
+        """Блокирующее ожидание токена (для кода в пуле потоков)"""
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """Ожидание токена без блокировки event loop"""
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def penalize(self, seconds: float):
+        """Останавливает выдачу токенов на seconds (Retry-After / ответ 'rate limit')"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens = min(self._tokens, 0.0)
+            self._updated = max(self._updated, now + seconds)
+        logger.warning(f"RateLimiter[{self.name}]: лимит провайдера, пауза {seconds:.1f} сек")
+
+
+_limiters: Dict[str, TokenBucket] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(key: str, rate: float, burst: int = 1) -> TokenBucket:
+    """Возвращает общий limiter для ключа (например, для API ключа провайдера)"""
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = TokenBucket(rate, burst, name=key.split(':')[0])
+            _limiters[key] = limiter
+        return limiter
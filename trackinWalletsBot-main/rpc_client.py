@@ -0,0 +1,106 @@
+# rpc_client.py
+from typing import Dict, List, Tuple
+
+from config import ANKR_ENDPOINTS, ANKR_SETTINGS, ANKR_CHAIN_TO_ID, LOG_SCANNER_SETTINGS
+from block_time_index import block_time_index
+from circuit_breaker import get_breaker
+from deadline import bounded_timeout
+from http_client import http_pool
+
+# Сообщения нод о слишком большом ответе eth_getLogs (у разных провайдеров по-разному)
+TOO_MANY_RESULTS_MARKERS = (
+    'too many', 'limit exceeded', 'exceed', 'range is too large', 'block range', 'response size', 'returned more than',
+)
+
+
+class RpcError(Exception):
+    """Ошибка JSON-RPC ноды"""
+    pass
+
+
+class LogRangeTooLargeError(RpcError):
+    """Нода отказалась отдавать логи за диапазон целиком - диапазон нужно делить"""
+    pass
+
+
+class ChainRpcClient:
+    """JSON-RPC клиент сети через ANKR_ENDPOINTS (общий breaker ('ankr', сеть) с AnkrAPI)"""
+
+    def __init__(self, chain: str):
+        self.chain = chain
+        self.url = ANKR_ENDPOINTS.get(chain.lower())
+        if not self.url:
+            raise ValueError(f"Нет RPC endpoint для {chain}")
+        self.chain_id = ANKR_CHAIN_TO_ID.get(chain.lower(), chain.lower())
+        self.breaker = get_breaker('ankr', chain)
+        if self.breaker.probe is None:
+            self.breaker.probe = self.get_block_number
+
+    def _send(self, payload):
+        response = http_pool.session(self.url).post(self.url, json=payload,
+                                                    timeout=bounded_timeout(LOG_SCANNER_SETTINGS['timeout']))
+        response.raise_for_status()
+        return response.json()
+
+    @staticmethod
+    def _raise_rpc_error(error: Dict):
+        message = str(error.get('message', error))
+        if any(marker in message.lower() for marker in TOO_MANY_RESULTS_MARKERS):
+            raise LogRangeTooLargeError(message)
+        raise RpcError(message)
+
+    def rpc(self, method: str, params: list):
+        data = self.breaker.call(self._send, {"jsonrpc": "2.0", "method": method, "params": params, "id": 1})
+        if 'error' in data:
+            self._raise_rpc_error(data['error'])
+        return data.get('result')
+
+    def rpc_batch(self, calls: List[Tuple[str, list]]) -> List:
+        """JSON-RPC batch по ANKR_SETTINGS['batch_size'], результаты в порядке calls (None при ошибке)"""
+        results = [None] * len(calls)
+        batch_size = ANKR_SETTINGS['batch_size']
+        for offset in range(0, len(calls), batch_size):
+            chunk = [{"jsonrpc": "2.0", "method": method, "params": params, "id": offset + i}
+                     for i, (method, params) in enumerate(calls[offset:offset + batch_size])]
+            data = self.breaker.call(self._send, chunk)
+            for item in data if isinstance(data, list) else []:
+                if 'result' in item and isinstance(item.get('id'), int):
+                    results[item['id']] = item['result']
+        return results
+
+    def get_block_number(self) -> int:
+        return int(self.rpc('eth_blockNumber', []), 16)
+
+    def get_block_timestamp(self, block_number: int) -> int:
+        block = self.rpc('eth_getBlockByNumber', [hex(block_number), False])
+        return int(block['timestamp'], 16)
+
+    def get_blocks(self, block_numbers: List[int], full_transactions: bool = False) -> Dict[int, Dict]:
+        """Блоки одним batch запросом: {номер: блок} (блоки, которые нода не отдала, пропускаются)"""
+        block_numbers = sorted(set(block_numbers))
+        blocks = self.rpc_batch([('eth_getBlockByNumber', [hex(number), full_transactions])
+                                 for number in block_numbers])
+        result = {number: block for number, block in zip(block_numbers, blocks) if block}
+        for number, block in result.items():
+            block_time_index.observe(self.chain_id, number, int(block['timestamp'], 16))
+        return result
+
+    def get_block_timestamps(self, block_numbers: List[int]) -> Dict[int, int]:
+        """Время блоков одним batch запросом"""
+        return {number: int(block['timestamp'], 16) for number, block in self.get_blocks(block_numbers).items()}
+
+    def get_head(self) -> Tuple[int, int]:
+        """(последний блок, его время)"""
+        block = self.rpc('eth_getBlockByNumber', ['latest', False])
+        return int(block['number'], 16), int(block['timestamp'], 16)
+
+    def find_block_by_time(self, timestamp: int, closest: str = 'before') -> int:
+        """
+        Последний блок <= timestamp ('before') или первый >= ('after') через индекс времени блоков:
+        интерполяция по известным точкам, запросы к ноде - только для уточнения.
+        """
+        block = block_time_index.resolve(self.chain_id, timestamp, closest, self.get_block_timestamp, self.get_head)
+        if block is None:
+            # Момент еще не наступил - окно до последнего блока
+            return self.get_block_number()
+        return block
@@ -0,0 +1,46 @@
+# singleflight.py
+import asyncio
+from typing import Any, Callable, Dict, Hashable
+
+from config import logger
+
+
+class SingleFlight:
+    """
+    Объединяет одновременные одинаковые запросы: пока запрос по ключу выполняется,
+    остальные вызывающие не запускают свой, а ждут его результат (или его ошибку).
+    Отмена одного из ожидающих не отменяет общий запрос.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.calls = 0
+        self.shared = 0  # Сколько вызовов получили результат чужого запроса
+
+    async def do(self, key: Hashable, func: Callable, *args, **kwargs) -> Any:
+        """Выполняет корутинную функцию func один раз на ключ среди одновременных вызовов"""
+        self.calls += 1
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func(*args, **kwargs))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.shared += 1
+            logger.debug(f"SingleFlight: {key} уже выполняется, ждем результат")
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # Ошибка уже передана ожидающим (или их не осталось) - не логируем ее повторно
+
+
+def get_singleflight(bot_data: Dict) -> SingleFlight:
+    """Возвращает общий SingleFlight из bot_data, создавая его при первом обращении"""
+    singleflight = bot_data.get('singleflight')
+    if singleflight is None:
+        singleflight = SingleFlight()
+        bot_data['singleflight'] = singleflight
+    return singleflight
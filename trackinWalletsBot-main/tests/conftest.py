@@ -0,0 +1,69 @@
+# tests/conftest.py
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# config.py требует ключи при импорте - для тестов подойдут любые
+for _name in ('TELEGRAM_TOKEN', 'ETHERSCAN_API_KEY', 'TRON_API_KEY'):
+    os.environ.setdefault(_name, 'test')
+
+
+@pytest.fixture(autouse=True)
+def breakers(monkeypatch):
+    """Свои circuit breaker'ы у каждого теста"""
+    import circuit_breaker
+
+    monkeypatch.setattr(circuit_breaker, '_breakers', {})
+
+
+@pytest.fixture(autouse=True)
+def no_disk_cache(monkeypatch):
+    """Общий дисковый кеш ответов провайдеров в тестах не используется"""
+    from http_cache import response_cache
+
+    monkeypatch.setattr(response_cache, 'enabled', False)
+
+
+@pytest.fixture(autouse=True)
+def block_index(tmp_path, monkeypatch):
+    """Индекс времени блоков каждого теста - в своем файле, а не в wallets.db рабочего каталога"""
+    import etherscan_api
+    import rpc_client
+    from block_time_index import BlockTimeIndex
+
+    index = BlockTimeIndex(str(tmp_path / 'blocks.db'))
+    for module in (etherscan_api, rpc_client):
+        monkeypatch.setattr(module, 'block_time_index', index)
+    yield index
+    if index._conn is not None:
+        index._conn.close()
+
+
+@pytest.fixture
+def db(tmp_path):
+    from db_manager import DatabaseManager
+
+    manager = DatabaseManager(str(tmp_path / 'wallets.db'))
+    yield manager
+    manager.close()
+
+
+class FakeClock:
+    """Управляемое время вместо time.monotonic / time.time"""
+
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
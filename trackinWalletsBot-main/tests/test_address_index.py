@@ -0,0 +1,95 @@
+# tests/test_address_index.py
+import random
+
+from address_index import AddressIndex, address_key
+
+EVM = '0x' + 'ab' * 20
+TRON_BASE58 = 'TR7NHqjeKQxGTCi8q8ZY4pL8otSzgjLj6t'
+TRON_HEX = '41a614f803b6fd780986a42c78ec9c7f77e6ded13c'
+
+
+def test_address_key_forms():
+    assert address_key(EVM) == address_key(EVM.upper().replace('0X', '0x')) == bytes.fromhex('ab' * 20)
+    # base58, hex и адрес из событий TronGrid (0x + 20 байт) - один ключ
+    assert address_key(TRON_BASE58) == address_key(TRON_HEX) == address_key('0x' + TRON_HEX[2:])
+    assert address_key('TR7NHqjeKQxGTCi8q8ZY4pL8otSzgjLj6u') is None  # Неверная контрольная сумма
+    assert address_key('0x1234') is None
+    assert address_key('') is None
+
+
+def test_load_and_subscribers():
+    index = AddressIndex()
+    index.load([(1, EVM, 'eth'), (2, EVM.upper().replace('0X', '0x'), 'bnb'), (3, TRON_HEX, 'tron'),
+                (4, 'garbage', 'eth')])
+    assert index.subscribers(EVM, ('eth',)) == (1,)
+    assert sorted(index.subscribers(EVM, ('eth', 'bnb'))) == [1, 2]
+    assert index.subscribers(TRON_BASE58, ('tron',)) == (3,)
+    assert index.subscribers(EVM, ('tron',)) == ()
+    assert index.size('eth') == 1
+
+
+def test_add_remove():
+    index = AddressIndex()
+    index.add(1, EVM, 'eth')
+    index.add(2, EVM, 'eth')
+    index.add(2, EVM, 'eth')
+    assert index.subscribers(EVM, ('eth',)) == (1, 2)
+
+    index.remove(1, EVM, 'eth')
+    assert index.subscribers(EVM, ('eth',)) == (2,)
+    index.remove(2, EVM, 'eth')
+    assert index.subscribers(EVM, ('eth',)) == ()
+    assert index.size('eth') == 0
+
+
+def test_watcher():
+    index = AddressIndex()
+    index.add(1, TRON_BASE58, 'tron')
+    watcher = index.watcher(('tron',))
+    assert TRON_HEX in watcher
+    assert EVM not in watcher
+
+
+def test_matches_dict_model():
+    # Случайные add/remove против простой модели: {адрес: множество id}
+    rng = random.Random(7)
+    addresses = ['0x' + rng.randbytes(20).hex() for _ in range(30)]
+    index, model = AddressIndex(), {}
+    for _ in range(2000):
+        address, wallet_id = rng.choice(addresses), rng.randrange(10)
+        if rng.random() < 0.6:
+            index.add(wallet_id, address, 'eth')
+            model.setdefault(address, set()).add(wallet_id)
+        else:
+            index.remove(wallet_id, address, 'eth')
+            model.get(address, set()).discard(wallet_id)
+    for address in addresses:
+        assert sorted(index.subscribers(address, ('eth',))) == sorted(model.get(address, ()))
+    assert index.size('eth') == sum(1 for ids in model.values() if ids)
+
+
+def test_startup_builds_index_from_populated_db(db):
+    import main
+
+    wallet_ids = [db.add_wallet(1, EVM, 'a', 'eth'), db.add_wallet(2, TRON_HEX, 'b', 'tron'),
+                  db.add_wallet(3, EVM, 'c', 'bnb')]
+    bot_data = {}
+    main.init_bot_data(bot_data, db)
+    try:
+        index = bot_data['address_index']
+        assert index.subscribers(EVM, ('eth', 'bnb')) == (wallet_ids[0], wallet_ids[2])
+        assert index.subscribers(TRON_BASE58, ('tron',)) == (wallet_ids[1],)
+        assert db.get_wallets_by_ids(index.subscribers(EVM, ('eth',))) == [(wallet_ids[0], 1, EVM, 'a', 'eth')]
+    finally:
+        bot_data['executor'].shutdown()
+
+
+def test_wallet_row_ids(db):
+    first = db.add_wallet(1, EVM, 'a', 'eth')
+    second = db.add_wallet(2, EVM, 'b', 'eth')
+    assert first and second and first != second
+    assert db.add_wallet(1, EVM, 'a', 'eth') is False
+
+    assert sorted(db.get_wallet_keys()) == [(first, EVM, 'eth'), (second, EVM, 'eth')]
+    assert db.remove_wallet(1, EVM, 'a', 'eth') == first
+    assert db.remove_wallet(1, EVM, 'a', 'eth') is None
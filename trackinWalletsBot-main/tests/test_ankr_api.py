@@ -0,0 +1,213 @@
+# tests/test_ankr_api.py
+import pytest
+
+import ankr_api
+from ankr_api import AnkrAPIError, AnkrPremiumAPI, AnkrTruncatedError
+from circuit_breaker import CircuitOpenError, get_breaker
+
+ADDRESS = '0x00000000000000000000000000000000000000aa'
+
+
+class FakeResponse:
+    def __init__(self, data=None, status_code=200, headers=None):
+        self.status_code = status_code
+        self._data = data
+        self.headers = headers or {}
+
+    def json(self):
+        return self._data
+
+
+def page_data(transfers, next_token=None):
+    result = {'transfers': transfers}
+    if next_token:
+        result['nextPageToken'] = next_token
+    return {'result': result}
+
+
+def page(transfers, next_token=None):
+    return FakeResponse(page_data(transfers, next_token))
+
+
+RATE_LIMITED = FakeResponse(status_code=429)
+API_ERROR = FakeResponse({'error': {'code': -32000, 'message': 'internal error'}})
+
+
+@pytest.fixture
+def api(monkeypatch):
+    monkeypatch.setattr(ankr_api.time, 'sleep', lambda seconds: None)
+    api = AnkrPremiumAPI('key')
+    api.sent = []
+    return api
+
+
+def script(api, monkeypatch, responses):
+    """Ответы _post по порядку; отправленные payload'ы - в api.sent"""
+    responses = list(responses)
+
+    def post(url, payload, timeout=60, headers=None):
+        api.sent.append(payload)
+        return responses.pop(0)
+
+    monkeypatch.setattr(api, '_post', post)
+
+
+# ---- batch ----
+
+def test_batch_payloads_ids_are_positions(monkeypatch):
+    monkeypatch.setitem(ankr_api.ANKR_SETTINGS, 'batch_size', 2)
+    chunks = AnkrPremiumAPI._batch_payloads([{'method': 'a'}, {'method': 'b'}, {'method': 'c'}])
+    assert [[request['id'] for request in chunk] for chunk in chunks] == [[0, 1], [2]]
+    assert all(request['jsonrpc'] == '2.0' for chunk in chunks for request in chunk)
+
+
+def test_demux_batch_by_id():
+    chunk = [{'id': 0}, {'id': 1}, {'id': 2}]
+    results = [None] * 3
+    # Ответы в другом порядке, ответа на id=1 нет, чужой id игнорируется
+    AnkrPremiumAPI._demux_batch(chunk, [{'id': 2, 'result': 'c'}, {'id': 0, 'result': 'a'}, {'id': 7}], results)
+    assert results[0] == {'id': 0, 'result': 'a'}
+    assert results[2] == {'id': 2, 'result': 'c'}
+    assert 'error' in results[1]
+
+
+def test_demux_batch_level_error():
+    chunk = [{'id': 2}, {'id': 3}]
+    results = ['done', 'done', None, None]
+    AnkrPremiumAPI._demux_batch(chunk, {'error': {'message': 'too many requests'}}, results)
+    assert results == ['done', 'done', {'error': {'message': 'too many requests'}},
+                       {'error': {'message': 'too many requests'}}]
+
+
+def test_demux_batch_non_dict_error_normalized():
+    results = [None, None]
+    AnkrPremiumAPI._demux_batch([{'id': 0}], 'Bad Gateway', results)
+    AnkrPremiumAPI._demux_batch([{'id': 1}], {'error': 'rate limited'}, results)
+    assert results == [{'error': {'message': 'Bad Gateway'}}, {'error': {'message': 'rate limited'}}]
+
+
+def test_batch_request_sends_auth_headers(api, monkeypatch):
+    script(api, monkeypatch, [FakeResponse([{'id': 0, 'result': 'a'}])])
+    seen = {}
+    post = api._post
+
+    def capture(url, payload, timeout=60, headers=None):
+        seen['headers'] = headers
+        return post(url, payload, timeout, headers)
+
+    monkeypatch.setattr(api, '_post', capture)
+    assert api.batch_request([{'method': 'a'}]) == [{'id': 0, 'result': 'a'}]
+    assert seen['headers']['Authorization'] == 'Bearer key'
+
+
+def test_batch_request_retries_after_429(api, monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(ankr_api.time, 'sleep', sleeps.append)
+    script(api, monkeypatch, [FakeResponse(status_code=429, headers={'Retry-After': '2'}),
+                              FakeResponse([{'id': 0, 'result': 'a'}])])
+    assert api.batch_request([{'method': 'a'}]) == [{'id': 0, 'result': 'a'}]
+    assert sleeps == [2.0]
+    assert len(api.sent) == 2
+
+
+def test_batch_request_429_budget_exhausted(api, monkeypatch):
+    retries = ankr_api.ANKR_SETTINGS['max_retries']
+    script(api, monkeypatch, [RATE_LIMITED] * (retries + 1))
+    results = api.batch_request([{'method': 'a'}, {'method': 'b'}])
+    assert len(api.sent) == retries + 1
+    assert all(isinstance(result['error'], dict) and 'message' in result['error'] for result in results)
+
+
+def test_batch_request_http_error_is_error_dict(api, monkeypatch):
+    script(api, monkeypatch, [FakeResponse('<html>Bad Gateway</html>', status_code=502)])
+    assert api.batch_request([{'method': 'a'}]) == [{'error': {'message': 'HTTP 502'}}]
+
+
+def test_batch_request_demuxes_chunks(api, monkeypatch):
+    monkeypatch.setitem(ankr_api.ANKR_SETTINGS, 'batch_size', 2)
+
+    def post(url, payload, timeout=60, headers=None):
+        return FakeResponse([{'id': request['id'], 'result': request['method']} for request in reversed(payload)])
+
+    monkeypatch.setattr(api, '_post', post)
+    results = api.batch_request([{'method': name} for name in 'abc'])
+    assert [result['result'] for result in results] == ['a', 'b', 'c']
+
+
+def test_batch_round_failure_recorded_once(api, monkeypatch):
+    # Три адреса по двум сетям - общий breaker multichain; ошибка batch учитывается в нем один раз
+    monkeypatch.setattr(api, 'batch_request', lambda requests_list: [API_ERROR.json()] * len(requests_list))
+    queries = [(f'0x{i:040x}', ['eth', 'bsc']) for i in range(3)]
+
+    assert api.get_token_transfers_batch(queries) == [None, None, None]
+    assert api._multichain_breaker().snapshot()['failures'] == 1
+    assert get_breaker('ankr', 'eth').snapshot()['failures'] == 0
+
+
+def test_batch_pages_and_truncation(api, monkeypatch):
+    rounds = iter([
+        [page_data([{'n': 1}], 'p2'), page_data([{'n': 10}], 'p2')],
+        [page_data([{'n': 2}]), page_data([{'n': 11}], 'p3')],
+    ])
+    monkeypatch.setattr(api, 'batch_request', lambda requests_list: next(rounds)[:len(requests_list)])
+    results = api.get_token_transfers_batch([('0x1', ['eth']), ('0x2', ['eth'])], max_pages=2)
+    # Второй адрес не уложился в max_pages - неполный результат не отдается
+    assert results == [[{'n': 1}, {'n': 2}], None]
+
+
+def test_batch_skips_unavailable_chain(api, monkeypatch):
+    for _ in range(3):
+        get_breaker('ankr', 'bsc').record_failure(RuntimeError('down'))
+    monkeypatch.setattr(api, 'batch_request', lambda requests_list: [page_data([{'n': 1}])] * len(requests_list))
+    assert api.get_token_transfers_batch([('0x1', ['bsc']), ('0x2', ['eth'])]) == [None, [{'n': 1}]]
+
+
+# ---- постраничный запрос ----
+
+def test_retries_do_not_consume_pages(api, monkeypatch):
+    script(api, monkeypatch, [RATE_LIMITED, page([{'n': 1}], 'p2'), RATE_LIMITED, page([{'n': 2}])])
+    assert api.get_token_transfers(ADDRESS, 'eth', max_pages=2) == [{'n': 1}, {'n': 2}]
+    assert api.sent[-1]['params']['pageToken'] == 'p2'
+    assert get_breaker('ankr', 'eth').snapshot()['failures'] == 0
+
+
+def test_retry_budget_exhausted(api, monkeypatch):
+    retries = ankr_api.ANKR_SETTINGS['max_retries']
+    script(api, monkeypatch, [RATE_LIMITED] * (retries + 1))
+    with pytest.raises(AnkrAPIError):
+        api.get_token_transfers(ADDRESS, 'eth', max_pages=10)
+    assert len(api.sent) == retries + 1
+    assert get_breaker('ankr', 'eth').snapshot()['failures'] == 1
+
+
+def test_api_error_raises_and_records_once(api, monkeypatch):
+    script(api, monkeypatch, [page([{'n': 1}], 'p2'), API_ERROR])
+    with pytest.raises(AnkrAPIError):
+        api.get_token_transfers(ADDRESS, 'eth')
+    assert get_breaker('ankr', 'eth').snapshot()['failures'] == 1
+
+
+def test_truncated_window(api, monkeypatch):
+    script(api, monkeypatch, [page([{'n': 1}], 'p2'), page([{'n': 2}], 'p3')])
+    with pytest.raises(AnkrTruncatedError):
+        api.get_token_transfers(ADDRESS, 'eth', max_pages=2)
+    # Сеть ответила - неполное окно не ошибка сети
+    assert get_breaker('ankr', 'eth').snapshot()['failures'] == 0
+
+
+def test_multichain_failure_counted_in_multichain_breaker(api, monkeypatch):
+    script(api, monkeypatch, [FakeResponse(status_code=502)])
+    with pytest.raises(AnkrAPIError):
+        api.get_token_transfers_multichain(ADDRESS, ['eth', 'bsc'])
+    assert api._multichain_breaker().snapshot()['failures'] == 1
+    assert get_breaker('ankr', 'eth').snapshot()['failures'] == 0
+    assert get_breaker('ankr', 'bsc').snapshot()['failures'] == 0
+
+
+def test_unavailable_chain_fails_whole_request(api, monkeypatch):
+    for _ in range(3):
+        get_breaker('ankr', 'bsc').record_failure(RuntimeError('down'))
+    script(api, monkeypatch, [])
+    with pytest.raises(CircuitOpenError):
+        api.get_token_transfers_multichain(ADDRESS, ['eth', 'bsc'])
+    assert api.sent == []
@@ -0,0 +1,136 @@
+# tests/test_block_follower.py
+import time
+
+import pytest
+
+import block_follower
+import rpc_client
+from block_follower import NativeBlockFollower
+from deadline import DeadlineExceeded, request_deadline
+
+WATCHED = '0x' + 'ab' * 20
+OTHER = '0x' + 'cd' * 20
+
+
+def block(number, transactions=()):
+    return {'number': hex(number), 'timestamp': hex(1_700_000_000 + number), 'transactions': list(transactions)}
+
+
+def transfer(to, value, tx_hash='0x1'):
+    return {'hash': tx_hash, 'from': OTHER, 'to': to, 'value': hex(value)}
+
+
+class FakeNode:
+    """JSON-RPC нода для _send: eth_blockNumber и eth_getBlockByNumber по словарю блоков"""
+
+    def __init__(self, head, blocks):
+        self.head = head
+        self.blocks = blocks
+        self.requested = []
+
+    def __call__(self, payload):
+        if isinstance(payload, list):
+            return [self.answer(request) for request in payload]
+        return self.answer(payload)
+
+    def answer(self, request):
+        if request['method'] == 'eth_blockNumber':
+            return {'id': request['id'], 'result': hex(self.head)}
+        number = int(request['params'][0], 16)
+        self.requested.append(number)
+        return {'id': request['id'], 'result': self.blocks.get(number)}
+
+
+@pytest.fixture
+def follower(monkeypatch):
+    monkeypatch.setitem(block_follower.BLOCK_FOLLOWER_SETTINGS, 'confirmations', 2)
+    monkeypatch.setitem(block_follower.BLOCK_FOLLOWER_SETTINGS, 'max_blocks_per_poll', 100)
+    return NativeBlockFollower('bsc')
+
+
+def test_first_poll_starts_at_confirmed_head(follower, monkeypatch):
+    monkeypatch.setattr(follower, '_send', FakeNode(head=110, blocks={}))
+    assert follower.poll({WATCHED}, None) == ([], 108)
+
+
+def test_matches_watched_recipients(follower, monkeypatch):
+    blocks = {
+        101: block(101, [transfer('0x' + 'AB' * 20, 10 ** 18, '0xa'), transfer(OTHER, 5)]),
+        102: block(102, [transfer(WATCHED, 0, '0xzero'), {'hash': '0xcreate', 'to': None, 'value': '0x1'}]),
+    }
+    monkeypatch.setattr(follower, '_send', FakeNode(head=104, blocks=blocks))
+    transfers, cursor = follower.poll({WATCHED}, 100)
+    assert cursor == 102
+    assert [(tx['hash'], tx['to'], tx['value'], tx['block_number']) for tx in transfers] == [('0xa', WATCHED, 1.0, 101)]
+    assert transfers[0]['token'] == follower.native_token and transfers[0]['is_native']
+
+
+def test_cursor_stops_at_missing_block(follower, monkeypatch):
+    node = FakeNode(head=106, blocks={101: block(101), 103: block(103, [transfer(WATCHED, 1)])})
+    monkeypatch.setattr(follower, '_send', node)
+    transfers, cursor = follower.poll({WATCHED}, 100)
+    # Блок 102 нода не отдала - 103 будет прочитан повторно в следующий раз
+    assert (transfers, cursor) == ([], 101)
+
+
+def test_poll_is_capped(follower, monkeypatch):
+    monkeypatch.setitem(block_follower.BLOCK_FOLLOWER_SETTINGS, 'max_blocks_per_poll', 3)
+    node = FakeNode(head=200, blocks={number: block(number) for number in range(101, 199)})
+    monkeypatch.setattr(follower, '_send', node)
+    assert follower.poll({WATCHED}, 100) == ([], 103)
+    assert node.requested == [101, 102, 103]
+
+
+def test_nothing_new_below_confirmations(follower, monkeypatch):
+    monkeypatch.setattr(follower, '_send', FakeNode(head=102, blocks={}))
+    assert follower.poll({WATCHED}, 100) == ([], 100)
+
+
+# ---- дедлайн ----
+
+class FakeSession:
+    def __init__(self):
+        self.timeouts = []
+
+    def post(self, url, json=None, timeout=None):
+        self.timeouts.append(timeout)
+        return self
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {'jsonrpc': '2.0', 'id': 1, 'result': '0x10'}
+
+
+@pytest.fixture
+def session(monkeypatch):
+    session = FakeSession()
+    monkeypatch.setattr(rpc_client.http_pool, 'session', lambda url: session)
+    return session
+
+
+def test_rpc_timeout_bounded_by_deadline(follower, session):
+    assert follower.get_block_number() == 16
+    with request_deadline(time.monotonic() + 1):
+        follower.get_block_number()
+    assert session.timeouts[0] == rpc_client.LOG_SCANNER_SETTINGS['timeout']
+    assert 0 < session.timeouts[1] <= 1
+
+
+def test_rpc_after_deadline_not_sent(follower, session):
+    with request_deadline(time.monotonic() - 1):
+        with pytest.raises(DeadlineExceeded):
+            follower.get_block_number()
+    assert session.timeouts == []
+    # Истекший дедлайн - не отказ сети
+    assert follower.breaker.snapshot()['failures'] == 0
+
+
+def test_poll_job_runs_under_deadline(follower, session):
+    from bot_handlers import _poll_sync
+
+    with pytest.raises(DeadlineExceeded):
+        _poll_sync(follower.poll, time.monotonic() - 1, {WATCHED}, 100)
+    assert _poll_sync(follower.poll, time.monotonic() + 5, {WATCHED}, None) == ([], 16 - 2)
+    assert 0 < session.timeouts[-1] <= 5
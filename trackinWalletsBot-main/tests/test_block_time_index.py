@@ -0,0 +1,112 @@
+# tests/test_block_time_index.py
+import pytest
+
+from block_time_index import BlockTimeIndex, ResolveBudgetExceeded
+
+GENESIS = 1_600_000_000
+HEAD = 50_000
+
+
+def block_time(block: int) -> int:
+    # Неравномерные блоки: в первой половине по три блока с одним временем, во второй - раз в 12 сек
+    if block < HEAD // 2:
+        return GENESIS + block // 3 * 2
+    return GENESIS + (HEAD // 2) // 3 * 2 + 2 + (block - HEAD // 2) * 12
+
+
+def expected(timestamp: int, closest: str):
+    if closest == 'before':
+        found = [block for block in range(HEAD + 1) if block_time(block) <= timestamp]
+        return found[-1] if found else None
+    found = [block for block in range(HEAD + 1) if block_time(block) >= timestamp]
+    return found[0] if found else None
+
+
+class Chain:
+    """Сеть-заглушка: считает запросы к 'провайдеру'"""
+
+    def __init__(self):
+        self.requests = 0
+
+    def fetch_time(self, block: int) -> int:
+        assert 0 <= block <= HEAD
+        self.requests += 1
+        return block_time(block)
+
+    def fetch_head(self):
+        self.requests += 1
+        return HEAD, block_time(HEAD)
+
+
+@pytest.fixture
+def index(tmp_path):
+    return BlockTimeIndex(str(tmp_path / 'blocks.db'))
+
+
+@pytest.fixture
+def chain():
+    return Chain()
+
+
+@pytest.mark.parametrize('closest', ['before', 'after'])
+@pytest.mark.parametrize('timestamp', [GENESIS + 1001, GENESIS + 50_001, block_time(40_000), block_time(HEAD) - 7])
+def test_resolve_matches_brute_force(index, chain, timestamp, closest):
+    assert index.resolve(1, timestamp, closest, chain.fetch_time, chain.fetch_head) == expected(timestamp, closest)
+
+
+def test_known_points_answer_without_requests(index, chain):
+    timestamp = block_time(30_000) + 3
+    answer = index.resolve(1, timestamp, 'before', chain.fetch_time, chain.fetch_head)
+    requests = chain.requests
+
+    assert index.lookup(1, timestamp, 'before') == answer
+    assert index.resolve(1, timestamp, 'before', chain.fetch_time, chain.fetch_head) == answer
+    assert chain.requests == requests
+
+
+def test_points_survive_restart(index, chain, tmp_path):
+    timestamp = block_time(12_345)
+    answer = index.resolve(1, timestamp, 'after', chain.fetch_time, chain.fetch_head)
+
+    restarted = BlockTimeIndex(str(tmp_path / 'blocks.db'))
+    assert restarted.lookup(1, timestamp, 'after') == answer == 12_345
+
+
+def test_future_time(index, chain):
+    future = block_time(HEAD) + 100
+    assert index.resolve(1, future, 'before', chain.fetch_time, chain.fetch_head) == HEAD
+    assert index.resolve(1, future, 'after', chain.fetch_time, chain.fetch_head) is None
+
+
+def test_budget_without_lower_point_fails_fast(index, chain):
+    with pytest.raises(ResolveBudgetExceeded):
+        index.resolve(1, GENESIS + 5000, 'before', chain.fetch_time, chain.fetch_head, max_requests=6)
+    assert chain.requests == 0
+
+
+def test_budget_exhausted_keeps_found_points(index, chain):
+    for block in (0, HEAD):
+        index.observe(1, block, block_time(block), exact=True)
+    timestamp = block_time(33_333) + 1
+
+    with pytest.raises(ResolveBudgetExceeded):
+        index.resolve(1, timestamp, 'before', chain.fetch_time, chain.fetch_head, max_requests=2)
+    assert chain.requests == 2
+
+    # Следующий вызов продолжает с уже найденных точек
+    answer = index.resolve(1, timestamp, 'before', chain.fetch_time, chain.fetch_head)
+    assert answer == expected(timestamp, 'before')
+
+
+def test_budget_enough_for_narrow_bracket(index, chain):
+    index.observe(1, 33_000, block_time(33_000), exact=True)
+    index.observe(1, 33_100, block_time(33_100), exact=True)
+    timestamp = block_time(33_050)
+    assert index.resolve(1, timestamp, 'after', chain.fetch_time, chain.fetch_head, max_requests=10) == 33_050
+    assert chain.requests <= 10
+
+
+def test_remembered_provider_answer(index, chain):
+    index.remember_answer(1, GENESIS + 5000, 'before', 2500)
+    assert index.resolve(1, GENESIS + 5000, 'before', chain.fetch_time, chain.fetch_head, max_requests=1) == 2500
+    assert chain.requests == 0
@@ -0,0 +1,137 @@
+# tests/test_circuit_breaker.py
+import asyncio
+
+import pytest
+
+import circuit_breaker
+from circuit_breaker import CircuitBreaker, CircuitOpenError, get_breaker, is_available
+from deadline import DeadlineExceeded
+
+
+class QuotaError(Exception):
+    pass
+
+
+@pytest.fixture(autouse=True)
+def fake_time(monkeypatch, clock):
+    monkeypatch.setattr(circuit_breaker.time, 'monotonic', clock)
+
+
+@pytest.fixture
+def breaker():
+    return CircuitBreaker('test', 1, failure_threshold=3, recovery_timeout=60, ignored_exceptions=(QuotaError,))
+
+
+def fail(error=RuntimeError('down')):
+    raise error
+
+
+def test_opens_after_consecutive_failures(breaker):
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            breaker.call(fail)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    with pytest.raises(RuntimeError):
+        breaker.call(fail)
+    assert breaker.state == CircuitBreaker.OPEN
+
+    # Открытый breaker не вызывает функцию
+    calls = []
+    with pytest.raises(CircuitOpenError):
+        breaker.call(calls.append, 1)
+    assert calls == []
+
+
+def test_success_resets_failure_count(breaker):
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            breaker.call(fail)
+    assert breaker.call(lambda: 'ok') == 'ok'
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            breaker.call(fail)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.parametrize('error', [QuotaError('quota'), DeadlineExceeded('deadline')])
+def test_ignored_errors_do_not_count(breaker, error):
+    for _ in range(5):
+        with pytest.raises(type(error)):
+            breaker.call(fail, error)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.snapshot()['failures'] == 0
+
+
+def test_call_async(breaker):
+    async def failing():
+        raise RuntimeError('down')
+
+    async def scenario():
+        for _ in range(3):
+            with pytest.raises(RuntimeError):
+                await breaker.call_async(failing)
+        with pytest.raises(CircuitOpenError):
+            await breaker.call_async(failing)
+
+    asyncio.run(scenario())
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def open_breaker(breaker):
+    for _ in range(3):
+        breaker.record_failure(RuntimeError('down'))
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_probe_due_after_recovery_timeout(breaker, clock):
+    open_breaker(breaker)
+    assert not breaker.probe_due()
+    clock.advance(60)
+    assert breaker.probe_due()
+
+
+def test_successful_probe_closes(breaker, clock):
+    open_breaker(breaker)
+    states = []
+    breaker.probe = lambda: states.append(breaker.state)
+    clock.advance(60)
+    breaker.run_probe()
+    assert states == [CircuitBreaker.HALF_OPEN]
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow_request()
+
+
+def test_failed_probe_reopens_with_new_timeout(breaker, clock):
+    open_breaker(breaker)
+    breaker.probe = fail
+    clock.advance(60)
+    breaker.run_probe()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.probe_due()
+    clock.advance(60)
+    assert breaker.probe_due()
+
+
+def test_half_open_rejects_regular_requests(breaker):
+    open_breaker(breaker)
+    breaker._state = CircuitBreaker.HALF_OPEN
+    assert not breaker.allow_request()
+    # Одна ошибка в half-open снова открывает breaker
+    breaker.record_failure(RuntimeError('down'))
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_probe_open_breakers_probes_only_due(clock):
+    due = get_breaker('test-probe', 'due')
+    fresh = get_breaker('test-probe', 'fresh')
+    open_breaker(due)
+    clock.advance(due.recovery_timeout)
+    open_breaker(fresh)
+    due.probe = fresh.probe = lambda: None
+
+    circuit_breaker.probe_open_breakers()
+    assert due.state == CircuitBreaker.CLOSED
+    assert fresh.state == CircuitBreaker.OPEN
+    assert is_available('test-probe', 'due') and not is_available('test-probe', 'fresh')
+    assert is_available('test-probe', 'unknown')
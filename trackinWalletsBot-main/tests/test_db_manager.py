@@ -0,0 +1,92 @@
+# tests/test_db_manager.py
+from datetime import datetime
+
+import pytest
+
+from config import TZ_UTC_PLUS_3
+
+ADDRESS = '0x00000000000000000000000000000000000000aa'
+TS = 1_700_000_000
+DAY = datetime.fromtimestamp(TS, TZ_UTC_PLUS_3).strftime('%Y-%m-%d')
+NEXT_DAY = datetime.fromtimestamp(TS + 86400, TZ_UTC_PLUS_3).strftime('%Y-%m-%d')
+
+# TRON кошелек в base58 и тот же кошелек в hex
+TRON_BASE58 = 'TR7NHqjeKQxGTCi8q8ZY4pL8otSzgjLj6t'
+TRON_HEX = '41a614f803b6fd780986a42c78ec9c7f77e6ded13c'
+
+
+def native(tx_hash, value, timestamp=TS):
+    return {'hash': tx_hash, 'from': '0xsender', 'to': ADDRESS, 'value': value, 'value_raw': int(value * 10 ** 18),
+            'timestamp': timestamp, 'block_number': 100, 'token_symbol': 'ETH', 'is_native': True}
+
+
+def token(tx_hash, value, log_index=None, timestamp=TS):
+    tx = {'hash': tx_hash, 'from': '0xsender', 'to': ADDRESS, 'value': value, 'value_raw': int(value * 10 ** 6),
+          'timestamp': timestamp, 'block_number': 100, 'token_symbol': 'USDT', 'contract_address': '0xusdt',
+          'is_native': False}
+    if log_index is not None:
+        tx['log_index'] = log_index
+    return tx
+
+
+def totals(db):
+    return {token_name: (round(amount, 6), count)
+            for token_name, amount, count in db.get_period_totals('evm', ADDRESS, DAY, NEXT_DAY)}
+
+
+def test_save_transfers_skips_duplicates(db):
+    assert db.save_transfers('evm', 1, [native('0x1', 1.0), token('0x2', 5.0, log_index=3)]) == 2
+    assert db.save_transfers('evm', 1, [native('0x1', 1.0), token('0x2', 5.0, log_index=3)]) == 0
+    assert len(db.get_transfers('evm', 1, ADDRESS, TS, TS + 1)) == 2
+
+
+@pytest.mark.parametrize('first_indexed', [False, True])
+def test_twin_transfer_stored_once(db, first_indexed):
+    # Один и тот же перевод: без индекса лога (ANKR) и с индексом (сканер логов), в любом порядке
+    without_index, with_index = token('0x1', 5.0), token('0x1', 5.0, log_index=7)
+    batches = [[with_index], [without_index]] if first_indexed else [[without_index], [with_index]]
+    for batch in batches:
+        assert db.save_transfers('evm', 1, batch) == 1
+
+    rows = db.get_transfers('evm', 1, ADDRESS, TS, TS + 1)
+    assert [(tx_hash, log_index) for tx_hash, log_index, *_ in rows] == [('0x1', 7)]
+
+
+def test_daily_totals_trigger_counts_new_transfers(db):
+    db.save_transfers('evm', 1, [native('0x1', 0.001), token('0x2', 5.0, log_index=3),
+                                 token('0x3', 0.005, log_index=4)])
+
+    # Нативные учитываются всегда, токены до 0.01 - нет
+    assert totals(db) == {'ETH': (0.001, 1), 'USDT': (5.0, 1)}
+
+    # Повторная вставка не меняет суммы
+    db.save_transfers('evm', 1, [token('0x2', 5.0, log_index=3)])
+    assert totals(db) == {'ETH': (0.001, 1), 'USDT': (5.0, 1)}
+
+
+def test_daily_totals_uses_utc_plus_3_day(db):
+    db.save_transfers('evm', 1, [token('0x1', 2.0, log_index=0, timestamp=TS + 86400)])
+    assert totals(db) == {}
+    day_after = datetime.fromtimestamp(TS + 2 * 86400, TZ_UTC_PLUS_3).strftime('%Y-%m-%d')
+    assert db.get_period_totals('evm', ADDRESS, NEXT_DAY, day_after) == [('USDT', 2.0, 1)]
+
+
+def test_rebuild_daily_totals_matches_trigger(db):
+    db.save_transfers('evm', 1, [native('0x1', 1.0), token('0x2', 5.0), token('0x2', 5.0, log_index=1),
+                                 token('0x3', 0.001, log_index=2)])
+    expected = totals(db)
+
+    with db._cursor(commit=True) as cursor:
+        db._rebuild_daily_totals(cursor)
+    assert totals(db) == expected == {'ETH': (1.0, 1), 'USDT': (5.0, 1)}
+
+
+def test_unique_wallets_grouped_by_ledger_key(db):
+    db.add_wallet(1, TRON_BASE58, 'a', 'tron')
+    db.add_wallet(2, TRON_HEX, 'b', 'tron')
+    db.add_wallet(3, ADDRESS.upper().replace('0X', '0x'), 'c', 'eth')
+    db.add_wallet(4, ADDRESS, 'd', 'eth')
+    db.add_wallet(5, ADDRESS, 'e', 'bnb')
+
+    # hex и base58 форма TRON кошелька - одна пара, регистр base58 сохраняется; EVM - в нижнем регистре
+    assert db.get_unique_wallets() == [(ADDRESS, 'bnb'), (ADDRESS, 'eth'), (TRON_BASE58, 'tron')]
@@ -0,0 +1,63 @@
+# tests/test_http_cache.py
+import pytest
+
+import http_cache
+from http_cache import ResponseCache
+
+FINALITY = http_cache.HTTP_CACHE_SETTINGS['finality']
+OPEN_TTL = http_cache.HTTP_CACHE_SETTINGS['open_ttl']
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch, clock):
+    monkeypatch.setattr(http_cache.time, 'time', clock)
+    cache = ResponseCache(str(tmp_path / 'http_cache.db'))
+    cache.enabled = True
+    return cache
+
+
+def test_key_ignores_dict_order():
+    assert ResponseCache.key('ankr', {'a': 1, 'b': 2}) == ResponseCache.key('ankr', {'b': 2, 'a': 1})
+    assert ResponseCache.key('ankr', {'a': 1}) != ResponseCache.key('etherscan', {'a': 1})
+
+
+def test_closed_window_never_expires(cache, clock, tmp_path):
+    cache.set('closed', {'result': [1, 2]}, window_end=int(clock.now) - FINALITY - 1)
+    clock.advance(365 * 86400)
+    assert cache.get('closed') == {'result': [1, 2]}
+
+    # И переживает перезапуск
+    restarted = ResponseCache(str(tmp_path / 'http_cache.db'))
+    restarted.enabled = True
+    assert restarted.get('closed') == {'result': [1, 2]}
+
+
+def test_open_window_expires_after_open_ttl(cache, clock):
+    cache.set('open', {'result': []}, window_end=int(clock.now))
+    clock.advance(OPEN_TTL - 1)
+    assert cache.get('open') == {'result': []}
+    clock.advance(2)
+    assert cache.get('open') is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_no_window_end_not_cached(cache):
+    cache.set('latest', {'result': 1}, window_end=None)
+    assert cache.get('latest') is None
+
+
+def test_disabled_cache(cache, clock):
+    cache.enabled = False
+    cache.set('closed', {'result': 1}, window_end=int(clock.now) - FINALITY - 1)
+    cache.enabled = True
+    assert cache.get('closed') is None
+
+
+def test_expired_rows_purged_on_open(cache, clock, tmp_path):
+    cache.set('open', {'result': 1}, window_end=int(clock.now))
+    cache.set('closed', {'result': 2}, window_end=int(clock.now) - FINALITY - 1)
+    clock.advance(OPEN_TTL + 1)
+
+    restarted = ResponseCache(str(tmp_path / 'http_cache.db'))
+    restarted.enabled = True
+    assert restarted._db().execute("SELECT key FROM responses").fetchall() == [('closed',)]
@@ -0,0 +1,110 @@
+# tests/test_ledger_sync.py
+import sqlite3
+
+import pytest
+
+import bot_handlers
+from bot_handlers import _ledger_collect, _ledger_fetch_start, _ledger_store
+from config import LEDGER_SETTINGS
+from db_manager import DatabaseManager
+
+WALLET = '0x00000000000000000000000000000000000000AA'
+CHAIN = 1
+DAY_START = 1_700_000_000
+DAY_END = DAY_START + 86400
+OVERLAP = LEDGER_SETTINGS['sync_overlap']
+
+
+@pytest.fixture(autouse=True)
+def ledger_enabled(monkeypatch):
+    monkeypatch.setitem(bot_handlers.LEDGER_SETTINGS, 'enabled', True)
+
+
+def incoming(tx_hash, timestamp, value=1.0):
+    return {'hash': tx_hash, 'from': '0xsender', 'to': WALLET.lower(), 'value': value, 'timestamp': timestamp,
+            'block_number': timestamp // 12, 'token_symbol': 'ETH', 'is_native': True}
+
+
+def test_fetch_start_without_ledger_is_whole_window(db):
+    assert _ledger_fetch_start(db, CHAIN, WALLET, DAY_START, DAY_END) == DAY_START
+
+
+def test_fetch_start_disabled_ledger(db, monkeypatch):
+    _ledger_store(db, CHAIN, WALLET, {'native': []}, DAY_START, DAY_END, DAY_END)
+    monkeypatch.setitem(bot_handlers.LEDGER_SETTINGS, 'enabled', False)
+    assert _ledger_fetch_start(db, CHAIN, WALLET, DAY_START, DAY_END) == DAY_START
+
+
+def test_fetch_start_after_partial_sync_keeps_overlap(db):
+    synced_until = DAY_START + 3600
+    _ledger_store(db, CHAIN, WALLET, {'native': [incoming('0x1', DAY_START + 60)]}, DAY_START, synced_until, DAY_END)
+
+    assert _ledger_fetch_start(db, CHAIN, WALLET, DAY_START, DAY_END) == synced_until - OVERLAP
+
+
+def test_fetch_start_overlap_stays_inside_window(db):
+    _ledger_store(db, CHAIN, WALLET, {'native': []}, DAY_START, DAY_START + OVERLAP // 2, DAY_END)
+    assert _ledger_fetch_start(db, CHAIN, WALLET, DAY_START, DAY_END) == DAY_START
+
+
+def test_fetch_start_window_fully_synced(db):
+    _ledger_store(db, CHAIN, WALLET, {'native': []}, DAY_START, DAY_END + 100, DAY_END)
+    assert _ledger_fetch_start(db, CHAIN, WALLET, DAY_START, DAY_END) is None
+
+
+def test_fetch_start_gap_before_sync_refetches_window(db):
+    # Журнал покрывает только вторую половину суток - начало окна не покрыто, запрашиваем все окно
+    _ledger_store(db, CHAIN, WALLET, {'native': []}, DAY_START + 43200, DAY_END, DAY_END)
+    assert _ledger_fetch_start(db, CHAIN, WALLET, DAY_START, DAY_END) == DAY_START
+
+
+def test_fetch_start_gap_after_sync_refetches_window(db):
+    # Синхронизация закончилась до начала окна (бот не работал) - между ними разрыв
+    _ledger_store(db, CHAIN, WALLET, {'native': []}, DAY_START - 86400, DAY_START - 3600, DAY_START)
+    assert _ledger_fetch_start(db, CHAIN, WALLET, DAY_START, DAY_END) == DAY_START
+
+
+def test_store_extends_contiguous_sync(db):
+    _ledger_store(db, CHAIN, WALLET, {'native': []}, DAY_START, DAY_START + 3600, DAY_END)
+    fetch_start = _ledger_fetch_start(db, CHAIN, WALLET, DAY_START, DAY_END)
+    _ledger_store(db, CHAIN, WALLET, {'native': []}, fetch_start, DAY_START + 7200, DAY_END)
+    assert db.get_ledger_sync('evm', CHAIN, WALLET.lower()) == (DAY_START, DAY_START + 7200)
+
+
+def test_store_never_syncs_past_window_end(db):
+    _ledger_store(db, CHAIN, WALLET, {'native': []}, DAY_START, DAY_END + 5000, DAY_END)
+    assert db.get_ledger_sync('evm', CHAIN, WALLET.lower()) == (DAY_START, DAY_END)
+
+
+def test_store_after_gap_restarts_sync(db):
+    _ledger_store(db, CHAIN, WALLET, {'native': []}, DAY_START - 86400, DAY_START - 3600, DAY_START)
+    _ledger_store(db, CHAIN, WALLET, {'native': []}, DAY_START, DAY_START + 600, DAY_END)
+    assert db.get_ledger_sync('evm', CHAIN, WALLET.lower()) == (DAY_START, DAY_START + 600)
+
+
+def test_collect_merges_overlap_without_duplicates(db):
+    first = {'native': [incoming('0x1', DAY_START + 100), incoming('0x2', DAY_START + 3500)]}
+    result = _ledger_collect(db, first, CHAIN, WALLET, DAY_START, DAY_START + 3600, DAY_START, DAY_END)
+    assert [tx['hash'] for tx in result['native']] == ['0x1', '0x2']
+
+    # Повторное чтение запаса возвращает 0x2 еще раз и поздно проиндексированный 0x3
+    fetch_start = _ledger_fetch_start(db, CHAIN, WALLET, DAY_START, DAY_END)
+    second = {'native': [incoming('0x2', DAY_START + 3500), incoming('0x3', DAY_START + 3400)]}
+    result = _ledger_collect(db, second, CHAIN, WALLET, fetch_start, DAY_START + 7200, DAY_START, DAY_END)
+    assert [tx['hash'] for tx in result['native']] == ['0x1', '0x3', '0x2']
+
+
+def test_collect_without_result_reads_ledger_only(db):
+    _ledger_store(db, CHAIN, WALLET, {'native': [incoming('0x1', DAY_START + 100)]}, DAY_START, DAY_END, DAY_END)
+    result = _ledger_collect(db, None, CHAIN, WALLET, None, DAY_END, DAY_START, DAY_END)
+    assert [tx['hash'] for tx in result['native']] == ['0x1']
+    assert result['native'][0]['to'] == WALLET
+
+
+def test_sync_cursors_table_dropped(tmp_path):
+    path = str(tmp_path / 'old.db')
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE sync_cursors (network TEXT, chain_id, address TEXT)")
+    DatabaseManager(path).close()
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sync_cursors'").fetchone() is None
@@ -0,0 +1,133 @@
+# tests/test_log_scanner.py
+import pytest
+
+import log_scanner
+from log_scanner import TRANSFER_TOPIC, TransferLogScanner, _decode_abi_string, _topic_address
+from rpc_client import ChainRpcClient, LogRangeTooLargeError, RpcError
+
+WALLET = '0x' + 'ab' * 20
+OTHER = '0x' + 'cd' * 20
+TOKEN = '0x' + 'ef' * 20
+
+
+def transfer_log(block, to=WALLET, value=10 ** 18, log_index=0, tx_hash='0x1'):
+    return {'address': '0x' + 'EF' * 20, 'blockNumber': hex(block), 'logIndex': hex(log_index),
+            'transactionHash': tx_hash, 'data': hex(value),
+            'topics': [TRANSFER_TOPIC, _topic_address(OTHER), _topic_address(to)]}
+
+
+@pytest.fixture
+def scanner(monkeypatch):
+    monkeypatch.setattr(TransferLogScanner, '_token_meta', {})
+    monkeypatch.setitem(log_scanner.LOG_SCANNER_SETTINGS, 'max_blocks_per_query', 8)
+    return TransferLogScanner('bsc')
+
+
+class FakeLogs:
+    """eth_getLogs ноды, которая отказывает в диапазонах шире max_span блоков"""
+
+    def __init__(self, max_span, logs_per_block=1):
+        self.max_span = max_span
+        self.logs_per_block = logs_per_block
+        self.queries = []
+
+    def __call__(self, topic_addresses, from_block, to_block):
+        self.queries.append((len(topic_addresses), from_block, to_block))
+        if to_block - from_block + 1 > self.max_span:
+            raise LogRangeTooLargeError('query returned more than 10000 results')
+        return [{'blockNumber': hex(block)} for block in range(from_block, to_block + 1)
+                for _ in range(self.logs_per_block)]
+
+
+def test_range_split_covers_window_once(scanner, monkeypatch):
+    node = FakeLogs(max_span=3)
+    monkeypatch.setattr(scanner, '_get_logs', node)
+    logs = list(scanner.iter_logs([WALLET], 100, 130))
+    assert [int(log['blockNumber'], 16) for log in logs] == list(range(100, 131))
+    served = [(start, end) for _, start, end in node.queries if end - start + 1 <= 3]
+    # Отданные диапазоны идут подряд, без пропусков и повторов
+    assert served[0][0] == 100 and served[-1][1] == 130
+    assert all(prev_end + 1 == start for (_, prev_end), (start, _) in zip(served, served[1:]))
+
+
+def test_window_grows_back_after_success(scanner, monkeypatch):
+    node = FakeLogs(max_span=8)
+    monkeypatch.setattr(scanner, '_get_logs', node)
+    calls = iter([LogRangeTooLargeError('limit exceeded')])
+
+    def flaky(topic_addresses, from_block, to_block):
+        error = next(calls, None)
+        if error:
+            node.queries.append((len(topic_addresses), from_block, to_block))
+            raise error
+        return node(topic_addresses, from_block, to_block)
+
+    monkeypatch.setattr(scanner, '_get_logs', flaky)
+    list(scanner.iter_logs([WALLET], 0, 31))
+    assert [(start, end) for _, start, end in node.queries] == [(0, 7), (0, 3), (4, 11), (12, 19), (20, 27),
+                                                                (28, 31)]
+
+
+def test_single_block_too_large_raises(scanner, monkeypatch):
+    monkeypatch.setattr(scanner, '_get_logs', FakeLogs(max_span=0))
+    with pytest.raises(LogRangeTooLargeError):
+        list(scanner.iter_logs([WALLET], 100, 103))
+
+
+def test_addresses_split_into_topic_chunks(scanner, monkeypatch):
+    monkeypatch.setitem(log_scanner.LOG_SCANNER_SETTINGS, 'max_addresses_per_query', 2)
+    node = FakeLogs(max_span=100, logs_per_block=0)
+    monkeypatch.setattr(scanner, '_get_logs', node)
+    list(scanner.iter_logs([f'0x{i:040x}' for i in range(5)], 1, 4))
+    assert [count for count, _, _ in node.queries] == [2, 2, 1]
+
+
+@pytest.mark.parametrize('message, error', [
+    ('query returned more than 10000 results', LogRangeTooLargeError),
+    ('Log response size exceeded', LogRangeTooLargeError),
+    ('block range is too large', LogRangeTooLargeError),
+    ('execution reverted', RpcError),
+])
+def test_rpc_error_classification(message, error):
+    with pytest.raises(error) as raised:
+        ChainRpcClient._raise_rpc_error({'code': -32005, 'message': message})
+    assert type(raised.value) is error
+
+
+def test_scan_window_parses_incoming_transfers(scanner, monkeypatch):
+    logs = [
+        transfer_log(101, value=5 * 10 ** 18, log_index=3, tx_hash='0xa'),
+        transfer_log(102, to=OTHER, tx_hash='0xb'),
+        transfer_log(103, value=0, tx_hash='0xzero'),
+        {**transfer_log(104, tx_hash='0xnoindex'), 'topics': [TRANSFER_TOPIC, _topic_address(OTHER)]},
+    ]
+    monkeypatch.setattr(scanner, 'find_block_by_time', lambda timestamp, closest='before': timestamp)
+    monkeypatch.setattr(scanner, 'iter_logs', lambda addresses, from_block, to_block: iter(logs))
+    monkeypatch.setattr(scanner, 'get_block_timestamps', lambda numbers: {number: 1_000 + number for number in numbers})
+    monkeypatch.setattr(scanner, 'token_meta', lambda contract_address: ('USDT', 18))
+
+    transfers = scanner.scan_window(['0x' + 'AB' * 20], 100, 200)
+    assert list(transfers) == [WALLET]
+    assert transfers[WALLET] == [{
+        'hash': '0xa', 'log_index': 3, 'from': OTHER, 'to': WALLET, 'value': 5.0, 'value_raw': 5 * 10 ** 18,
+        'contract_address': TOKEN, 'token_symbol': 'USDT', 'timestamp': 1_101, 'is_native': False,
+        'network': 'bsc',
+    }]
+
+
+def test_token_meta_from_eth_call_cached(scanner, monkeypatch):
+    symbol = '0x' + (32).to_bytes(32, 'big').hex() + (4).to_bytes(32, 'big').hex() + b'CAKE'.hex().ljust(64, '0')
+    calls = []
+
+    def rpc_batch(batch):
+        calls.append(batch)
+        return [hex(9), symbol]
+
+    monkeypatch.setattr(scanner, 'rpc_batch', rpc_batch)
+    assert scanner.token_meta(TOKEN) == ('CAKE', 9)
+    assert TransferLogScanner('bsc').token_meta(TOKEN) == ('CAKE', 9)
+    assert len(calls) == 1
+
+
+def test_decode_bytes32_symbol():
+    assert _decode_abi_string('0x' + b'MKR'.hex().ljust(64, '0')) == 'MKR'
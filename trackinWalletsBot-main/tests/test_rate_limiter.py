@@ -0,0 +1,58 @@
+# tests/test_rate_limiter.py
+import pytest
+
+import rate_limiter
+from rate_limiter import TokenBucket, get_rate_limiter
+
+
+@pytest.fixture(autouse=True)
+def fake_time(monkeypatch, clock):
+    monkeypatch.setattr(rate_limiter.time, 'monotonic', clock)
+
+
+def test_burst_is_free_then_waits_by_rate():
+    bucket = TokenBucket(rate=10, burst=3)
+    assert [bucket._reserve() for _ in range(3)] == [0, 0, 0]
+    # Каждый следующий вызов ждет на 1/rate дольше предыдущего
+    assert [round(bucket._reserve(), 6) for _ in range(3)] == [0.1, 0.2, 0.3]
+
+
+def test_tokens_refill_over_time(clock):
+    bucket = TokenBucket(rate=2, burst=2)
+    bucket._reserve()
+    bucket._reserve()
+    clock.advance(1)
+    assert bucket._reserve() == 0
+    assert bucket._reserve() == 0
+    assert bucket._reserve() == pytest.approx(0.5)
+
+
+def test_refill_capped_by_burst(clock):
+    bucket = TokenBucket(rate=5, burst=2)
+    clock.advance(100)
+    assert [bucket._reserve() for _ in range(2)] == [0, 0]
+    assert bucket._reserve() == pytest.approx(0.2)
+
+
+def test_penalize_pauses_bucket(clock):
+    bucket = TokenBucket(rate=10, burst=5)
+    bucket.penalize(2)
+    assert bucket._reserve() == pytest.approx(2.1)
+    clock.advance(3)
+    assert bucket._reserve() == 0
+
+
+def test_acquire_sleeps_for_reserved_wait(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(rate_limiter.time, 'sleep', sleeps.append)
+    bucket = TokenBucket(rate=4, burst=1)
+    bucket.acquire()
+    bucket.acquire()
+    assert sleeps == [pytest.approx(0.25)]
+
+
+def test_shared_limiter_per_key():
+    first = get_rate_limiter('test-provider:key-1', rate=5)
+    assert get_rate_limiter('test-provider:key-1', rate=50) is first
+    assert get_rate_limiter('test-provider:key-2', rate=5) is not first
+    assert first.name == 'test-provider'
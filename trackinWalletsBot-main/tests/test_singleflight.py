@@ -0,0 +1,92 @@
+# tests/test_singleflight.py
+import asyncio
+
+import pytest
+
+from singleflight import SingleFlight, get_singleflight
+
+
+def test_concurrent_calls_share_one_request():
+    calls = []
+
+    async def fetch(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        return value * 2
+
+    async def scenario():
+        singleflight = SingleFlight()
+        results = await asyncio.gather(*(singleflight.do('key', fetch, 21) for _ in range(5)))
+        return singleflight, results
+
+    singleflight, results = asyncio.run(scenario())
+    assert results == [42] * 5
+    assert calls == [21]
+    assert (singleflight.calls, singleflight.shared) == (5, 4)
+    assert singleflight._inflight == {}
+
+
+def test_different_keys_run_separately():
+    calls = []
+
+    async def fetch(value):
+        calls.append(value)
+        await asyncio.sleep(0)
+        return value
+
+    async def scenario():
+        singleflight = SingleFlight()
+        return await asyncio.gather(singleflight.do('a', fetch, 1), singleflight.do('b', fetch, 2))
+
+    assert asyncio.run(scenario()) == [1, 2]
+    assert sorted(calls) == [1, 2]
+
+
+def test_error_delivered_to_all_waiters():
+    async def fetch():
+        await asyncio.sleep(0.01)
+        raise RuntimeError('provider down')
+
+    async def scenario():
+        singleflight = SingleFlight()
+        return await asyncio.gather(*(singleflight.do('key', fetch) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_cancelled_waiter_does_not_cancel_shared_request():
+    async def fetch():
+        await asyncio.sleep(0.05)
+        return 'done'
+
+    async def scenario():
+        singleflight = SingleFlight()
+        first = asyncio.ensure_future(singleflight.do('key', fetch))
+        second = asyncio.ensure_future(singleflight.do('key', fetch))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(scenario()) == 'done'
+
+
+def test_completed_key_runs_again():
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        return len(calls)
+
+    async def scenario():
+        singleflight = SingleFlight()
+        return [await singleflight.do('key', fetch), await singleflight.do('key', fetch)]
+
+    assert asyncio.run(scenario()) == [1, 2]
+
+
+def test_shared_instance_in_bot_data():
+    bot_data = {}
+    assert get_singleflight(bot_data) is get_singleflight(bot_data) is bot_data['singleflight']
@@ -0,0 +1,146 @@
+# tests/test_stale_while_revalidate.py
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+import bot_handlers
+from config import TZ_UTC_PLUS_3
+
+WALLET = '0x00000000000000000000000000000000000000aa'
+USER_ID = 7
+
+
+def today_window():
+    today_start = datetime.now(TZ_UTC_PLUS_3).replace(hour=0, minute=0, second=0, microsecond=0)
+    return today_start, int(today_start.timestamp()), int((today_start + timedelta(days=1)).timestamp())
+
+
+def native(tx_hash, timestamp, value=1.0):
+    return {'hash': tx_hash, 'from': '0xsender', 'to': WALLET, 'value': value, 'value_raw': int(value * 10 ** 18),
+            'timestamp': timestamp, 'block_number': 100, 'token_symbol': 'BNB', 'is_native': True}
+
+
+class FakeMessage:
+    def __init__(self, text=''):
+        self.text = text
+        self.from_user = SimpleNamespace(id=USER_ID)
+        self.replies = []
+
+    async def reply_text(self, text, **kwargs):
+        self.replies.append(text)
+
+
+class FakeApplication:
+    def __init__(self):
+        self.tasks = []
+
+    def create_task(self, coroutine, update=None):
+        self.tasks.append(coroutine)
+
+
+@pytest.fixture
+def context(db, monkeypatch):
+    monkeypatch.setitem(bot_handlers.LEDGER_SETTINGS, 'enabled', True)
+    monkeypatch.setitem(bot_handlers.TRACKER_SETTINGS, 'stale_while_revalidate', True)
+    return SimpleNamespace(bot_data={'db': db}, user_data={}, application=FakeApplication())
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    """Отчеты send_transactions: списки хешей по порядку"""
+    reports = []
+
+    async def send_transactions(update, transactions, token_sums, wallet_address, shortname, **kwargs):
+        reports.append([tx['hash'] for tx in transactions])
+
+    monkeypatch.setattr(bot_handlers, 'send_transactions', send_transactions)
+    return reports
+
+
+@pytest.fixture
+def providers(monkeypatch):
+    """Подмена опроса провайдеров: результат задается тестом, вызовы считаются"""
+    state = SimpleNamespace(calls=0, result=([], {}, {}))
+
+    async def fetch(**kwargs):
+        state.calls += 1
+        return state.result
+
+    monkeypatch.setattr(bot_handlers, 'fetch_today_transactions_factory', fetch)
+    return state
+
+
+def synced_wallet(db, synced_until):
+    _, ts_start, _ = today_window()
+    db.add_wallet(USER_ID, WALLET, 'w', 'bnb')
+    db.save_transfers('evm', 56, [native('0xold', ts_start + 60)])
+    db.set_ledger_sync('evm', 56, WALLET, ts_start - 3600, synced_until)
+
+
+def test_snapshot_requires_sync_covering_window_start(db):
+    _, ts_start, ts_end = today_window()
+    assert bot_handlers._ledger_snapshot(db, WALLET, 'bnb', ts_start, ts_end) is None
+
+    db.set_ledger_sync('evm', 56, WALLET, ts_start + 10, ts_start + 600)
+    assert bot_handlers._ledger_snapshot(db, WALLET, 'bnb', ts_start, ts_end) is None
+
+
+def test_snapshot_reports_oldest_sync_point(db):
+    _, ts_start, ts_end = today_window()
+    db.set_ledger_sync('evm', 1, WALLET, ts_start, ts_start + 600)
+    db.set_ledger_sync('evm', 137, WALLET, ts_start - 60, ts_start + 300)
+    results, synced_until = bot_handlers._ledger_snapshot(db, WALLET, 'eth', ts_start, ts_end)
+    assert sorted(chain_id for chain_id, _, _ in results) == [1, 137]
+    assert synced_until == ts_start + 300
+
+
+def test_today_answers_from_ledger_then_revalidates(db, context, sent, providers):
+    synced_wallet(db, int(datetime.now(TZ_UTC_PLUS_3).timestamp()) - 120)
+    update = SimpleNamespace(message=FakeMessage(WALLET))
+
+    state = asyncio.run(bot_handlers.today_wallet_choice(update, context))
+    assert state == bot_handlers.ConversationHandler.END
+    # Ответ - из журнала, провайдеры еще не опрашивались
+    assert providers.calls == 0
+    assert sent == [['0xold']]
+    assert '(2 мин назад)' in update.message.replies[-1]
+    assert len(context.application.tasks) == 1
+
+    _, ts_start, _ = today_window()
+    providers.result = ([{'chain_id': 56, 'hash': '0xold', 'token': 'BNB', 'amount': 1.0},
+                         {'chain_id': 56, 'hash': '0xnew', 'token': 'BNB', 'amount': 2.0}], {'BNB': 3.0}, {})
+    asyncio.run(context.application.tasks[0])
+    assert providers.calls == 1
+    # Повторно приходят только новые поступления
+    assert sent == [['0xold'], ['0xnew']]
+    assert update.message.replies[-1].startswith('🆕 Новые поступления (1)')
+
+
+def test_revalidation_without_news_is_silent(db, context, sent, providers):
+    synced_wallet(db, int(datetime.now(TZ_UTC_PLUS_3).timestamp()))
+    update = SimpleNamespace(message=FakeMessage(WALLET))
+    asyncio.run(bot_handlers.today_wallet_choice(update, context))
+    replies = list(update.message.replies)
+
+    providers.result = ([{'chain_id': 56, 'hash': '0xold', 'token': 'BNB', 'amount': 1.0}], {'BNB': 1.0}, {})
+    asyncio.run(context.application.tasks[0])
+    assert update.message.replies == replies
+    assert sent == [['0xold']]
+
+
+def test_unsynced_wallet_fetched_directly(db, context, sent, providers):
+    db.add_wallet(USER_ID, WALLET, 'w', 'bnb')
+    update = SimpleNamespace(message=FakeMessage(WALLET))
+    asyncio.run(bot_handlers.today_wallet_choice(update, context))
+    assert providers.calls == 1
+    assert context.application.tasks == []
+
+
+def test_disabled_mode_fetches_directly(db, context, sent, providers, monkeypatch):
+    monkeypatch.setitem(bot_handlers.TRACKER_SETTINGS, 'stale_while_revalidate', False)
+    synced_wallet(db, int(datetime.now(TZ_UTC_PLUS_3).timestamp()))
+    asyncio.run(bot_handlers.today_wallet_choice(SimpleNamespace(message=FakeMessage(WALLET)), context))
+    assert providers.calls == 1
+    assert context.application.tasks == []
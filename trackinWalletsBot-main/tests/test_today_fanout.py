@@ -0,0 +1,163 @@
+# tests/test_today_fanout.py
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import bot_handlers
+from circuit_breaker import CircuitOpenError, get_breaker
+from config import SUPPORTED_CHAINS
+from deadline import DeadlineExceeded, bounded_timeout
+from tracker_cache import TTLCache
+
+WALLET = '0x00000000000000000000000000000000000000aa'
+TS_START = 1_700_000_000
+TS_END = TS_START + 86400
+TIMEOUT = 0.5
+
+EVM_CHAINS = [chain_id for chain_id in SUPPORTED_CHAINS if chain_id != 'tron']
+ETHERSCAN_CHAINS = [chain_id for chain_id in EVM_CHAINS if bot_handlers._chain_breaker_key(chain_id)[0] == 'etherscan']
+ANKR_CHAINS = [chain_id for chain_id in EVM_CHAINS if chain_id not in ETHERSCAN_CHAINS]
+
+
+def incoming(tx_hash, value=1.0):
+    return {'native': [{'hash': tx_hash, 'from': '0xsender', 'to': WALLET, 'value': value, 'timestamp': TS_START}],
+            'tokens': []}
+
+
+class FakeTrackers:
+    """Подмена _fetch_chain_sync / _fetch_multichain_sync: ответ или ошибка по сети, журнал вызовов"""
+
+    def __init__(self, monkeypatch):
+        self.calls = []
+        self.errors = {}  # chain_id -> исключение
+        self.slow = set()  # Сети, которые отвечают только после release
+        self.released = threading.Event()
+        monkeypatch.setattr(bot_handlers, '_fetch_chain_sync', self.fetch_chain)
+        monkeypatch.setattr(bot_handlers, '_fetch_multichain_sync', self.fetch_multichain)
+
+    def answer(self, chain_ids, deadline):
+        self.calls.append((tuple(chain_ids), deadline))
+        for chain_id in chain_ids:
+            if chain_id in self.slow:
+                self.released.wait(5)
+            if chain_id in self.errors:
+                raise self.errors[chain_id]
+        return {chain_id: incoming(f'0x{chain_id}') for chain_id in chain_ids}
+
+    def fetch_chain(self, chain_id, tracker_kwargs, wallet_address, ts_start, ts_end, deadline=None):
+        return self.answer([chain_id], deadline)
+
+    def fetch_multichain(self, chain_ids, tracker_kwargs, wallet_address, ts_start, ts_end, deadline=None):
+        return self.answer(chain_ids, deadline)
+
+
+@pytest.fixture
+def context(db, monkeypatch):
+    from main import init_bot_data
+
+    monkeypatch.setitem(bot_handlers.LEDGER_SETTINGS, 'enabled', False)
+    monkeypatch.setitem(bot_handlers.TRACKER_SETTINGS, 'transaction_timeout', TIMEOUT)
+    monkeypatch.setattr(bot_handlers, 'tracker_cache', TTLCache(enabled=False))
+    bot_data = {}
+    init_bot_data(bot_data, db)
+    yield SimpleNamespace(bot_data=bot_data)
+    bot_data['executor'].shutdown(wait=False)
+
+
+@pytest.fixture
+def trackers(monkeypatch):
+    trackers = FakeTrackers(monkeypatch)
+    yield trackers
+    trackers.released.set()
+
+
+def fetch(context, network='eth'):
+    return asyncio.run(bot_handlers.fetch_today_transactions_factory(context, WALLET, 'w', network, TS_START, TS_END))
+
+
+def test_all_chains_fetched_with_one_multichain_call(context, trackers):
+    transactions, token_sums, skipped = fetch(context)
+    assert skipped == {}
+    assert sorted(tx['chain_id'] for tx in transactions) == sorted(EVM_CHAINS)
+    # Etherscan сети - по отдельности, все ANKR сети - одним запросом
+    assert sorted(chain_ids for chain_ids, _ in trackers.calls if len(chain_ids) == 1 and chain_ids[0]
+                  in ETHERSCAN_CHAINS) == sorted((chain_id,) for chain_id in ETHERSCAN_CHAINS)
+    assert [chain_ids for chain_ids, _ in trackers.calls if len(chain_ids) > 1] == [tuple(ANKR_CHAINS)]
+
+
+def test_shared_deadline_passed_to_trackers(context, trackers):
+    started = time.monotonic()
+    fetch(context)
+    deadlines = {deadline for _, deadline in trackers.calls}
+    assert len(deadlines) == 1
+    assert started < deadlines.pop() <= time.monotonic() + TIMEOUT
+
+
+def test_slow_chain_reported_as_timed_out(context, trackers):
+    slow_chain = ETHERSCAN_CHAINS[0]
+    trackers.slow.add(slow_chain)
+
+    started = time.monotonic()
+    transactions, _, skipped = fetch(context)
+    # Ответ - к общему дедлайну, без ожидания медленной сети
+    assert time.monotonic() - started < TIMEOUT + 0.5
+    assert skipped == {SUPPORTED_CHAINS[slow_chain]: 'timed out'}
+    assert slow_chain not in {tx['chain_id'] for tx in transactions}
+    assert len(transactions) == len(EVM_CHAINS) - 1
+
+
+@pytest.mark.parametrize('error, reason', [
+    (DeadlineExceeded('late'), 'timed out'),
+    (CircuitOpenError('open'), 'сеть недоступна'),
+    (RuntimeError('bad gateway'), 'ошибка провайдера'),
+])
+def test_failed_chain_reason(context, trackers, error, reason):
+    failed_chain = ETHERSCAN_CHAINS[0]
+    trackers.errors[failed_chain] = error
+    transactions, _, skipped = fetch(context)
+    assert skipped == {SUPPORTED_CHAINS[failed_chain]: reason}
+    assert len(transactions) == len(EVM_CHAINS) - 1
+
+
+def test_failed_multichain_call_skips_all_ankr_chains(context, trackers):
+    trackers.errors[ANKR_CHAINS[0]] = RuntimeError('down')
+    transactions, _, skipped = fetch(context)
+    assert skipped == {SUPPORTED_CHAINS[chain_id]: 'ошибка провайдера' for chain_id in ANKR_CHAINS}
+    assert sorted(tx['chain_id'] for tx in transactions) == sorted(ETHERSCAN_CHAINS)
+
+
+def test_unavailable_chain_not_requested(context, trackers):
+    chain_id = ETHERSCAN_CHAINS[0]
+    breaker = get_breaker(*bot_handlers._chain_breaker_key(chain_id))
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure(RuntimeError('down'))
+
+    _, _, skipped = fetch(context)
+    assert skipped == {SUPPORTED_CHAINS[chain_id]: 'сеть недоступна'}
+    assert (chain_id,) not in [chain_ids for chain_ids, _ in trackers.calls]
+
+
+def test_fetch_chain_sync_runs_under_deadline(monkeypatch):
+    timeouts = []
+
+    def get_transactions(address, start_time, end_time):
+        timeouts.append(bounded_timeout(30))
+
+    tracker = SimpleNamespace(get_transactions=get_transactions)
+    monkeypatch.setattr(bot_handlers, '_create_chain_tracker', lambda chain_id, tracker_kwargs: tracker)
+
+    bot_handlers._fetch_chain_sync(1, {}, WALLET, TS_START, TS_END, deadline=time.monotonic() + 2)
+    assert 0 < timeouts[0] <= 2
+    with pytest.raises(DeadlineExceeded):
+        bot_handlers._fetch_chain_sync(1, {}, WALLET, TS_START, TS_END, deadline=time.monotonic() - 1)
+    # Вне запроса дедлайна нет
+    assert bounded_timeout(30) == 30
+
+
+def test_skipped_chains_note():
+    assert bot_handlers.format_skipped_chains_note({}) == ''
+    note = bot_handlers.format_skipped_chains_note({'Ethereum': 'timed out'})
+    assert '• Ethereum: timed out' in note
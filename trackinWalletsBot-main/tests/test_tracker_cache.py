@@ -0,0 +1,47 @@
+# tests/test_tracker_cache.py
+import pytest
+
+import tracker_cache
+from tracker_cache import TTLCache
+
+
+@pytest.fixture
+def cache(monkeypatch, clock):
+    monkeypatch.setattr(tracker_cache.time, 'monotonic', clock)
+    return TTLCache(ttl=60, max_size=3, enabled=True)
+
+
+def test_entries_expire(cache, clock):
+    cache.set('a', 1)
+    cache.set('b', 2, ttl=10)
+    clock.advance(30)
+    assert cache.get('a') == 1
+    assert cache.get('b') is None
+    clock.advance(30)
+    assert cache.get('a') is None
+    assert cache.stats() == {'size': 0, 'hits': 1, 'misses': 2}
+
+
+def test_lru_eviction(cache):
+    for key in 'abc':
+        cache.set(key, key)
+    cache.get('a')  # 'a' использован недавно - вытесняется 'b'
+    cache.set('d', 'd')
+    assert [cache.get(key) for key in 'abcd'] == ['a', None, 'c', 'd']
+
+
+def test_invalidate_by_address(cache):
+    cache.set(('ankr', 1, '0xaa', (0, 10)), 'evm')
+    cache.set(('trongrid', 'tron', 'TXyzAbc', (0, 10)), 'tron')
+    cache.set(('ankr', 1, '0xbb', (0, 10)), 'other')
+
+    assert cache.invalidate('0xAA') == 1
+    assert cache.invalidate('TXyzAbc') == 1
+    assert cache.get(('ankr', 1, '0xbb', (0, 10))) == 'other'
+    assert cache.invalidate() == 1
+
+
+def test_disabled(clock):
+    cache = TTLCache(ttl=60, max_size=3, enabled=False)
+    cache.set('a', 1)
+    assert cache.get('a') is None
@@ -0,0 +1,108 @@
+# tests/test_tron_event_ingester.py
+import pytest
+
+import tron_event_ingester
+from address_index import AddressIndex
+from tron_event_ingester import Trc20EventIngester
+
+USDT = 'TR7NHqjeKQxGTCi8q8ZY4pL8otSzgjLj6t'
+WALLET_BASE58 = 'TEkxiTehnzSmSe2XqrBj4w32RUN966rdz8'
+WALLET_EVENT = '0x' + '3487b63d30b5b2c87fb7ffa8bcfade38eaac1abe'  # Тот же адрес в событии TronGrid
+SENDER_EVENT = '0x' + 'a614f803b6fd780986a42c78ec9c7f77e6ded13c'
+CURSOR = 1_700_000_000_000
+
+
+def event(timestamp_ms, to=WALLET_EVENT, value='5000000', index=0, tx_id='t1'):
+    return {'transaction_id': tx_id, 'event_index': index, 'block_number': timestamp_ms // 3000,
+            'block_timestamp': timestamp_ms, 'result': {'from': SENDER_EVENT, 'to': to, 'value': value}}
+
+
+class FakeTronGrid:
+    def __init__(self, events, decimals=6):
+        self.events = events
+        self.decimals = decimals
+        self.requests = []
+        self.decimals_requests = 0
+
+    def iter_contract_events(self, contract_address, min_timestamp_ms):
+        self.requests.append((contract_address, min_timestamp_ms))
+        return iter(self.events)
+
+    def get_trc20_decimals(self, contract_address):
+        self.decimals_requests += 1
+        if isinstance(self.decimals, Exception):
+            raise self.decimals
+        return self.decimals
+
+
+@pytest.fixture(autouse=True)
+def decimals_cache(monkeypatch):
+    monkeypatch.setattr(Trc20EventIngester, '_decimals', {})
+
+
+@pytest.fixture
+def watched():
+    index = AddressIndex()
+    index.load([(1, WALLET_BASE58, 'tron')])
+    return index.watcher(('tron',))
+
+
+def test_first_poll_starts_now(watched, monkeypatch):
+    monkeypatch.setattr(tron_event_ingester.time, 'time', lambda: 1_700_000_123.5)
+    api = FakeTronGrid([])
+    assert Trc20EventIngester(api).poll(USDT, watched, None) == ([], 1_700_000_123_500)
+    assert api.requests == []
+
+
+def test_matches_watched_recipients(watched):
+    api = FakeTronGrid([
+        event(CURSOR + 1000, value='5000000', index=2),
+        event(CURSOR + 2000, to=SENDER_EVENT, tx_id='t2'),
+        event(CURSOR + 3000, value='0', tx_id='t3'),
+    ])
+    transfers, cursor = Trc20EventIngester(api).poll(USDT, watched, CURSOR)
+    # Курсор - по всем событиям, не только по найденным
+    assert cursor == CURSOR + 3000
+    assert api.requests == [(USDT, CURSOR)]
+    assert transfers == [{
+        'hash': 't1', 'log_index': 2, 'from': 'TR7NHqjeKQxGTCi8q8ZY4pL8otSzgjLj6t', 'to': WALLET_BASE58,
+        'value': 5.0, 'value_raw': 5_000_000, 'contract_address': USDT, 'token_symbol': 'USDT',
+        'timestamp': (CURSOR + 1000) // 1000, 'block_number': (CURSOR + 1000) // 3000, 'is_native': False,
+        'network': 'tron',
+    }]
+
+
+def test_cursor_kept_without_events(watched):
+    assert Trc20EventIngester(FakeTronGrid([])).poll(USDT, watched, CURSOR) == ([], CURSOR)
+
+
+def test_broken_event_skipped(watched):
+    api = FakeTronGrid([event(CURSOR, value='not a number', tx_id='bad'), event(CURSOR + 1, tx_id='good')])
+    transfers, _ = Trc20EventIngester(api).poll(USDT, watched, CURSOR)
+    assert [tx['hash'] for tx in transfers] == ['good']
+
+
+def test_decimals_cached_per_contract(watched):
+    api = FakeTronGrid([event(CURSOR, value='5000000000000000000')], decimals=18)
+    Trc20EventIngester(api).poll(USDT, watched, CURSOR)
+    transfers, _ = Trc20EventIngester(api).poll(USDT, watched, CURSOR)
+    assert transfers[0]['value'] == 5.0
+    assert api.decimals_requests == 1
+
+
+def test_decimals_error_falls_back_without_caching(watched):
+    api = FakeTronGrid([event(CURSOR)], decimals=RuntimeError('down'))
+    transfers, _ = Trc20EventIngester(api).poll(USDT, watched, CURSOR)
+    assert transfers[0]['value'] == 5.0
+    Trc20EventIngester(api).poll(USDT, watched, CURSOR)
+    assert api.decimals_requests == 2
+
+
+def test_boundary_events_saved_once(db, watched):
+    # Следующий опрос начинается с курсора включительно - граничное событие приходит повторно
+    api = FakeTronGrid([event(CURSOR, index=1)])
+    ingester = Trc20EventIngester(api)
+    first, cursor = ingester.poll(USDT, watched, CURSOR)
+    again, _ = ingester.poll(USDT, watched, cursor)
+    assert db.save_transfers('tron', 'tron', first) == 1
+    assert db.save_transfers('tron', 'tron', again) == 0
@@ -0,0 +1,134 @@
+# tests/test_trongrid_api.py
+import asyncio
+
+import pytest
+
+import trongrid_api
+from trongrid_api import TronGridAPI, TronGridIncompleteError
+
+ADDRESS = 'TR7NHqjeKQxGTCi8q8ZY4pL8otSzgjLj6t'
+
+
+def tx(tx_id, status='SUCCESS'):
+    return {'txID': tx_id, 'ret': [{'contractRet': status}]}
+
+
+def page(items, fingerprint=None):
+    data = {'success': True, 'data': items, 'meta': {}}
+    if fingerprint:
+        data['meta']['fingerprint'] = fingerprint
+    return data
+
+
+@pytest.fixture
+def api():
+    api = TronGridAPI('key')
+    api.sent = []
+    return api
+
+
+def script(api, monkeypatch, responses):
+    """Ответы _request по порядку (исключение - выбрасывается); params запросов - в api.sent"""
+    responses = list(responses)
+
+    def request(url, params=None):
+        api.sent.append(dict(params or {}))
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    monkeypatch.setattr(api, '_request', request)
+
+
+def script_async(api, monkeypatch, responses):
+    """Ответы _request_async по порядку (исключение - выбрасывается); params запросов - в api.sent"""
+    responses = list(responses)
+
+    async def request(url, params=None):
+        api.sent.append(dict(params or {}))
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    monkeypatch.setattr(api, '_request_async', request)
+
+
+def test_window_params_server_side_filters():
+    assert TronGridAPI._window_params(100, 200, only_to=True) == {
+        'limit': trongrid_api.TRONGRID_SETTINGS['page_size'], 'order_by': 'block_timestamp,desc',
+        'min_timestamp': 100_000, 'max_timestamp': 200_000, 'only_to': 'true'}
+    assert 'only_to' not in TronGridAPI._window_params(100, 200)
+
+
+def test_chain_transactions_follow_fingerprint(api, monkeypatch):
+    script(api, monkeypatch, [page([tx('a'), tx('b', 'REVERT')], 'f2'), page([tx('c')], 'f3'), page([])])
+    txs = list(api.iter_chain_transactions(ADDRESS, 100, 200, only_to=True))
+    assert [item['txID'] for item in txs] == ['a', 'c']
+    assert [params.get('fingerprint') for params in api.sent] == [None, 'f2', 'f3']
+    assert all(params['only_to'] == 'true' and params['visible'] == 'true' for params in api.sent)
+
+
+def test_not_success_page_raises(api, monkeypatch):
+    script(api, monkeypatch, [page([tx('a')], 'f2'), {'success': False, 'error': 'server busy'}])
+    with pytest.raises(TronGridIncompleteError):
+        list(api.iter_chain_transactions(ADDRESS, 100, 200))
+
+
+def test_page_limit_raises_in_strict_mode(api, monkeypatch):
+    monkeypatch.setitem(trongrid_api.TRONGRID_SETTINGS, 'max_pages', 2)
+    script(api, monkeypatch, [page([{'n': 1}], 'f2'), page([{'n': 2}], 'f3')])
+    with pytest.raises(TronGridIncompleteError):
+        list(api.iter_trc20_transfers(ADDRESS, 100, 200))
+
+
+def test_trc20_stream_per_allowlisted_contract(api, monkeypatch):
+    script(api, monkeypatch, [page([{'n': 1}], 'f2'), page([{'n': 2}]), page([{'n': 3}])])
+    transfers = list(api.iter_trc20_transfers(ADDRESS, 100, 200, contract_addresses=['T1', 'T2']))
+    assert transfers == [{'n': 1}, {'n': 2}, {'n': 3}]
+    assert [(params['contract_address'], params.get('fingerprint')) for params in api.sent] == [
+        ('T1', None), ('T1', 'f2'), ('T2', None)]
+
+
+def test_contract_events_stop_quietly_at_page_limit(api, monkeypatch):
+    monkeypatch.setitem(trongrid_api.TRONGRID_SETTINGS, 'max_pages', 2)
+    script(api, monkeypatch, [page([{'n': 1}], 'f2'), page([{'n': 2}], 'f3')])
+    # Следующий опрос продолжит с курсора - лимит страниц здесь не ошибка
+    assert list(api.iter_contract_events('T1', 5000)) == [{'n': 1}, {'n': 2}]
+    assert api.sent[0]['min_block_timestamp'] == 5000
+
+
+# ---- async ----
+
+def test_async_chain_transactions_follow_fingerprint(api, monkeypatch):
+    script_async(api, monkeypatch, [page([tx('a'), tx('b', 'REVERT')], 'f2'), page([tx('c')])])
+    txs = asyncio.run(api.get_chain_transactions_async(ADDRESS, 0, 100))
+    assert [item['txID'] for item in txs] == ['a', 'c']
+    assert api.sent[1]['fingerprint'] == 'f2'
+
+
+def test_async_not_success_raises(api, monkeypatch):
+    script_async(api, monkeypatch, [page([tx('a')], 'f2'), {'success': False, 'error': 'server busy'}])
+    with pytest.raises(TronGridIncompleteError):
+        asyncio.run(api.get_chain_transactions_async(ADDRESS, 0, 100))
+
+
+def test_async_request_error_propagates(api, monkeypatch):
+    script_async(api, monkeypatch, [RuntimeError('down')])
+    with pytest.raises(RuntimeError):
+        asyncio.run(api.get_trc20_transfers_async(ADDRESS, 0, 100))
+
+
+def test_async_page_limit_raises(api, monkeypatch):
+    monkeypatch.setitem(trongrid_api.TRONGRID_SETTINGS, 'max_pages', 2)
+    script_async(api, monkeypatch, [page([{'n': 1}], 'f2'), page([{'n': 2}], 'f3')])
+    with pytest.raises(TronGridIncompleteError):
+        asyncio.run(api.get_trc20_transfers_async(ADDRESS, 0, 100))
+
+
+def test_async_trc20_per_contract(api, monkeypatch):
+    script_async(api, monkeypatch, [page([{'n': 1}]), page([{'n': 2}])])
+    transfers = asyncio.run(api.get_trc20_transfers_async(ADDRESS, 0, 100, contract_addresses=['T1', 'T2']))
+    assert transfers == [{'n': 1}, {'n': 2}]
+    assert [params['contract_address'] for params in api.sent] == ['T1', 'T2']
@@ -0,0 +1,103 @@
+# tests/test_update_processor.py
+import asyncio
+from types import SimpleNamespace
+
+from update_processor import PerChatUpdateProcessor
+
+
+def update(chat_id=None, user_id=None):
+    return SimpleNamespace(effective_chat=SimpleNamespace(id=chat_id) if chat_id is not None else None,
+                           effective_user=SimpleNamespace(id=user_id) if user_id is not None else None)
+
+
+class Handlers:
+    """Обработчики апдейтов: журнал начала/конца, обработчик 'name' ждет release(name)"""
+
+    def __init__(self):
+        self.log = []
+        self.gates = {}
+
+    def release(self, name):
+        self.gates.setdefault(name, asyncio.Event()).set()
+
+    async def handle(self, name):
+        self.log.append(('start', name))
+        await self.gates.setdefault(name, asyncio.Event()).wait()
+        self.log.append(('end', name))
+
+
+def test_same_chat_runs_in_order():
+    async def scenario():
+        processor, handlers = PerChatUpdateProcessor(8), Handlers()
+        first = asyncio.create_task(processor.do_process_update(update(1), handlers.handle('a')))
+        second = asyncio.create_task(processor.do_process_update(update(1), handlers.handle('b')))
+        await asyncio.sleep(0)
+        handlers.release('b')
+        await asyncio.sleep(0)
+        # 'b' уже может завершиться, но ждет 'a' того же чата
+        assert handlers.log == [('start', 'a')]
+        handlers.release('a')
+        await asyncio.gather(first, second)
+        return handlers.log, processor
+
+    log, processor = asyncio.run(scenario())
+    assert log == [('start', 'a'), ('end', 'a'), ('start', 'b'), ('end', 'b')]
+    # Очередь чата пуста - блокировка не хранится
+    assert processor._locks == {} and processor._pending == {}
+
+
+def test_different_chats_run_concurrently():
+    async def scenario():
+        processor, handlers = PerChatUpdateProcessor(8), Handlers()
+        tasks = [asyncio.create_task(processor.do_process_update(update(chat_id), handlers.handle(chat_id)))
+                 for chat_id in (1, 2)]
+        await asyncio.sleep(0)
+        started = list(handlers.log)
+        handlers.release(1)
+        handlers.release(2)
+        await asyncio.gather(*tasks)
+        return started
+
+    assert asyncio.run(scenario()) == [('start', 1), ('start', 2)]
+
+
+def test_updates_without_chat_keyed_by_user():
+    assert PerChatUpdateProcessor._chat_key(update(chat_id=5, user_id=7)) == ('chat', 5)
+    assert PerChatUpdateProcessor._chat_key(update(user_id=7)) == ('user', 7)
+    assert PerChatUpdateProcessor._chat_key(update()) is None
+
+
+def test_update_without_chat_and_user_not_serialized():
+    async def scenario():
+        processor, handlers = PerChatUpdateProcessor(8), Handlers()
+        blocked = asyncio.create_task(processor.do_process_update(update(), handlers.handle('a')))
+        free = asyncio.create_task(processor.do_process_update(update(), handlers.handle('b')))
+        await asyncio.sleep(0)
+        started = list(handlers.log)
+        handlers.release('a')
+        handlers.release('b')
+        await asyncio.gather(blocked, free)
+        return started, processor
+
+    started, processor = asyncio.run(scenario())
+    assert started == [('start', 'a'), ('start', 'b')]
+    assert processor._locks == {}
+
+
+def test_failed_update_releases_chat():
+    async def failing():
+        raise RuntimeError('handler error')
+
+    async def scenario():
+        processor, handlers = PerChatUpdateProcessor(8), Handlers()
+        try:
+            await processor.do_process_update(update(1), failing())
+        except RuntimeError:
+            pass
+        handlers.release('a')
+        await asyncio.wait_for(processor.do_process_update(update(1), handlers.handle('a')), timeout=1)
+        return handlers.log, processor
+
+    log, processor = asyncio.run(scenario())
+    assert log == [('start', 'a'), ('end', 'a')]
+    assert processor._locks == {}
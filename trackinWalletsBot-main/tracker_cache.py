@@ -0,0 +1,74 @@
+# tracker_cache.py
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+from config import logger, CACHE_SETTINGS, TRACKER_SETTINGS
+
+
+class TTLCache:
+    """
+    Ограниченный кеш в памяти: записи живут ttl секунд, при переполнении
+    вытесняется давно не использованная (LRU).
+    """
+
+    def __init__(self, ttl: float = None, max_size: int = None, enabled: bool = None):
+        self.ttl = ttl or CACHE_SETTINGS['ttl']
+        self.max_size = max_size or CACHE_SETTINGS['max_size']
+        self.enabled = CACHE_SETTINGS['enabled'] if enabled is None else enabled
+        self.hits = 0
+        self.misses = 0
+        self._items: OrderedDict = OrderedDict()  # ключ -> (момент истечения, значение)
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Значение по ключу или None, если его нет или оно устарело"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or item[0] <= time.monotonic():
+                if item is not None:
+                    del self._items[key]
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key: Hashable, value: Any, ttl: float = None):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._items[key] = (time.monotonic() + (ttl or self.ttl), value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def invalidate(self, address: str = None) -> int:
+        """
+        Удаляет записи адреса (ключи вида (провайдер, сеть, адрес, окно)), без адреса - весь кеш.
+        Адрес сравнивается без учета регистра: EVM в ключах - в нижнем регистре, TRON - base58.
+        Возвращает число удаленных записей.
+        """
+        with self._lock:
+            if address is None:
+                removed = len(self._items)
+                self._items.clear()
+            else:
+                address = address.lower()
+                stale = [key for key in self._items if len(key) > 2 and str(key[2]).lower() == address]
+                for key in stale:
+                    del self._items[key]
+                removed = len(stale)
+        if removed:
+            logger.debug(f"TTLCache: удалено {removed} записей ({address or 'все'})")
+        return removed
+
+    def stats(self) -> Dict:
+        return {'size': len(self._items), 'hits': self.hits, 'misses': self.misses}
+
+
+# Результаты трекеров по сетям: (провайдер, chain_id, адрес, (начало, конец окна)) -> результат
+tracker_cache = TTLCache(ttl=TRACKER_SETTINGS['cache_duration'])
@@ -1,7 +1,8 @@
 # tracker_factory.py
 import time
 from typing import Dict, Any, Optional, List, Union
-from config import logger, ANKR_CHAIN_MAPPING, CHAIN_TOKENS, BEP20_TOKENS, TRC20_SYMBOLS
+from config import logger, ANKR_CHAIN_MAPPING, ANKR_CHAIN_TO_ID, CHAIN_TOKENS, BEP20_TOKENS, TRC20_SYMBOLS, \
+    TRONGRID_SETTINGS
 
 
 class TrackerFactory:
@@ -23,6 +24,9 @@ class TrackerFactory:
         elif network in ['eth', 'ethereum']:
             return EthTracker(**kwargs)
 
+        elif network == 'evm_multichain':
+            return MultiChainEVMTracker(**kwargs)
+
         elif network in ['polygon', 'arbitrum', 'optimism', 'base', 'avalanche',
                          'fantom', 'gnosis', 'celo', 'aurora', 'cronos', 'harmony',
                          'moonbeam', 'moonriver', 'klaytn', 'metis', 'okc',
@@ -35,6 +39,89 @@ class TrackerFactory:
             return EVMTracker(network, **kwargs)
 
 
+def _hex_to_int(value) -> int:
+    """ANKR отдает value/timestamp hex-строками ('0x...'), иногда числом"""
+    if isinstance(value, str) and value.startswith('0x'):
+        return int(value, 16)
+    return int(value) if value else 0
+
+
+def parse_ankr_native_transactions(transactions: List[Dict], address: str, network: str,
+                                   native_token: str) -> List[Dict]:
+    """Входящие нативные переводы из ответа ankr_getTransactionsByAddress"""
+    native_txs = []
+    address_lower = address.lower()
+
+    for tx in transactions:
+        try:
+            tx_to = (tx.get('to') or '').lower()
+            if tx_to != address_lower:
+                continue
+
+            tx_value = _hex_to_int(tx.get('value', '0x0'))
+            if tx_value <= 0:
+                continue
+
+            native_txs.append({
+                'hash': tx.get('hash', ''),
+                'from': tx.get('from', ''),
+                'to': tx_to,
+                'value': tx_value / 1e18,  # По умолчанию 18 decimals
+                'value_raw': tx_value,
+                'timestamp': _hex_to_int(tx.get('timestamp', 0)),
+                'block_number': _hex_to_int(tx.get('blockNumber', 0)) or None,
+                'token': native_token,
+                'is_native': True,
+                'network': network
+            })
+        except Exception as e:
+            logger.warning(f"Ошибка парсинга {network} транзакции: {e}")
+            continue
+
+    return native_txs
+
+
+def parse_ankr_token_transfers(transfers: List[Dict], address: str, network: str,
+                               token_symbols: Dict[str, str] = None) -> List[Dict]:
+    """Входящие переводы токенов из ответа ankr_getTokenTransfers (уже декодированы ANKR)"""
+    token_txs = []
+    address_lower = address.lower()
+    token_symbols = token_symbols or {}
+
+    for transfer in transfers:
+        try:
+            to_addr = (transfer.get('toAddress') or '').lower()
+            if to_addr != address_lower:
+                continue
+
+            decimals = int(transfer.get('tokenDecimals') or 18)
+            amount_raw = int(transfer.get('valueRawInteger') or 0)
+            amount = amount_raw / (10 ** decimals) if amount_raw else float(transfer.get('value') or 0)
+            if amount <= 0:
+                continue
+
+            contract_addr = (transfer.get('contractAddress') or '').lower()
+            symbol = transfer.get('tokenSymbol') or token_symbols.get(contract_addr, 'UNKNOWN')
+
+            token_txs.append({
+                'hash': transfer.get('transactionHash', ''),
+                'from': transfer.get('fromAddress', ''),
+                'to': to_addr,
+                'value': amount,
+                'value_raw': amount_raw,
+                'contract_address': contract_addr,
+                'token_symbol': symbol,
+                'timestamp': _hex_to_int(transfer.get('timestamp', 0)),
+                'block_number': _hex_to_int(transfer.get('blockHeight', 0)) or None,
+                'is_native': False,
+                'network': network
+            })
+        except Exception as e:
+            logger.warning(f"Ошибка парсинга {network} токен-перевода: {e}")
+            continue
+
+    return token_txs
+
 # ============================================
 #  БАЗОВЫЙ КЛАСС ТРЕКЕРА
 # ============================================
@@ -72,7 +159,8 @@ class TronTracker(BaseTracker):
 
     def __init__(self, **kwargs):
         try:
-            from trongrid_api import TronGridAPI
+            from trongrid_api import TronGridAPI, tron_to_base58
+            self._to_base58 = tron_to_base58
             api_key = kwargs.get('tron_api_key')
             self.api = TronGridAPI(api_key=api_key) if api_key else TronGridAPI()
             super().__init__('tron')
@@ -85,12 +173,15 @@ class TronTracker(BaseTracker):
         """Получает транзакции TRON"""
         logger.info(f"TronTracker: получение транзакций для {address[:10]}...")
 
-        # Нативные TRX транзакции
-        native_txs = self.api.get_chain_transactions(address)
+        # Нативные TRX транзакции: окно времени и only_to фильтруются на стороне TronGrid.
+        # Ошибки и неполное окно пробрасываются - пустой результат должен означать отсутствие переводов
+        native_txs = list(self.api.iter_chain_transactions(address, start_time, end_time, only_to=True))
         parsed_native = self._parse_native_txs(native_txs, address)
 
         # TRC20 токены
-        trc20_txs = self.api.get_trc20_transfers(address)
+        contract_addresses = list(TRC20_SYMBOLS) if TRONGRID_SETTINGS['trc20_allowlist_only'] else None
+        trc20_txs = list(self.api.iter_trc20_transfers(address, start_time, end_time, only_to=True,
+                                                       contract_addresses=contract_addresses))
         parsed_trc20 = self._parse_trc20_txs(trc20_txs, address)
 
         # Фильтруем по времени если нужно
@@ -107,7 +198,8 @@ class TronTracker(BaseTracker):
     def _parse_native_txs(self, transactions, target_address):
         """Парсит нативные TRX транзакции"""
         parsed = []
-        target_lower = target_address.lower()
+        # TronGrid отдает адреса в base58 (visible=true), кошелек мог быть добавлен в hex
+        target_lower = self._to_base58(target_address).lower()
 
         for tx in transactions:
             try:
@@ -133,10 +225,11 @@ class TronTracker(BaseTracker):
                 parsed.append({
                     'hash': tx.get('txID', ''),
                     'from': value.get('owner_address', ''),
-                    'to': to_address,
+                    'to': target_address,
                     'value': amount,
                     'value_raw': amount_raw,
                     'timestamp': timestamp,
+                    'block_number': tx.get('blockNumber'),
                     'token': 'TRX',
                     'is_native': True,
                     'network': 'tron'
@@ -151,7 +244,7 @@ class TronTracker(BaseTracker):
     def _parse_trc20_txs(self, transfers, target_address):
         """Парсит TRC20 токены"""
         parsed = []
-        target_lower = target_address.lower()
+        target_lower = self._to_base58(target_address).lower()
 
         for transfer in transfers:
             try:
@@ -165,7 +258,7 @@ class TronTracker(BaseTracker):
                 # Пропускаем если токен не USDT/USDC или не в списке известных
                 symbol = token_info.get('symbol', 'UNKNOWN')
                 if symbol == 'UNKNOWN':
-                    symbol = TRC20_SYMBOLS.get(contract_address.lower(), 'UNKNOWN')
+                    symbol = TRC20_SYMBOLS.get(contract_address, 'UNKNOWN')
 
                 amount_raw = int(transfer.get('value', 0))
                 decimals = int(token_info.get('decimals', 6))
@@ -180,7 +273,7 @@ class TronTracker(BaseTracker):
                 parsed.append({
                     'hash': transfer.get('transaction_id', ''),
                     'from': transfer.get('from', ''),
-                    'to': to_address,
+                    'to': target_address,
                     'value': amount,
                     'value_raw': amount_raw,
                     'contract_address': contract_address,
@@ -227,16 +320,27 @@ class BnbTracker(BaseTracker):
         """Получает транзакции BNB Chain через ANKR"""
         logger.info(f"BnbTracker: получение транзакций для {address[:10]}...")
 
-        # Получаем транзакции за период
+        # Нативные BNB: транзакции за период без логов
         ankr_transactions = self.api.get_transactions_by_time_range(
             address=address,
             chain='bsc',  # ANKR использует 'bsc' для BNB Chain
             start_timestamp=start_time,
             end_timestamp=end_time,
+            max_pages=3,
+            include_logs=False,
+            decode_logs=False
+        )
+
+        # BEP20: переводы уже декодированы ANKR
+        ankr_transfers = self.api.get_token_transfers(
+            address=address,
+            chain='bsc',
+            start_timestamp=start_time,
+            end_timestamp=end_time,
             max_pages=3
         )
 
-        if not ankr_transactions:
+        if not ankr_transactions and not ankr_transfers:
             logger.info(f"BnbTracker: транзакций не найдено")
             return {
                 'native': [],
@@ -244,87 +348,9 @@ class BnbTracker(BaseTracker):
                 'network': 'bnb'
             }
 
-        # Парсим и разделяем
-        native_txs = []
-        token_txs = []
-
-        for tx in ankr_transactions:
-            try:
-                # Базовые поля
-                tx_hash = tx.get('hash', '')
-                tx_from = tx.get('from', '').lower()
-                tx_to = tx.get('to', '').lower()
-
-                # Конвертируем значение из hex в int
-                tx_value_raw = tx.get('value', '0x0')
-                if isinstance(tx_value_raw, str) and tx_value_raw.startswith('0x'):
-                    tx_value = int(tx_value_raw, 16)
-                else:
-                    tx_value = int(tx_value_raw) if tx_value_raw else 0
-
-                tx_timestamp = tx.get('timestamp', 0)
-
-                # Проверяем, что это входящая транзакция
-                if tx_to.lower() != address.lower():
-                    continue
-
-                # 1. Нативная BNB транзакция
-                if tx_value > 0:
-                    native_txs.append({
-                        'hash': tx_hash,
-                        'from': tx_from,
-                        'to': tx_to,
-                        'value': tx_value / 1e18,  # BNB: 18 decimals
-                        'value_raw': tx_value,
-                        'timestamp': tx_timestamp,
-                        'token': 'BNB',
-                        'is_native': True,
-                        'network': 'bnb'
-                    })
-
-                # 2. Токенные транзакции (из логов)
-                logs = tx.get('logs', [])
-                for log in logs:
-                    topics = log.get('topics', [])
-                    if len(topics) >= 3 and topics[
-                        0] == '0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef':
-                        # Transfer событие ERC20/BEP20
-                        to_addr = '0x' + topics[2][-40:] if len(topics[2]) >= 40 else ''
-
-                        if to_addr.lower() != address.lower():
-                            continue
-
-                        # Парсим amount
-                        data_hex = log.get('data', '0x')
-                        if data_hex.startswith('0x'):
-                            data_hex = data_hex[2:]
-
-                        amount_raw = int(data_hex, 16) if data_hex else 0
-                        if amount_raw <= 0:
-                            continue
-
-                        contract_addr = log.get('address', '').lower()
-                        token_symbol = BEP20_TOKENS.get(contract_addr, 'UNKNOWN')
-
-                        # По умолчанию 18 decimals для BEP20
-                        amount = amount_raw / 1e18
-
-                        token_txs.append({
-                            'hash': tx_hash,
-                            'from': '0x' + topics[1][-40:] if len(topics[1]) >= 40 else '',
-                            'to': to_addr,
-                            'value': amount,
-                            'value_raw': amount_raw,
-                            'contract_address': contract_addr,
-                            'token_symbol': token_symbol,
-                            'timestamp': tx_timestamp,
-                            'is_native': False,
-                            'network': 'bnb'
-                        })
-
-            except Exception as e:
-                logger.warning(f"Ошибка парсинга BNB транзакции: {e}")
-                continue
+        # Парсим
+        native_txs = parse_ankr_native_transactions(ankr_transactions, address, 'bnb', 'BNB')
+        token_txs = parse_ankr_token_transfers(ankr_transfers, address, 'bnb', BEP20_TOKENS)
 
         logger.info(f"BnbTracker: найдено {len(native_txs)} BNB и {len(token_txs)} BEP20 транзакций")
 
@@ -358,11 +384,11 @@ class EthTracker(BaseTracker):
         """Получает транзакции Ethereum через Etherscan"""
         logger.info(f"EthTracker: получение транзакций для {address[:10]}...")
 
-        # Нативные транзакции
-        native_txs = self.api.get_chain_transactions(address) or []
+        # Нативные транзакции (только блоки нужного окна, постранично)
+        native_txs = self._iter_window('txlist', address, start_time, end_time)
 
         # Токенные транзакции
-        token_txs = self.api.get_token_transactions(address) or []
+        token_txs = self._iter_window('tokentx', address, start_time, end_time)
 
         # Парсим
         parsed_native = self._parse_transactions(native_txs, address, is_native=True)
@@ -381,6 +407,16 @@ class EthTracker(BaseTracker):
             'network': 'eth'
         }
 
+    def _iter_window(self, action, address, start_time=None, end_time=None):
+        """
+        Читает страницы Etherscan (sort=desc) и останавливается на первой строке
+        старше start_time - следующие страницы уже не запрашиваются.
+        """
+        for tx in self.api.iter_transactions(action, address, start_time, end_time):
+            if start_time and int(tx.get('timeStamp', 0)) < start_time:
+                break
+            yield tx
+
     def _parse_transactions(self, transactions, target_address, is_native=True):
         """Парсит транзакции Etherscan"""
         parsed = []
@@ -400,7 +436,7 @@ class EthTracker(BaseTracker):
 
                 if is_native:
                     amount = value / 1e18
-                    token = 'ETH'
+                    token = self.api.get_native_token()
                 else:
                     decimals = int(tx.get('tokenDecimal', 18))
                     amount = value / (10 ** decimals)
@@ -408,11 +444,13 @@ class EthTracker(BaseTracker):
 
                 parsed.append({
                     'hash': tx.get('hash'),
+                    'log_index': -1 if is_native else int(tx.get('logIndex', 0)),
                     'from': tx.get('from', ''),
                     'to': to_address,
                     'value': amount,
                     'value_raw': value,
                     'timestamp': timestamp,
+                    'block_number': int(tx.get('blockNumber', 0)) or None,
                     'token': token,
                     'is_native': is_native,
                     'contract_address': tx.get('contractAddress') if not is_native else None,
@@ -481,8 +519,19 @@ class EVMTracker(BaseTracker):
         """Получает транзакции через ANKR"""
         logger.info(f"EVMTracker[{self.network}]: получение транзакций для {address[:10]}...")
 
-        # Получаем транзакции через ANKR
+        # Нативные транзакции через ANKR (без логов)
         ankr_transactions = self.api.get_transactions_by_time_range(
+            address=address,
+            chain=self.ankr_chain,
+            start_timestamp=start_time,
+            end_timestamp=end_time,
+            max_pages=2,
+            include_logs=False,
+            decode_logs=False
+        )
+
+        # Токены: переводы уже декодированы ANKR
+        ankr_transfers = self.api.get_token_transfers(
             address=address,
             chain=self.ankr_chain,
             start_timestamp=start_time,
@@ -490,7 +539,7 @@ class EVMTracker(BaseTracker):
             max_pages=2
         )
 
-        if not ankr_transactions:
+        if not ankr_transactions and not ankr_transfers:
             logger.info(f"EVMTracker[{self.network}]: транзакций не найдено")
             return {
                 'native': [],
@@ -502,79 +551,8 @@ class EVMTracker(BaseTracker):
         native_token = CHAIN_TOKENS.get(self._get_chain_id(), 'UNKNOWN')
 
         # Парсим
-        native_txs = []
-        token_txs = []
-
-        for tx in ankr_transactions:
-            try:
-                tx_to = tx.get('to', '').lower()
-                if tx_to != address.lower():
-                    continue
-
-                # Конвертируем значение из hex в int
-                tx_value_raw = tx.get('value', '0x0')
-                if isinstance(tx_value_raw, str) and tx_value_raw.startswith('0x'):
-                    tx_value = int(tx_value_raw, 16)
-                else:
-                    tx_value = int(tx_value_raw) if tx_value_raw else 0
-
-                tx_timestamp = tx.get('timestamp', 0)
-
-                # Нативная транзакция
-                if tx_value > 0:
-                    native_txs.append({
-                        'hash': tx.get('hash', ''),
-                        'from': tx.get('from', ''),
-                        'to': tx_to,
-                        'value': tx_value / 1e18,  # По умолчанию 18 decimals
-                        'value_raw': tx_value,
-                        'timestamp': tx_timestamp,
-                        'token': native_token,
-                        'is_native': True,
-                        'network': self.network
-                    })
-
-                # Токенные транзакции (опционально, можно добавить)
-                logs = tx.get('logs', [])
-                for log in logs:
-                    topics = log.get('topics', [])
-                    if len(topics) >= 3 and topics[
-                        0] == '0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef':
-                        # Transfer событие
-                        to_addr = '0x' + topics[2][-40:] if len(topics[2]) >= 40 else ''
-
-                        if to_addr.lower() != address.lower():
-                            continue
-
-                        data_hex = log.get('data', '0x')
-                        if data_hex.startswith('0x'):
-                            data_hex = data_hex[2:]
-
-                        amount_raw = int(data_hex, 16) if data_hex else 0
-                        if amount_raw <= 0:
-                            continue
-
-                        contract_addr = log.get('address', '').lower()
-                        token_symbol = 'UNKNOWN'  # Нужна база токенов для каждой сети
-
-                        amount = amount_raw / 1e18
-
-                        token_txs.append({
-                            'hash': tx.get('hash', ''),
-                            'from': '0x' + topics[1][-40:] if len(topics[1]) >= 40 else '',
-                            'to': to_addr,
-                            'value': amount,
-                            'value_raw': amount_raw,
-                            'contract_address': contract_addr,
-                            'token_symbol': token_symbol,
-                            'timestamp': tx_timestamp,
-                            'is_native': False,
-                            'network': self.network
-                        })
-
-            except Exception as e:
-                logger.warning(f"Ошибка парсинга {self.network} транзакции: {e}")
-                continue
+        native_txs = parse_ankr_native_transactions(ankr_transactions, address, self.network, native_token)
+        token_txs = parse_ankr_token_transfers(ankr_transfers, address, self.network)
 
         logger.info(
             f"EVMTracker[{self.network}]: найдено {len(native_txs)} нативных и {len(token_txs)} токенных транзакций")
@@ -609,4 +587,139 @@ class EVMTracker(BaseTracker):
             'polygon_zkevm': 1101,
             'zksync': 324
         }
-        return mapping.get(self.network.lower(), 1)
\ No newline at end of file
+        return mapping.get(self.network.lower(), 1)
+
+
+# ============================================
+#  МУЛЬТИСЕТЕВОЙ ТРЕКЕР (ОДИН ЗАПРОС ANKR)
+# ============================================
+
+class MultiChainEVMTracker(BaseTracker):
+    """
+    Трекер для нескольких EVM сетей сразу: один постраничный запрос
+    ankr_getTransactionsByAddress со списком сетей вместо EVMTracker на каждую сеть.
+    """
+
+    def __init__(self, chains: List[int] = None, **kwargs):
+        try:
+            from ankr_api import AnkrAPI
+            ankr_api_key = kwargs.get('ankr_api_key')
+            if not ankr_api_key:
+                logger.error("❌ ANKR API ключ не указан для MultiChainEVMTracker")
+                raise ValueError("ANKR API ключ не указан")
+
+            self.api = AnkrAPI(ankr_api_key)
+            super().__init__('evm_multichain')
+
+            # chain_id -> ANKR chain name (Ethereum идет через Etherscan)
+            chains = chains or [chain_id for chain_id in ANKR_CHAIN_MAPPING if chain_id != 1]
+            self.chains = {chain_id: ANKR_CHAIN_MAPPING[chain_id] for chain_id in chains
+                           if chain_id in ANKR_CHAIN_MAPPING}
+            logger.info(f"✅ MultiChainEVMTracker инициализирован для {len(self.chains)} сетей")
+
+        except ImportError as e:
+            logger.error(f"Не удалось импортировать AnkrAPI: {e}")
+            raise
+
+    def get_transactions_by_chain(self, address: str, start_time: int = None, end_time: int = None,
+                                  **kwargs) -> Dict[int, Dict]:
+        """Возвращает {chain_id: {'native', 'tokens', 'network'}} для всех сетей трекера"""
+        logger.info(f"MultiChainEVMTracker: получение транзакций для {address[:10]}...")
+
+        chains = list(self.chains.values())
+        max_pages = kwargs.get('max_pages', 10)
+        ankr_transactions = self.api.get_transactions_by_time_range_multichain(
+            address=address,
+            chains=chains,
+            start_timestamp=start_time,
+            end_timestamp=end_time,
+            max_pages=max_pages,
+            include_logs=False,
+            decode_logs=False
+        )
+        ankr_transfers = self.api.get_token_transfers_multichain(
+            address=address,
+            chains=chains,
+            start_timestamp=start_time,
+            end_timestamp=end_time,
+            max_pages=max_pages
+        )
+
+        results = self._split_by_chain(ankr_transactions, ankr_transfers, address, start_time, end_time)
+        logger.info(f"MultiChainEVMTracker: {len(ankr_transactions)} транзакций и {len(ankr_transfers)} "
+                    f"токен-переводов в {len(self.chains)} сетях")
+        return results
+
+    def get_transactions_by_chain_batch(self, addresses: List[str], start_time: int = None,
+                                        end_time: int = None, **kwargs) -> Dict[str, Dict[int, Dict]]:
+        """
+        То же для многих адресов: страницы всех адресов уходят JSON-RPC batch'ами.
+        Возвращает {адрес: {chain_id: результат}} только для успешно опрошенных адресов.
+        """
+        logger.info(f"MultiChainEVMTracker: batch для {len(addresses)} адресов")
+        chains = list(self.chains.values())
+        queries = [(address, chains) for address in addresses]
+        max_pages = kwargs.get('max_pages', 10)
+        tx_batches = self.api.get_transactions_batch(
+            queries,
+            start_timestamp=start_time,
+            end_timestamp=end_time,
+            max_pages=max_pages,
+            include_logs=False,
+            decode_logs=False
+        )
+        transfer_batches = self.api.get_token_transfers_batch(
+            queries,
+            start_timestamp=start_time,
+            end_timestamp=end_time,
+            max_pages=max_pages
+        )
+        # Адреса, которые не удалось опросить, в ответ не попадают
+        return {
+            address: self._split_by_chain(ankr_transactions, ankr_transfers, address, start_time, end_time)
+            for address, ankr_transactions, ankr_transfers in zip(addresses, tx_batches, transfer_batches)
+            if ankr_transactions is not None and ankr_transfers is not None
+        }
+
+    def _group_by_chain(self, items: List[Dict]) -> Dict[int, List[Dict]]:
+        """Раскладывает ответ ANKR по сетям (поле 'blockchain')"""
+        by_chain = {chain_id: [] for chain_id in self.chains}
+        chain_ids = {**ANKR_CHAIN_TO_ID,
+                     **{self.api._get_ankr_chain_name(name): chain_id for chain_id, name in self.chains.items()}}
+        for item in items:
+            chain_id = chain_ids.get(item.get('blockchain'))
+            if chain_id in by_chain:
+                by_chain[chain_id].append(item)
+        return by_chain
+
+    def _split_by_chain(self, ankr_transactions: List[Dict], ankr_transfers: List[Dict], address: str,
+                        start_time: int = None, end_time: int = None) -> Dict[int, Dict]:
+        """Результат трекера по каждой сети"""
+        txs_by_chain = self._group_by_chain(ankr_transactions)
+        transfers_by_chain = self._group_by_chain(ankr_transfers)
+
+        results = {}
+        for chain_id, network in self.chains.items():
+            token_symbols = BEP20_TOKENS if chain_id == 56 else None
+            native_txs = parse_ankr_native_transactions(
+                txs_by_chain[chain_id], address, network, CHAIN_TOKENS.get(chain_id, 'UNKNOWN')
+            )
+            token_txs = parse_ankr_token_transfers(transfers_by_chain[chain_id], address, network, token_symbols)
+            if start_time or end_time:
+                native_txs = self.filter_by_time(native_txs, start_time, end_time)
+                token_txs = self.filter_by_time(token_txs, start_time, end_time)
+            results[chain_id] = {
+                'native': native_txs,
+                'tokens': token_txs,
+                'network': network
+            }
+        return results
+
+    def get_transactions(self, address: str, start_time: int = None, end_time: int = None, **kwargs):
+        """Объединенный результат по всем сетям трекера"""
+        results = self.get_transactions_by_chain(address, start_time, end_time, **kwargs)
+        return {
+            'native': [tx for result in results.values() for tx in result['native']],
+            'tokens': [tx for result in results.values() for tx in result['tokens']],
+            'network': self.network
+        }
@@ -0,0 +1,93 @@
+# tron_event_ingester.py
+import threading
+import time
+from typing import Container, Dict, List, Optional, Tuple
+
+from config import logger, TRC20_SYMBOLS
+from trongrid_api import TronGridAPI, tron_to_base58
+
+
+def _event_address(address: str) -> str:
+    """Адрес из события TronGrid (0x + 20 байт hex или base58) в base58"""
+    if address.startswith('0x'):
+        return tron_to_base58('41' + address[2:])
+    return tron_to_base58(address)
+
+
+class Trc20EventIngester:
+    """
+    Следит за Transfer событиями TRC20 контрактов (TRC20_SYMBOLS) по курсору времени блока.
+    Получатели сверяются с множеством отслеживаемых TRON адресов локально:
+    один поток событий на контракт обслуживает все TRON кошельки базы.
+    """
+
+    # decimals контрактов не меняются - кешируем на весь процесс
+    _decimals: Dict[str, int] = {}
+    _decimals_lock = threading.Lock()
+
+    def __init__(self, api: TronGridAPI = None):
+        self.api = api or TronGridAPI()
+
+    def _token_decimals(self, contract_address: str) -> int:
+        decimals = self._decimals.get(contract_address)
+        if decimals is None:
+            try:
+                decimals = self.api.get_trc20_decimals(contract_address)
+            except Exception as e:
+                logger.warning(f"TronIngest: нет decimals для {contract_address}, считаем 6: {e}")
+                return 6
+            with self._decimals_lock:
+                self._decimals[contract_address] = decimals
+        return decimals
+
+    def poll(self, contract_address: str, watched: Container[str],
+             cursor_ms: Optional[int]) -> Tuple[List[Dict], int]:
+        """
+        События контракта начиная с cursor_ms. Возвращает (переводы на watched, новый курсор в мс).
+        watched - AddressWatcher TRON кошельков (адрес события проверяется как есть, без конвертации).
+        Без курсора слежение начинается с текущего момента.
+        Граничные события с тем же временем приходят повторно и отсекаются ключом таблицы transfers.
+        """
+        if cursor_ms is None:
+            now_ms = int(time.time() * 1000)
+            logger.info(f"TronIngest[{contract_address}]: старт с {now_ms}")
+            return [], now_ms
+
+        symbol = TRC20_SYMBOLS.get(contract_address, 'UNKNOWN')
+        transfers = []
+        new_cursor = cursor_ms
+        events = 0
+
+        for event in self.api.iter_contract_events(contract_address, cursor_ms):
+            events += 1
+            new_cursor = max(new_cursor, int(event.get('block_timestamp', 0)))
+            result = event.get('result', {})
+            try:
+                if result.get('to', '') not in watched:
+                    continue
+                to_address = _event_address(result['to'])
+
+                amount_raw = int(result.get('value', 0))
+                if amount_raw <= 0:
+                    continue
+
+                transfers.append({
+                    'hash': event.get('transaction_id', ''),
+                    'log_index': int(event.get('event_index', 0)),
+                    'from': _event_address(result.get('from', '')),
+                    'to': to_address,
+                    'value': amount_raw / (10 ** self._token_decimals(contract_address)),
+                    'value_raw': amount_raw,
+                    'contract_address': contract_address,
+                    'token_symbol': symbol,
+                    'timestamp': int(event.get('block_timestamp', 0)) // 1000,
+                    'block_number': event.get('block_number'),
+                    'is_native': False,
+                    'network': 'tron'
+                })
+            except Exception as e:
+                logger.warning(f"TronIngest[{symbol}]: ошибка парсинга события: {e}")
+                continue
+
+        logger.info(f"TronIngest[{symbol}]: {events} событий, найдено {len(transfers)} переводов")
+        return transfers, new_cursor
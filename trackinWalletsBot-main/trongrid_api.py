@@ -1,11 +1,47 @@
+import hashlib
+
+import httpx
 import requests
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 
-from config import logger, TRON_API_KEY
+from config import logger, TRON_API_KEY, TRACKER_SETTINGS, TRONGRID_SETTINGS
+from circuit_breaker import get_breaker
+from deadline import bounded_timeout
+from http_cache import response_cache
+from http_client import http_pool
+
+
+BASE58_ALPHABET = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+
+
+def tron_to_base58(address: str) -> str:
+    """Приводит TRON адрес к base58 (T...). Hex-адреса (41...) конвертируются, остальные не меняются."""
+    if not (address.startswith('41') and len(address) == 42):
+        return address
+
+    raw = bytes.fromhex(address)
+    checksum = hashlib.sha256(hashlib.sha256(raw).digest()).digest()[:4]
+    num = int.from_bytes(raw + checksum, 'big')
+    encoded = ''
+    while num:
+        num, rem = divmod(num, 58)
+        encoded = BASE58_ALPHABET[rem] + encoded
+    return encoded
+
+
+class TronGridClientError(Exception):
+    """Ошибка 4xx в запросе (например, неверный адрес) - сеть при этом доступна"""
+    pass
+
+
+class TronGridIncompleteError(Exception):
+    """Окно времени прочитано не целиком (success=false или лимит страниц) - результат неполный"""
+    pass
 
 
 class TronGridAPI:
     BASE_URL = "https://api.trongrid.io/v1"
+    NODE_URL = "https://api.trongrid.io/wallet"
 
     def __init__(self, api_key: str = TRON_API_KEY):
         if not api_key:
@@ -13,47 +49,262 @@ class TronGridAPI:
             raise ValueError("API ключ TronGrid отсутствует")
         self.api_key = api_key
         self.headers = {'TRON-PRO-API-KEY': api_key}
+        self.breaker = get_breaker('trongrid', 'tron', ignored_exceptions=(TronGridClientError,))
+        self.breaker.probe = self.get_now_block
+
+    @staticmethod
+    def _raise_for_status(status_code: int, text: str):
+        if 400 <= status_code < 500 and status_code != 429:
+            raise TronGridClientError(f"HTTP {status_code}: {text}")
 
     @retry(
-        stop=stop_after_attempt(6),
+        stop=stop_after_attempt(TRACKER_SETTINGS['max_retries']),
         wait=wait_exponential(multiplier=1, min=2, max=10),
         retry=retry_if_exception_type((requests.exceptions.ReadTimeout, requests.exceptions.ConnectionError)),
         before_sleep=lambda retry_state: logger.info(
-            f"Повторная попытка запроса в TronGrid (попытка {retry_state.attempt_number}/5): {retry_state.outcome.exception()}"
-        )
+            f"Повторная попытка запроса в TronGrid (попытка {retry_state.attempt_number}/"
+            f"{TRACKER_SETTINGS['max_retries']}): {retry_state.outcome.exception()}"
+        ),
+        reraise=True
     )
-    def _request(self, url: str, params: dict = None):
-        response = requests.get(url, params=params or {}, headers=self.headers, timeout=20)
+    def _send(self, url: str, params: dict = None):
+        response = http_pool.session(url).get(url, params=params or {}, headers=self.headers, timeout=bounded_timeout(20))
+        self._raise_for_status(response.status_code, response.text)
         response.raise_for_status()
         return response.json()
 
-    def get_chain_transactions(self, address: str) -> list:
-        """Отримує нативні транзакції (TRX) для адреси."""
-        url = f"{self.BASE_URL}/accounts/{address}/transactions"
+    @retry(
+        stop=stop_after_attempt(TRACKER_SETTINGS['max_retries']),
+        wait=wait_exponential(multiplier=1, min=2, max=10),
+        retry=retry_if_exception_type((httpx.TimeoutException, httpx.TransportError)),
+        before_sleep=lambda retry_state: logger.info(
+            f"Повторная попытка async запроса в TronGrid (попытка {retry_state.attempt_number}/"
+            f"{TRACKER_SETTINGS['max_retries']}): {retry_state.outcome.exception()}"
+        ),
+        reraise=True
+    )
+    async def _send_async(self, url: str, params: dict = None):
+        client = http_pool.async_client(url)
+        response = await client.get(url, params=params or {}, headers=self.headers, timeout=bounded_timeout(20))
+        self._raise_for_status(response.status_code, response.text)
+        response.raise_for_status()
+        return response.json()
+
+    @retry(
+        stop=stop_after_attempt(TRACKER_SETTINGS['max_retries']),
+        wait=wait_exponential(multiplier=1, min=2, max=10),
+        retry=retry_if_exception_type((requests.exceptions.ReadTimeout, requests.exceptions.ConnectionError)),
+        reraise=True
+    )
+    def _send_post(self, url: str, payload: dict):
+        response = http_pool.session(url).post(url, json=payload, headers=self.headers, timeout=bounded_timeout(20))
+        self._raise_for_status(response.status_code, response.text)
+        response.raise_for_status()
+        return response.json()
+
+    @staticmethod
+    def _cache_key(url: str, params: dict = None):
+        """Ключ дискового кеша и конец окна (сек) для запросов с max_timestamp, иначе (None, None)"""
+        if not params or not params.get('max_timestamp'):
+            return None, None
+        return response_cache.key('trongrid', url, params), params['max_timestamp'] // 1000
+
+    def _request(self, url: str, params: dict = None):
+        """Запрос через circuit breaker TRON. Страницы окон времени - через дисковый кеш."""
+        key, window_end = self._cache_key(url, params)
+        data = response_cache.get(key) if key else None
+        if data is None:
+            data = self.breaker.call(self._send, url, params)
+            if key and isinstance(data, dict) and data.get('success', True):
+                response_cache.set(key, data, window_end)
+        return data
+
+    async def _request_async(self, url: str, params: dict = None):
+        key, window_end = self._cache_key(url, params)
+        data = response_cache.get(key) if key else None
+        if data is None:
+            data = await self.breaker.call_async(self._send_async, url, params)
+            if key and isinstance(data, dict) and data.get('success', True):
+                response_cache.set(key, data, window_end)
+        return data
+
+    def get_now_block(self) -> dict:
+        """Последний блок TRON (используется и как проверка доступности сети)"""
+        return self._send(f"{self.NODE_URL}/getnowblock")
+
+    def get_trc20_decimals(self, contract_address: str) -> int:
+        """decimals() TRC20 контракта через triggerconstantcontract"""
+        data = self.breaker.call(self._send_post, f"{self.NODE_URL}/triggerconstantcontract", {
+            "owner_address": contract_address,
+            "contract_address": contract_address,
+            "function_selector": "decimals()",
+            "visible": True,
+        })
+        return int(data['constant_result'][0], 16)
+
+    @staticmethod
+    def _successful_txs(data: dict) -> list:
+        """Оставляет только успешно выполненные транзакции"""
+        if not data.get('success', True):
+            return []
+        txs = data.get('data', [])
+        return [tx for tx in txs if tx.get('ret', [{}])[0].get('contractRet') == 'SUCCESS']
+
+    @staticmethod
+    def _trc20_items(data: dict) -> list:
+        if not data.get('success', True):
+            logger.warning(f"TronGrid trc20 не success: {data}")
+            return []
+        return data.get('trc20', data.get('data', []))
+
+    @staticmethod
+    def _window_params(start_time: int = None, end_time: int = None, only_to: bool = False) -> dict:
+        """Серверные фильтры TronGrid: окно времени (мс) и только входящие"""
         params = {
-            "limit": 100,
+            "limit": TRONGRID_SETTINGS['page_size'],
             "order_by": "block_timestamp,desc",
         }
-        try:
+        if start_time:
+            params["min_timestamp"] = start_time * 1000
+        if end_time:
+            params["max_timestamp"] = end_time * 1000
+        if only_to:
+            params["only_to"] = "true"
+        return params
+
+    @staticmethod
+    def _next_fingerprint(data: dict, params: dict, page: int, strict: bool = False):
+        """
+        Курсор следующей страницы из meta.fingerprint или None, если окно исчерпано.
+        strict - окно нужно целиком: лимит страниц - TronGridIncompleteError, а не тихий обрыв.
+        """
+        fingerprint = data.get('meta', {}).get('fingerprint')
+        if not fingerprint or not data.get('data'):
+            return None
+        if page >= TRONGRID_SETTINGS['max_pages']:
+            if strict:
+                raise TronGridIncompleteError(f"TronGrid: окно не прочитано за {page} страниц")
+            logger.warning(f"TronGrid: достигнут лимит {page} страниц, остаток окна пропущен")
+            return None
+        params["fingerprint"] = fingerprint
+        return fingerprint
+
+    @staticmethod
+    def _check_page(data: dict, strict: bool):
+        if strict and isinstance(data, dict) and not data.get('success', True):
+            raise TronGridIncompleteError(f"TronGrid: ответ не success: {data.get('error', data)}")
+
+    def _iter_pages(self, url: str, params: dict, strict: bool = False):
+        """Генератор ответов TronGrid по страницам (следует meta.fingerprint)"""
+        page = 1
+        while True:
             data = self._request(url, params)
-            if not data.get('success', True):
-                return []
-            txs = data.get('data', [])
-            return [tx for tx in txs if tx.get('ret', [{}])[0].get('contractRet') == 'SUCCESS']
-        except Exception as e:
-            logger.error(f"Помилка get_native_transactions: {e}")
-            return []
+            self._check_page(data, strict)
+            yield data
+            if not self._next_fingerprint(data, params, page, strict):
+                return
+            page += 1
+
+    async def _iter_pages_async(self, url: str, params: dict, strict: bool = False):
+        page = 1
+        while True:
+            data = await self._request_async(url, params)
+            self._check_page(data, strict)
+            yield data
+            if not self._next_fingerprint(data, params, page, strict):
+                return
+            page += 1
+
+    def iter_chain_transactions(self, address: str, start_time: int = None, end_time: int = None,
+                                only_to: bool = False):
+        """
+        Генератор успешных TRX транзакций адреса за окно, страница за страницей.
+        Неполное окно - TronGridIncompleteError.
+        """
+        url = f"{self.BASE_URL}/accounts/{address}/transactions"
+        params = {**self._window_params(start_time, end_time, only_to), "visible": "true"}
+        for data in self._iter_pages(url, params, strict=True):
+            yield from self._successful_txs(data)
 
-    def get_trc20_transfers(self, address: str) -> list:
+    def iter_trc20_transfers(self, address: str, start_time: int = None, end_time: int = None,
+                             only_to: bool = False, contract_addresses: list = None):
+        """
+        Генератор TRC20 переводов адреса за окно. contract_addresses - allowlist токенов:
+        для каждого контракта отдельный поток страниц с фильтром на стороне сервера.
+        Неполное окно - TronGridIncompleteError.
+        """
         url = f"{self.BASE_URL}/accounts/{address}/transactions/trc20"
-        params = {"limit": 100, "order_by": "block_timestamp,desc"}
+        for contract_address in contract_addresses or [None]:
+            params = self._window_params(start_time, end_time, only_to)
+            if contract_address:
+                params["contract_address"] = contract_address
+            for data in self._iter_pages(url, params, strict=True):
+                yield from self._trc20_items(data)
 
+    def iter_contract_events(self, contract_address: str, min_timestamp_ms: int, event_name: str = 'Transfer'):
+        """События контракта начиная с min_timestamp_ms (включительно), по возрастанию времени"""
+        url = f"{self.BASE_URL}/contracts/{contract_address}/events"
+        params = {
+            "event_name": event_name,
+            "min_block_timestamp": min_timestamp_ms,
+            "order_by": "block_timestamp,asc",
+            "limit": TRONGRID_SETTINGS['page_size'],
+        }
+        for data in self._iter_pages(url, params):
+            yield from data.get('data', [])
+
+    def get_chain_transactions(self, address: str, start_time: int = None, end_time: int = None,
+                               only_to: bool = False) -> list:
+        """Отримує нативні транзакції (TRX) для адреси."""
+        txs = []
         try:
-            data = self._request(url, params)
-            if not data.get('success', True):
-                logger.warning(f"TronGrid trc20 не success: {data}")
-                return []
-            return data.get('trc20', data.get('data', []))
+            for tx in self.iter_chain_transactions(address, start_time, end_time, only_to):
+                txs.append(tx)
+        except Exception as e:
+            logger.error(f"Помилка get_native_transactions: {e}")
+        return txs
+
+    def get_trc20_transfers(self, address: str, start_time: int = None, end_time: int = None,
+                            only_to: bool = False, contract_addresses: list = None) -> list:
+        transfers = []
+        try:
+            for transfer in self.iter_trc20_transfers(address, start_time, end_time, only_to, contract_addresses):
+                transfers.append(transfer)
         except Exception as e:
             logger.error(f"Ошибка get_trc20_transfers: {e}")
-            return []
\ No newline at end of file
+        return transfers
+
+    async def iter_chain_transactions_async(self, address: str, start_time: int = None, end_time: int = None,
+                                            only_to: bool = False):
+        """Асинхронный вариант iter_chain_transactions. Неполное окно - TronGridIncompleteError."""
+        url = f"{self.BASE_URL}/accounts/{address}/transactions"
+        params = {**self._window_params(start_time, end_time, only_to), "visible": "true"}
+        async for data in self._iter_pages_async(url, params, strict=True):
+            for tx in self._successful_txs(data):
+                yield tx
+
+    async def iter_trc20_transfers_async(self, address: str, start_time: int = None, end_time: int = None,
+                                         only_to: bool = False, contract_addresses: list = None):
+        """Асинхронный вариант iter_trc20_transfers. Неполное окно - TronGridIncompleteError."""
+        url = f"{self.BASE_URL}/accounts/{address}/transactions/trc20"
+        for contract_address in contract_addresses or [None]:
+            params = self._window_params(start_time, end_time, only_to)
+            if contract_address:
+                params["contract_address"] = contract_address
+            async for data in self._iter_pages_async(url, params, strict=True):
+                for transfer in self._trc20_items(data):
+                    yield transfer
+
+    async def get_chain_transactions_async(self, address: str, start_time: int = None, end_time: int = None,
+                                           only_to: bool = False) -> list:
+        """
+        Асинхронный вариант get_chain_transactions. Окно читается целиком (как в трекере):
+        ошибка или неполное окно не превращается в пустой список, а пробрасывается.
+        """
+        return [tx async for tx in self.iter_chain_transactions_async(address, start_time, end_time, only_to)]
+
+    async def get_trc20_transfers_async(self, address: str, start_time: int = None, end_time: int = None,
+                                        only_to: bool = False, contract_addresses: list = None) -> list:
+        """Асинхронный вариант get_trc20_transfers. Ошибка или неполное окно пробрасываются."""
+        return [transfer async for transfer in self.iter_trc20_transfers_async(
+            address, start_time, end_time, only_to, contract_addresses)]
@@ -0,0 +1,57 @@
+# update_processor.py
+import asyncio
+from typing import Awaitable, Dict, Hashable, Optional
+
+from telegram.ext import BaseUpdateProcessor
+
+from config import logger
+
+
+class PerChatUpdateProcessor(BaseUpdateProcessor):
+    """
+    Апдейты разных чатов обрабатываются параллельно (не больше max_concurrent_updates),
+    апдейты одного чата - строго по очереди. ConversationHandler хранит состояние диалога
+    по чату: при параллельной обработке второе сообщение читало бы устаревшее состояние.
+    Апдейты без чата и пользователя выполняются сразу.
+    """
+
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        self._locks: Dict[Hashable, asyncio.Lock] = {}
+        self._pending: Dict[Hashable, int] = {}  # Сколько апдейтов чата ждут или выполняются
+
+    @staticmethod
+    def _chat_key(update: object) -> Optional[Hashable]:
+        chat = getattr(update, 'effective_chat', None)
+        if chat is not None:
+            return 'chat', chat.id
+        user = getattr(update, 'effective_user', None)
+        if user is not None:
+            return 'user', user.id
+        return None
+
+    async def do_process_update(self, update: object, coroutine: Awaitable) -> None:
+        key = self._chat_key(update)
+        if key is None:
+            await coroutine
+            return
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        self._pending[key] = self._pending.get(key, 0) + 1
+        if lock.locked():
+            logger.debug(f"Апдейт чата {key[1]} ждет завершения предыдущего")
+        try:
+            async with lock:
+                await coroutine
+        finally:
+            self._pending[key] -= 1
+            if not self._pending[key]:
+                # Очереди чата больше нет - блокировку не храним
+                del self._pending[key]
+                del self._locks[key]
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass